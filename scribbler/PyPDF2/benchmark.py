@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+Times parts of PyPDF2. Run with
+
+    python -m scribbler.PyPDF2.benchmark BENCHMARK [FILE...]
+
+on the data of each FILE or, by default, of a synthetic file of 500
+pages. The benchmarks are
+
+parse
+    parses every object with the buffer lexer PdfFileReader uses, and with
+    generic.readObject reading through the file a byte at a time.
+codecs
+    encodes and decodes the data, and as much random data, with LZWDecode
+    and ASCII85Decode, and undoes PNG predictors on it as rows of 600
+    bytes, timing the decoders PyPDF2 had before alongside.
+transform
+    parses and writes back out the content stream of every page, then
+    scales each page, lays it out rotated on a blank page and writes
+    the result.
+"""
+from __future__ import print_function
+
+import random
+import struct
+import sys
+import time
+from io import BytesIO
+
+from . import filters
+from .generic import DictionaryObject, NameObject, NumberObject, readObject
+from .pdf import ContentStream, PageObject, PdfFileReader, PdfFileWriter
+from .utils import PdfReadError, ord_
+if sys.version_info < ( 3, 0 ):
+    from cStringIO import StringIO
+else:
+    from io import StringIO
+
+RUNS = 5
+
+
+def sample_pdf(pages=500, fonts=4, seed=0):
+    """
+    Returns the bytes of a PDF file of PAGES pages, each with its own
+    content stream and link annotation and one of FONTS fonts, made up of
+    numbers, names, strings and references like those of generated
+    documents.
+    """
+    rand = random.Random(seed)
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None]
+    for i in range(fonts):
+        widths = ' '.join(str(rand.randrange(200, 900)) for j in range(224))
+        objects += [
+            '<< /Type /Font /Subtype /Type1 /BaseFont /Font{} '
+            '/FirstChar 32 /LastChar 255 /Widths [{}] /FontDescriptor {} 0 R '
+            '/Encoding /WinAnsiEncoding >>'
+            .format(i, widths, len(objects) + 2).encode('ascii'),
+            '<< /Type /FontDescriptor /FontName /Font{} /Flags 32 '
+            '/FontBBox [-166 -225 1000 931] /ItalicAngle 0 /Ascent 718 '
+            '/Descent -207 /CapHeight 718 /StemV 88 >>'.format(i).encode('ascii'),
+        ]
+    kids = []
+    for i in range(pages):
+        page = len(objects) + 1
+        kids.append(page)
+        content = b''.join(
+            '{:.2f} {:.2f} Td /F1 {} Tf (Word {}) Tj\n'
+            .format(rand.uniform(0, 600), rand.uniform(0, 800),
+                    rand.randrange(8, 14), j).encode('ascii')
+            for j in range(40))
+        objects += [
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            '/Contents {} 0 R /Resources << /Font << /F1 {} 0 R >> '
+            '/ProcSet [/PDF /Text] >> /Annots [{} 0 R] >>'
+            .format(page + 1, 3 + 2 * rand.randrange(fonts), page + 2)
+            .encode('ascii'),
+            '<< /Length {} >>\nstream\n'.format(len(content)).encode('ascii') +
+            content + b'\nendstream',
+            '<< /Type /Annot /Subtype /Link /Rect [{:.3f} {:.3f} {:.3f} {:.3f}] '
+            '/Border [0 0 0] /A << /S /URI /URI (http://example.com/{}\\)) >> >>'
+            .format(rand.uniform(0, 300), rand.uniform(0, 400),
+                    rand.uniform(300, 600), rand.uniform(400, 800), i)
+            .encode('ascii'),
+        ]
+    objects[1] = ('<< /Type /Pages /Count {} /Kids [{}] >>'
+                  .format(pages, ' '.join('{} 0 R'.format(k) for k in kids))
+                  .encode('ascii'))
+    out = BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for i, body in enumerate(objects):
+        offsets.append(out.tell())
+        out.write('{} 0 obj\n'.format(i + 1).encode('ascii'))
+        out.write(body)
+        out.write(b'\nendobj\n')
+    start = out.tell()
+    out.write('xref\n0 {}\n0000000000 65535 f \n'
+              .format(len(objects) + 1).encode('ascii'))
+    for offset in offsets:
+        out.write('{:010d} 00000 n \n'.format(offset).encode('ascii'))
+    out.write('trailer\n<< /Size {} /Root 1 0 R >>\nstartxref\n{}\n%%EOF\n'
+              .format(len(objects) + 1, start).encode('ascii'))
+    return out.getvalue()
+
+
+def best(function, runs=RUNS):
+    """
+    Returns the shortest time of RUNS calls to FUNCTION.
+    """
+    times = []
+    for run in range(runs):
+        start = time.time()
+        function()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def parse(data):
+    reader = PdfFileReader(BytesIO(data), strict=False)
+    offsets = [offset for generation in reader.xref.values()
+               for idnum, offset in generation.items()]
+
+    def lexer():
+        for offset in offsets:
+            reader._lexer.readObject(reader._lexer.readObjectHeader(offset)[2])
+
+    def stream():
+        stream = BytesIO(data)
+        for offset in offsets:
+            stream.seek(offset)
+            reader.readObjectHeader(stream)
+            readObject(stream, reader)
+
+    print('{} objects: lexer {:.4f}s, readObject {:.4f}s (best of {})'
+          .format(len(offsets), best(lexer), best(stream), RUNS))
+
+
+class OldLZWDecoder(object):
+    """
+    The LZW decoder PyPDF2 had before, which reads a code a bit at a time
+    and builds its output by string concatenation.  It works on str, so is
+    given bytes decoded as Latin-1 on Python 3.
+    """
+    def __init__(self, data):
+        self.STOP=257
+        self.CLEARDICT=256
+        self.data=data
+        self.bytepos=0
+        self.bitpos=0
+        self.dict=[""]*4096
+        for i in range(256):
+            self.dict[i]=chr(i)
+        self.resetDict()
+
+    def resetDict(self):
+        self.dictlen=258
+        self.bitspercode=9
+
+    def nextCode(self):
+        fillbits=self.bitspercode
+        value=0
+        while fillbits>0 :
+            if self.bytepos >= len(self.data):
+                return -1
+            nextbits=ord(self.data[self.bytepos])
+            bitsfromhere=8-self.bitpos
+            if bitsfromhere>fillbits:
+                bitsfromhere=fillbits
+            value |= (((nextbits >> (8-self.bitpos-bitsfromhere)) &
+                       (0xff >> (8-bitsfromhere))) <<
+                      (fillbits-bitsfromhere))
+            fillbits -= bitsfromhere
+            self.bitpos += bitsfromhere
+            if self.bitpos >=8:
+                self.bitpos=0
+                self.bytepos = self.bytepos+1
+        return value
+
+    def decode(self):
+        cW = self.CLEARDICT;
+        baos=""
+        while True:
+            pW = cW;
+            cW = self.nextCode();
+            if cW == -1:
+                raise PdfReadError("Missed the stop code in LZWDecode!")
+            if cW == self.STOP:
+                break;
+            elif cW == self.CLEARDICT:
+                self.resetDict();
+            elif pW == self.CLEARDICT:
+                baos+=self.dict[cW]
+            else:
+                if cW < self.dictlen:
+                    baos += self.dict[cW]
+                    p=self.dict[pW]+self.dict[cW][0]
+                    self.dict[self.dictlen]=p
+                    self.dictlen+=1
+                else:
+                    p=self.dict[pW]+self.dict[pW][0]
+                    baos+=p
+                    self.dict[self.dictlen] = p;
+                    self.dictlen+=1
+                if (self.dictlen >= (1 << self.bitspercode) - 1 and
+                    self.bitspercode < 12):
+                    self.bitspercode+=1
+        return baos
+
+
+def old_lzw_decode(data):
+    if not isinstance(data, str):
+        data = data.decode('latin-1')
+    return OldLZWDecoder(data).decode()
+
+
+def old_a85_decode(data):
+    """
+    The ASCII85 decoder PyPDF2 had before: a loop over the characters on
+    Python 2 and over the bytes on Python 3.
+    """
+    if sys.version_info < ( 3, 0 ):
+        retval = ""
+        group = []
+        x = 0
+        hitEod = False
+        # remove all whitespace from data
+        data = [y for y in data if not (y in ' \n\r\t')]
+        while not hitEod:
+            c = data[x]
+            if len(retval) == 0 and c == "<" and data[x+1] == "~":
+                x += 2
+                continue
+            elif c == 'z':
+                assert len(group) == 0
+                retval += '\x00\x00\x00\x00'
+                x += 1
+                continue
+            elif c == "~" and data[x+1] == ">":
+                if len(group) != 0:
+                    # cannot have a final group of just 1 char
+                    assert len(group) > 1
+                    cnt = len(group) - 1
+                    group += [ 85, 85, 85 ]
+                    hitEod = cnt
+                else:
+                    break
+            else:
+                c = ord(c) - 33
+                assert c >= 0 and c < 85
+                group += [ c ]
+            if len(group) >= 5:
+                b = group[0] * (85**4) + \
+                    group[1] * (85**3) + \
+                    group[2] * (85**2) + \
+                    group[3] * 85 + \
+                    group[4]
+                assert b <= (2**32 - 1)
+                c4 = chr((b >> 0) % 256)
+                c3 = chr((b >> 8) % 256)
+                c2 = chr((b >> 16) % 256)
+                c1 = chr(b >> 24)
+                retval += (c1 + c2 + c3 + c4)
+                if hitEod:
+                    retval = retval[:-4+hitEod]
+                group = []
+            x += 1
+        return retval
+    else:
+        n = b = 0
+        out = bytearray()
+        for c in data:
+            if ord('!') <= c and c <= ord('u'):
+                n += 1
+                b = b*85+(c-33)
+                if n == 5:
+                    out += struct.pack(b'>L',b)
+                    n = b = 0
+            elif c == ord('z'):
+                assert n == 0
+                out += b'\0\0\0\0'
+            elif c == ord('~'):
+                if n:
+                    for _ in range(5-n):
+                        b = b*85+84
+                    out += struct.pack(b'>L',b)[:n-1]
+                break
+        return bytes(out)
+
+
+def old_png_unpredict(data, columns):
+    """
+    Undoes PNG predictors as FlateDecode did before, a byte at a time and
+    only for the None, Sub and Up filters.
+    """
+    output = StringIO()
+    rowlength = columns + 1
+    assert len(data) % rowlength == 0
+    prev_rowdata = (0,) * rowlength
+    for row in range(len(data) // rowlength):
+        rowdata = [ord_(x) for x in data[(row*rowlength):((row+1)*rowlength)]]
+        filterByte = rowdata[0]
+        if filterByte == 0:
+            pass
+        elif filterByte == 1:
+            for i in range(2, rowlength):
+                rowdata[i] = (rowdata[i] + rowdata[i-1]) % 256
+        elif filterByte == 2:
+            for i in range(1, rowlength):
+                rowdata[i] = (rowdata[i] + prev_rowdata[i]) % 256
+        else:
+            raise PdfReadError("Unsupported PNG filter %r" % filterByte)
+        prev_rowdata = rowdata
+        output.write(''.join([chr(x) for x in rowdata[1:]]))
+    return output.getvalue()
+
+
+def codecs(data):
+    rand = random.Random(0)
+    samples = [('data', data),
+               ('random', bytes(bytearray(rand.randrange(256)
+                                          for i in range(len(data)))))]
+    for name, codec, old in [('LZWDecode', filters.LZWDecode, old_lzw_decode),
+                             ('ASCII85Decode', filters.ASCII85Decode,
+                              old_a85_decode)]:
+        for sample, raw in samples:
+            encoded = codec.encode(raw)
+            print('{} {} ({} bytes): encode {:.4f}s, decode {:.4f}s, '
+                  'before {:.4f}s'
+                  .format(name, sample, len(raw), best(lambda: codec.encode(raw)),
+                          best(lambda: codec.decode(encoded)),
+                          best(lambda: old(encoded))))
+    columns = 600
+    parms = DictionaryObject({NameObject('/Predictor'): NumberObject(15),
+                              NameObject('/Columns'): NumberObject(columns)})
+    rows = [data[i:i + columns] for i in range(0, len(data) - columns + 1, columns)]
+    for filterType, name in enumerate(['None', 'Sub', 'Up', 'Average', 'Paeth']):
+        prefix = bytes(bytearray([filterType]))
+        predicted = b''.join(prefix + row for row in rows)
+        if filterType <= 2:
+            before = ', before {:.4f}s'.format(
+                best(lambda: old_png_unpredict(predicted, columns)))
+        else:
+            before = ''
+        print('PNG predictor {} ({} rows): {:.4f}s{}'
+              .format(name, len(rows),
+                      best(lambda: filters._unpredict(predicted, parms)),
+                      before))
+
+
+def transform(data):
+    def content():
+        reader = PdfFileReader(BytesIO(data), strict=False)
+        for i in range(reader.getNumPages()):
+            page = reader.getPage(i)
+            stream = ContentStream(page.getContents(), reader)
+            stream.operations
+            stream.getData()
+
+    def layout():
+        reader = PdfFileReader(BytesIO(data), strict=False)
+        writer = PdfFileWriter()
+        for i in range(reader.getNumPages()):
+            page = reader.getPage(i)
+            page.scaleBy(0.5)
+            blank = PageObject.createBlankPage(None, 842, 595)
+            blank.mergeTransformedPage(page, [0, 1, -1, 0, 500, 20])
+            writer.addPage(blank)
+        writer.write(BytesIO())
+
+    print('content streams {:.4f}s, scale, merge and write {:.4f}s (best of {})'
+          .format(best(content), best(layout), RUNS))
+
+
+BENCHMARKS = {'parse': parse, 'codecs': codecs, 'transform': transform}
+
+
+def main(name, *paths):
+    if paths:
+        for path in paths:
+            print(path)
+            with open(path, 'rb') as f:
+                BENCHMARKS[name](f.read())
+    else:
+        BENCHMARKS[name](sample_pdf())
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
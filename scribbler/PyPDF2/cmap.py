@@ -0,0 +1,259 @@
+"""
+Turns the character codes in a font's strings into Unicode text.
+
+The /ToUnicode entry of a font is a CMap stream whose ``bfchar`` and
+``bfrange`` sections give the text for each character code (PDF reference
+5.9.2), and whose ``codespacerange`` section says how many bytes each code
+takes.  :class:`ToUnicode` reads those sections from the stream's data;
+everything else in the CMap program is skipped.
+
+A simple font without one may instead have an /Encoding dictionary, naming
+the glyphs of some of its codes in a /Differences array (PDF reference
+5.5.5).  :class:`SimpleEncoding` gives the text of those glyph names.
+"""
+
+import binascii
+import re
+import struct
+import unicodedata
+
+from .utils import b_, u_
+
+# the hex strings, array brackets and section keywords of a CMap
+_TOKEN = re.compile(b_(r"<([0-9A-Fa-f\s]*)>|(\[)|(\])"
+                       r"|(begin|end)(codespacerange|bfchar|bfrange)\b"))
+_WHITESPACE = re.compile(b_(r"\s+"))
+
+_BEGIN = b_("begin")
+_CODESPACERANGE = b_("codespacerange")
+_BFCHAR = b_("bfchar")
+_BFRANGE = b_("bfrange")
+_EMPTY = b_("")
+_ZERO = b_("0")
+
+# a bfrange spanning more codes than this is taken to be corrupt
+_MAX_RANGE = 0x10000
+
+# the text of the glyph names most often found in /Differences arrays, other
+# than single characters, uniXXXX and uXXXX names and accented letters; as
+# a string, or the number of a character
+_GLYPH_NAMES = {
+    "space": " ", "exclam": "!", "quotedbl": '"', "numbersign": "#",
+    "dollar": "$", "percent": "%", "ampersand": "&", "quotesingle": "'",
+    "parenleft": "(", "parenright": ")", "asterisk": "*", "plus": "+",
+    "comma": ",", "hyphen": "-", "period": ".", "slash": "/", "zero": "0",
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "colon": ":",
+    "semicolon": ";", "less": "<", "equal": "=", "greater": ">",
+    "question": "?", "at": "@", "bracketleft": "[", "backslash": "\\",
+    "bracketright": "]", "asciicircum": "^", "underscore": "_",
+    "grave": "`", "braceleft": "{", "bar": "|", "braceright": "}",
+    "asciitilde": "~", "ff": "ff", "fi": "fi", "fl": "fl", "ffi": "ffi",
+    "ffl": "ffl", "quoteleft": 0x2018, "quoteright": 0x2019,
+    "quotedblleft": 0x201c, "quotedblright": 0x201d,
+    "quotesinglbase": 0x201a, "quotedblbase": 0x201e, "endash": 0x2013,
+    "emdash": 0x2014, "bullet": 0x2022, "ellipsis": 0x2026,
+    "dagger": 0x2020, "daggerdbl": 0x2021, "minus": 0x2212,
+    "perthousand": 0x2030, "trademark": 0x2122, "Euro": 0x20ac,
+    "guilsinglleft": 0x2039, "guilsinglright": 0x203a, "fraction": 0x2044,
+    "dotlessi": 0x131, "oe": 0x153, "OE": 0x152, "florin": 0x192,
+    "nbspace": 0xa0, "exclamdown": 0xa1, "cent": 0xa2, "sterling": 0xa3,
+    "currency": 0xa4, "yen": 0xa5, "brokenbar": 0xa6, "section": 0xa7,
+    "dieresis": 0xa8, "copyright": 0xa9, "ordfeminine": 0xaa,
+    "guillemotleft": 0xab, "logicalnot": 0xac, "registered": 0xae,
+    "macron": 0xaf, "degree": 0xb0, "plusminus": 0xb1, "acute": 0xb4,
+    "mu": 0xb5, "paragraph": 0xb6, "periodcentered": 0xb7, "cedilla": 0xb8,
+    "ordmasculine": 0xba, "guillemotright": 0xbb, "questiondown": 0xbf,
+    "AE": 0xc6, "Eth": 0xd0, "multiply": 0xd7, "Oslash": 0xd8,
+    "Thorn": 0xde, "germandbls": 0xdf, "ae": 0xe6, "eth": 0xf0,
+    "divide": 0xf7, "oslash": 0xf8, "thorn": 0xfe,
+}
+# the accents of the names of accented letters, as in "eacute", and their
+# Unicode names
+_ACCENTS = {
+    "acute": "ACUTE", "grave": "GRAVE", "circumflex": "CIRCUMFLEX",
+    "dieresis": "DIAERESIS", "tilde": "TILDE", "cedilla": "CEDILLA",
+    "ring": "RING ABOVE", "caron": "CARON",
+}
+_UNI_NAME = re.compile(r"uni((?:[0-9A-F]{4})+)$")
+_U_NAME = re.compile(r"u([0-9A-F]{4,6})$")
+
+
+def _unhex(digits):
+    digits = _WHITESPACE.sub(_EMPTY, digits)
+    if len(digits) % 2:
+        digits += _ZERO
+    return binascii.unhexlify(digits)
+
+
+def _text(dst):
+    # destination strings are UTF-16BE; the odd broken CMap uses one byte
+    if len(dst) % 2:
+        return dst.decode("latin-1")
+    return dst.decode("utf-16-be", "replace")
+
+
+def _codeBytes(value, length):
+    return binascii.unhexlify(b_("%0*x" % (2 * length, value)))
+
+
+def _character(number):
+    return struct.pack(">I", number).decode("utf-32-be")
+
+
+def glyphText(name):
+    """
+    :return: the text of the glyph called ``name`` (without the slash), or
+        None if it is not known.  Suffixes after a period are ignored, and
+        names joined by underscores stand for the text of each.
+    """
+    if isinstance(name, bytes):
+        name = name.decode("latin-1")
+    name = name.split(".")[0]
+    if "_" in name:
+        parts = [glyphText(part) for part in name.split("_")]
+        if None in parts:
+            return None
+        return u_("").join(parts)
+    text = _GLYPH_NAMES.get(name)
+    if text != None:
+        return _character(text) if isinstance(text, int) else text
+    if len(name) == 1:
+        return name
+    m = _UNI_NAME.match(name)
+    if m != None:
+        digits = m.group(1)
+        return u_("").join([_character(int(digits[i:i + 4], 16))
+                            for i in range(0, len(digits), 4)])
+    m = _U_NAME.match(name)
+    if m != None and int(m.group(1), 16) <= 0x10ffff:
+        return _character(int(m.group(1), 16))
+    accent = _ACCENTS.get(name[1:])
+    if accent != None and name[0].isalpha():
+        case = "CAPITAL" if name[0].isupper() else "SMALL"
+        try:
+            return unicodedata.lookup("LATIN %s LETTER %s WITH %s" %
+                                      (case, name[0].upper(), accent))
+        except KeyError:
+            return None
+    return None
+
+
+class ToUnicode(object):
+    """
+    The mapping from character codes to text given by a /ToUnicode CMap.
+
+    :param bytes data: the decoded data of the CMap stream.
+    """
+    def __init__(self, data):
+        self.map = {}
+        lengths = set()
+        section = None
+        operands = []
+        array = None
+        for m in _TOKEN.finditer(data):
+            digits, openArray, closeArray, keyword, kind = m.groups()
+            if keyword != None:
+                section = kind if keyword == _BEGIN else None
+                operands = []
+                continue
+            elif section == None:
+                continue
+            elif openArray != None:
+                array = []
+                continue
+            elif closeArray != None:
+                operands.append(array)
+                array = None
+            elif array != None:
+                array.append(_unhex(digits))
+                continue
+            else:
+                operands.append(_unhex(digits))
+
+            if section == _CODESPACERANGE and len(operands) == 2:
+                lengths.add(len(operands[0]))
+                operands = []
+            elif section == _BFCHAR and len(operands) == 2:
+                self.map[operands[0]] = _text(operands[1])
+                operands = []
+            elif section == _BFRANGE and len(operands) == 3:
+                self._addRange(*operands)
+                operands = []
+
+        if not lengths:
+            lengths = set(len(code) for code in self.map) or set([1])
+        self.codeLengths = sorted(lengths)
+
+    def _addRange(self, lo, hi, dst):
+        first = int(binascii.hexlify(lo), 16)
+        count = int(binascii.hexlify(hi), 16) - first + 1
+        if not 0 < count <= _MAX_RANGE:
+            return
+        if isinstance(dst, list):
+            for i, d in enumerate(dst[:count]):
+                self.map[_codeBytes(first + i, len(lo))] = _text(d)
+            return
+        if not dst:
+            return
+        # consecutive codes map to consecutive text, incrementing the
+        # destination's last UTF-16 code unit
+        base = int(binascii.hexlify(dst), 16)
+        for i in range(count):
+            self.map[_codeBytes(first + i, len(lo))] = \
+                _text(_codeBytes(base + i, len(dst)))
+
+    def decode(self, data):
+        """
+        :return: the text shown by the string of character codes ``data``;
+            codes the CMap does not map are dropped.
+        """
+        get = self.map.get
+        lengths = self.codeLengths
+        empty = u_("")
+        if len(lengths) == 1:
+            n = lengths[0]
+            return empty.join([get(data[i:i + n], empty)
+                               for i in range(0, len(data), n)])
+        parts = []
+        i = 0
+        while i < len(data):
+            for n in lengths:
+                text = get(data[i:i + n])
+                if text != None:
+                    parts.append(text)
+                    break
+            else:
+                n = lengths[0]
+            i += n
+        return empty.join(parts)
+
+
+class SimpleEncoding(object):
+    """
+    The text of each code of a simple font with an /Encoding dictionary.
+
+    :param str base: the Python codec of its /BaseEncoding, or None for
+        Latin-1.
+    :param list differences: its /Differences array, of code numbers each
+        followed by the glyph names of that and the next codes.  Codes of
+        glyphs with names not known are dropped.
+    """
+    def __init__(self, base, differences):
+        codes = bytes(bytearray(range(256)))
+        self.map = list(codes.decode(base or "latin-1", "replace"))
+        code = 0
+        for item in differences:
+            if isinstance(item, int):
+                code = item
+                continue
+            if 0 <= code < 256:
+                self.map[code] = glyphText(item[1:]) or u_("")
+            code += 1
+
+    def decode(self, data):
+        """
+        :return: the text shown by the string of character codes ``data``.
+        """
+        table = self.map
+        return u_("").join([table[code] for code in bytearray(data)])
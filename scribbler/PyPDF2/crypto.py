@@ -0,0 +1,259 @@
+"""
+Ciphers used by the PDF standard security handler.
+
+Everything that decrypts a PDF goes through the module-level functions here,
+which forward to a *backend*: any object with ``rc4``, ``aesCbcEncrypt`` and
+``aesCbcDecrypt`` methods (see :class:`PythonBackend`).  The pure-Python
+backend always works; when the ``cryptography`` package is installed its
+native ciphers are used instead.  :func:`setBackend` plugs in another one.
+"""
+
+import struct
+
+from . import utils
+from .utils import PdfReadError
+
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None
+
+
+# AES tables, derived once from the field arithmetic rather than written out.
+def _buildTables():
+    exp, log = [0] * 256, [0] * 256
+    x = 1
+    for i in range(255):
+        exp[i] = x
+        log[x] = i
+        # multiply by the generator, 3
+        x ^= (x << 1) ^ (0x11b if x & 0x80 else 0)
+    def mul(a, b):
+        if a == 0 or b == 0:
+            return 0
+        return exp[(log[a] + log[b]) % 255]
+
+    sbox, invSbox = [0] * 256, [0] * 256
+    for a in range(256):
+        s = exp[(255 - log[a]) % 255] if a else 0
+        s ^= ((s << 1) | (s >> 7)) ^ ((s << 2) | (s >> 6)) ^ \
+             ((s << 3) | (s >> 5)) ^ ((s << 4) | (s >> 4))
+        s = (s ^ 0x63) & 0xff
+        sbox[a] = s
+        invSbox[s] = a
+
+    def rotations(t0):
+        t1 = [(t >> 8) | ((t & 0xff) << 24) for t in t0]
+        t2 = [(t >> 8) | ((t & 0xff) << 24) for t in t1]
+        t3 = [(t >> 8) | ((t & 0xff) << 24) for t in t2]
+        return t0, t1, t2, t3
+
+    te = rotations([(mul(s, 2) << 24) | (s << 16) | (s << 8) | mul(s, 3)
+                    for s in sbox])
+    td = rotations([(mul(s, 14) << 24) | (mul(s, 9) << 16) |
+                    (mul(s, 13) << 8) | mul(s, 11) for s in invSbox])
+    return sbox, invSbox, te, td
+
+_SBOX, _INV_SBOX, _TE, _TD = _buildTables()
+del _buildTables
+
+
+class _AES(object):
+    # A table-driven AES block cipher working on four 32-bit words per block.
+    def __init__(self, key):
+        nk = len(key) // 4
+        if len(key) not in (16, 24, 32):
+            raise PdfReadError("Invalid AES key length %d" % len(key))
+        self.rounds = nk + 6
+        sbox = _SBOX
+        w = list(struct.unpack(">%dI" % nk, key))
+        rcon = 1
+        for i in range(nk, 4 * (self.rounds + 1)):
+            t = w[i - 1]
+            if i % nk == 0:
+                t = ((t << 8) & 0xffffffff) | (t >> 24)
+                t = (sbox[t >> 24] << 24 | sbox[(t >> 16) & 0xff] << 16 |
+                     sbox[(t >> 8) & 0xff] << 8 | sbox[t & 0xff]) ^ (rcon << 24)
+                rcon = (rcon << 1) ^ (0x11b if rcon & 0x80 else 0)
+            elif nk > 6 and i % nk == 4:
+                t = (sbox[t >> 24] << 24 | sbox[(t >> 16) & 0xff] << 16 |
+                     sbox[(t >> 8) & 0xff] << 8 | sbox[t & 0xff])
+            w.append(w[i - nk] ^ t)
+        self.encKey = w
+
+        # the equivalent inverse cipher uses the round keys backwards, with
+        # InvMixColumns applied to all but the first and last
+        td0, td1, td2, td3 = _TD
+        dec = []
+        for r in range(self.rounds, -1, -1):
+            words = w[4 * r:4 * r + 4]
+            if 0 < r < self.rounds:
+                words = [td0[sbox[t >> 24]] ^ td1[sbox[(t >> 16) & 0xff]] ^
+                         td2[sbox[(t >> 8) & 0xff]] ^ td3[sbox[t & 0xff]]
+                         for t in words]
+            dec.extend(words)
+        self.decKey = dec
+
+    def encryptCbc(self, iv, data):
+        if len(data) % 16:
+            raise PdfReadError("AES data is not a whole number of blocks")
+        te0, te1, te2, te3 = _TE
+        sbox = _SBOX
+        k = self.encKey
+        last = 4 * self.rounds
+        words = struct.unpack(">%dI" % (len(data) // 4), data)
+        c0, c1, c2, c3 = struct.unpack(">4I", iv)
+        out = []
+        for b in range(0, len(words), 4):
+            s0 = words[b] ^ c0 ^ k[0]
+            s1 = words[b + 1] ^ c1 ^ k[1]
+            s2 = words[b + 2] ^ c2 ^ k[2]
+            s3 = words[b + 3] ^ c3 ^ k[3]
+            for r in range(4, last, 4):
+                s0, s1, s2, s3 = (
+                    te0[s0 >> 24] ^ te1[(s1 >> 16) & 0xff] ^
+                    te2[(s2 >> 8) & 0xff] ^ te3[s3 & 0xff] ^ k[r],
+                    te0[s1 >> 24] ^ te1[(s2 >> 16) & 0xff] ^
+                    te2[(s3 >> 8) & 0xff] ^ te3[s0 & 0xff] ^ k[r + 1],
+                    te0[s2 >> 24] ^ te1[(s3 >> 16) & 0xff] ^
+                    te2[(s0 >> 8) & 0xff] ^ te3[s1 & 0xff] ^ k[r + 2],
+                    te0[s3 >> 24] ^ te1[(s0 >> 16) & 0xff] ^
+                    te2[(s1 >> 8) & 0xff] ^ te3[s2 & 0xff] ^ k[r + 3])
+            c0 = (sbox[s0 >> 24] << 24 | sbox[(s1 >> 16) & 0xff] << 16 |
+                  sbox[(s2 >> 8) & 0xff] << 8 | sbox[s3 & 0xff]) ^ k[last]
+            c1 = (sbox[s1 >> 24] << 24 | sbox[(s2 >> 16) & 0xff] << 16 |
+                  sbox[(s3 >> 8) & 0xff] << 8 | sbox[s0 & 0xff]) ^ k[last + 1]
+            c2 = (sbox[s2 >> 24] << 24 | sbox[(s3 >> 16) & 0xff] << 16 |
+                  sbox[(s0 >> 8) & 0xff] << 8 | sbox[s1 & 0xff]) ^ k[last + 2]
+            c3 = (sbox[s3 >> 24] << 24 | sbox[(s0 >> 16) & 0xff] << 16 |
+                  sbox[(s1 >> 8) & 0xff] << 8 | sbox[s2 & 0xff]) ^ k[last + 3]
+            out.extend((c0, c1, c2, c3))
+        return struct.pack(">%dI" % len(out), *out)
+
+    def decryptCbc(self, iv, data):
+        if len(data) % 16:
+            raise PdfReadError("AES data is not a whole number of blocks")
+        td0, td1, td2, td3 = _TD
+        isbox = _INV_SBOX
+        k = self.decKey
+        last = 4 * self.rounds
+        words = struct.unpack(">%dI" % (len(data) // 4), data)
+        p0, p1, p2, p3 = struct.unpack(">4I", iv)
+        out = []
+        for b in range(0, len(words), 4):
+            w0, w1, w2, w3 = words[b:b + 4]
+            s0, s1, s2, s3 = w0 ^ k[0], w1 ^ k[1], w2 ^ k[2], w3 ^ k[3]
+            for r in range(4, last, 4):
+                s0, s1, s2, s3 = (
+                    td0[s0 >> 24] ^ td1[(s3 >> 16) & 0xff] ^
+                    td2[(s2 >> 8) & 0xff] ^ td3[s1 & 0xff] ^ k[r],
+                    td0[s1 >> 24] ^ td1[(s0 >> 16) & 0xff] ^
+                    td2[(s3 >> 8) & 0xff] ^ td3[s2 & 0xff] ^ k[r + 1],
+                    td0[s2 >> 24] ^ td1[(s1 >> 16) & 0xff] ^
+                    td2[(s0 >> 8) & 0xff] ^ td3[s3 & 0xff] ^ k[r + 2],
+                    td0[s3 >> 24] ^ td1[(s2 >> 16) & 0xff] ^
+                    td2[(s1 >> 8) & 0xff] ^ td3[s0 & 0xff] ^ k[r + 3])
+            out.extend((
+                (isbox[s0 >> 24] << 24 | isbox[(s3 >> 16) & 0xff] << 16 |
+                 isbox[(s2 >> 8) & 0xff] << 8 | isbox[s1 & 0xff]) ^ k[last] ^ p0,
+                (isbox[s1 >> 24] << 24 | isbox[(s0 >> 16) & 0xff] << 16 |
+                 isbox[(s3 >> 8) & 0xff] << 8 | isbox[s2 & 0xff]) ^ k[last + 1] ^ p1,
+                (isbox[s2 >> 24] << 24 | isbox[(s1 >> 16) & 0xff] << 16 |
+                 isbox[(s0 >> 8) & 0xff] << 8 | isbox[s3 & 0xff]) ^ k[last + 2] ^ p2,
+                (isbox[s3 >> 24] << 24 | isbox[(s2 >> 16) & 0xff] << 16 |
+                 isbox[(s1 >> 8) & 0xff] << 8 | isbox[s0 & 0xff]) ^ k[last + 3] ^ p3))
+            p0, p1, p2, p3 = w0, w1, w2, w3
+        return struct.pack(">%dI" % len(out), *out)
+
+
+class PythonBackend(object):
+    """
+    Pure-Python ciphers.  AES data must be a whole number of 16-byte blocks;
+    padding is dealt with by :func:`aesDecrypt`.
+    """
+    def rc4(self, key, data):
+        return utils.RC4_encrypt(key, data)
+
+    def aesCbcEncrypt(self, key, iv, data):
+        return _AES(key).encryptCbc(iv, data)
+
+    def aesCbcDecrypt(self, key, iv, data):
+        return _AES(key).decryptCbc(iv, data)
+
+
+class CryptographyBackend(object):
+    """
+    Ciphers from the ``cryptography`` package.
+    """
+    def rc4(self, key, data):
+        decryptor = Cipher(algorithms.ARC4(key), None,
+                           default_backend()).decryptor()
+        return decryptor.update(data) + decryptor.finalize()
+
+    def aesCbcEncrypt(self, key, iv, data):
+        encryptor = Cipher(algorithms.AES(key), modes.CBC(iv),
+                           default_backend()).encryptor()
+        return encryptor.update(data) + encryptor.finalize()
+
+    def aesCbcDecrypt(self, key, iv, data):
+        decryptor = Cipher(algorithms.AES(key), modes.CBC(iv),
+                           default_backend()).decryptor()
+        return decryptor.update(data) + decryptor.finalize()
+
+
+_backend = PythonBackend() if Cipher == None else CryptographyBackend()
+
+
+def getBackend():
+    """
+    :return: the backend currently used for decryption.
+    """
+    return _backend
+
+
+def setBackend(backend):
+    """
+    Makes ``backend`` do all further encryption and decryption.
+
+    :param backend: an object with the methods of :class:`PythonBackend`.
+    """
+    global _backend
+    _backend = backend
+
+
+def rc4(key, data):
+    """
+    Encrypts or decrypts ``data`` with RC4.
+    """
+    return _backend.rc4(key, data)
+
+
+def aesCbcEncrypt(key, iv, data):
+    """
+    Encrypts whole blocks of ``data`` with AES in CBC mode, without padding.
+    """
+    return _backend.aesCbcEncrypt(key, iv, data)
+
+
+def aesCbcDecrypt(key, iv, data):
+    """
+    Decrypts whole blocks of ``data`` with AES in CBC mode, without padding.
+    """
+    return _backend.aesCbcDecrypt(key, iv, data)
+
+
+def aesDecrypt(key, data):
+    """
+    Decrypts a string or stream encrypted by the /AESV2 or /AESV3 crypt
+    filters: a 16-byte initialisation vector followed by the ciphertext of
+    the data padded as in RFC 2898.
+    """
+    if len(data) < 32:
+        # not even one block of padding after the initialisation vector
+        return utils.b_("")
+    data = _backend.aesCbcDecrypt(key, data[:16], data[16:len(data) // 16 * 16])
+    padding = utils.ord_(data[-1])
+    if 1 <= padding <= 16:
+        data = data[:-padding]
+    return data
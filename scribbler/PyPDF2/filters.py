@@ -34,7 +34,8 @@ Implementation of stream filters for PDF.
 __author__ = "Mathieu Fenniak"
 __author_email__ = "biziqe@mathieu.fenniak.net"
 
-from .utils import PdfReadError, ord_, chr_
+from .utils import PdfReadError, ord_, chr_, string_type
+from binascii import hexlify, unhexlify
 from sys import version_info
 if version_info < ( 3, 0 ):
     from cStringIO import StringIO
@@ -42,6 +43,11 @@ else:
     from io import StringIO
     import struct
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 try:
     import zlib
 
@@ -106,47 +112,198 @@ except ImportError:
         return retval
 
 
+def _unpredict(data, decodeParms):
+    """
+    Undoes the predictor, if any, described by the /DecodeParms of a
+    /FlateDecode or /LZWDecode stream.
+    """
+    predictor = 1
+    if decodeParms:
+        try:
+            predictor = decodeParms.get("/Predictor", 1)
+        except AttributeError:
+            pass    # usually an array with a null object was read
+
+    # predictor 1 == no predictor
+    if predictor == 1:
+        return data
+    colors = decodeParms.get("/Colors", 1)
+    bitsPerComponent = decodeParms.get("/BitsPerComponent", 8)
+    columns = decodeParms.get("/Columns", 1)
+    rowlength = (colors * bitsPerComponent * columns + 7) // 8
+    if predictor >= 10 and predictor <= 15:
+        # PNG prediction, which can vary from row to row.  Filters work on
+        # whole bytes, comparing each with the one a pixel (rounded up to a
+        # byte) before it.
+        bpp = (colors * bitsPerComponent + 7) // 8
+        return _pngUnpredict(data, rowlength, bpp)
+    elif predictor == 2:
+        return _tiffUnpredict(data, rowlength, colors, bitsPerComponent,
+                              columns)
+    else:
+        # unsupported predictor
+        raise PdfReadError("Unsupported flatedecode predictor %r" % predictor)
+
+
+def _pngUnpredict(data, rowlength, bpp):
+    stride = rowlength + 1
+    if len(data) % stride != 0:
+        raise PdfReadError("PNG predictor data isn't a whole number of rows")
+    if numpy != None:
+        return _pngUnpredictArray(data, rowlength, bpp)
+    data = bytearray(data)
+    output = bytearray()
+    prev = bytearray(rowlength)
+    for start in range(0, len(data), stride):
+        row = _pngUnfilterRow(data[start], data[start+1:start+stride], prev, bpp)
+        output += row
+        prev = row
+    return bytes(output)
+
+
+def _pngUnpredictArray(data, rowlength, bpp):
+    # As _pngUnpredict, using NumPy.  A run of rows using the Up filter is
+    # a running sum down the columns, and a row using the Sub filter is a
+    # running sum along each of its pixel components, so those are done as
+    # whole-array operations.  uint8 arithmetic wraps around modulo 256.
+    rows = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, rowlength + 1)
+    filterTypes = rows[:, 0].tolist()
+    output = rows[:, 1:].copy()
+    prev = numpy.zeros(rowlength, dtype=numpy.uint8)
+    i = 0
+    while i < len(filterTypes):
+        filterType = filterTypes[i]
+        if filterType == 2:
+            end = i + 1
+            while end < len(filterTypes) and filterTypes[end] == 2:
+                end += 1
+            output[i:end] = numpy.cumsum(output[i:end], axis=0,
+                                         dtype=numpy.uint8) + prev
+            i = end
+        else:
+            row = output[i]
+            if filterType == 1 and rowlength % bpp == 0:
+                row[:] = numpy.cumsum(row.reshape(-1, bpp), axis=0,
+                                      dtype=numpy.uint8).ravel()
+            elif filterType != 0:
+                row[:] = numpy.frombuffer(bytes(_pngUnfilterRow(
+                    filterType, bytearray(row.tobytes()),
+                    bytearray(prev.tobytes()), bpp)), dtype=numpy.uint8)
+            i += 1
+        prev = output[i - 1]
+    return output.tobytes()
+
+
+def _pngUnfilterRow(filterType, row, prev, bpp):
+    # Undoes one PNG filter on row (a bytearray, changed in place), given
+    # the already decoded row before it.
+    if filterType == 0:
+        pass
+    elif filterType == 1:
+        # Sub
+        for i in range(bpp, len(row)):
+            row[i] = (row[i] + row[i-bpp]) & 0xff
+    elif filterType == 2:
+        # Up
+        row = _addBytes(row, prev)
+    elif filterType == 3:
+        # Average
+        for i in range(min(bpp, len(row))):
+            row[i] = (row[i] + (prev[i] >> 1)) & 0xff
+        for i in range(bpp, len(row)):
+            row[i] = (row[i] + ((row[i-bpp] + prev[i]) >> 1)) & 0xff
+    elif filterType == 4:
+        # Paeth
+        for i in range(len(row)):
+            up = prev[i]
+            if i >= bpp:
+                left = row[i-bpp]
+                upLeft = prev[i-bpp]
+            else:
+                left = upLeft = 0
+            p = left + up - upLeft
+            pLeft = abs(p - left)
+            pUp = abs(p - up)
+            pUpLeft = abs(p - upLeft)
+            if pLeft <= pUp and pLeft <= pUpLeft:
+                row[i] = (row[i] + left) & 0xff
+            elif pUp <= pUpLeft:
+                row[i] = (row[i] + up) & 0xff
+            else:
+                row[i] = (row[i] + upLeft) & 0xff
+    else:
+        # unsupported PNG filter
+        raise PdfReadError("Unsupported PNG filter %r" % filterType)
+    return row
+
+
+_lowBits = {}
+
+
+def _addBytes(a, b):
+    # Adds two equally long byte strings byte by byte, modulo 256, with one
+    # wide integer addition.  The top bit of every byte is masked off first
+    # so that no carry can spill into the next byte, then put back by xor.
+    n = len(a)
+    if n == 0:
+        return bytearray()
+    low = _lowBits.get(n)
+    if low == None:
+        low = _lowBits[n] = int("7f" * n, 16)
+    x = int(hexlify(a), 16)
+    y = int(hexlify(b), 16)
+    total = ((x & low) + (y & low)) ^ ((x ^ y) & ~low)
+    return bytearray(unhexlify("%0*x" % (2 * n, total)))
+
+
+def _tiffUnpredict(data, rowlength, colors, bitsPerComponent, columns):
+    # TIFF predictor 2: each component is stored as the difference from the
+    # same component of the pixel to its left.
+    if len(data) % rowlength != 0:
+        raise PdfReadError("TIFF predictor data isn't a whole number of rows")
+    if bitsPerComponent == 8 and numpy != None:
+        rows = numpy.frombuffer(data, dtype=numpy.uint8)
+        rows = rows.reshape(-1, rowlength // colors, colors)
+        return numpy.cumsum(rows, axis=1, dtype=numpy.uint8).tobytes()
+    data = bytearray(data)
+    output = bytearray()
+    if bitsPerComponent == 8:
+        for start in range(0, len(data), rowlength):
+            output += _pngUnfilterRow(1, data[start:start+rowlength], None, colors)
+    elif bitsPerComponent == 16:
+        for start in range(0, len(data), rowlength):
+            row = data[start:start+rowlength]
+            for i in range(2 * colors, rowlength - 1, 2):
+                value = ((row[i] << 8) + row[i+1] +
+                         (row[i-2*colors] << 8) + row[i-2*colors+1]) & 0xffff
+                row[i] = value >> 8
+                row[i+1] = value & 0xff
+            output += row
+    elif bitsPerComponent in (1, 2, 4):
+        perByte = 8 // bitsPerComponent
+        mask = (1 << bitsPerComponent) - 1
+        shifts = [8 - bitsPerComponent * (k + 1) for k in range(perByte)]
+        for start in range(0, len(data), rowlength):
+            components = [(byte >> shift) & mask
+                          for byte in data[start:start+rowlength]
+                          for shift in shifts]
+            for i in range(colors, colors * columns):
+                components[i] = (components[i] + components[i-colors]) & mask
+            for i in range(rowlength):
+                byte = 0
+                for k in range(perByte):
+                    byte |= components[i * perByte + k] << shifts[k]
+                output.append(byte)
+    else:
+        raise PdfReadError("Unsupported bits per component %r for TIFF predictor"
+                           % bitsPerComponent)
+    return bytes(output)
+
+
 class FlateDecode(object):
     def decode(data, decodeParms):
         data = decompress(data)
-        predictor = 1
-        if decodeParms:
-            try:
-                predictor = decodeParms.get("/Predictor", 1)
-            except AttributeError:
-                pass    # usually an array with a null object was read
-
-        # predictor 1 == no predictor
-        if predictor != 1:
-            columns = decodeParms["/Columns"]
-            # PNG prediction:
-            if predictor >= 10 and predictor <= 15:
-                output = StringIO()
-                # PNG prediction can vary from row to row
-                rowlength = columns + 1
-                assert len(data) % rowlength == 0
-                prev_rowdata = (0,) * rowlength
-                for row in range(len(data) // rowlength):
-                    rowdata = [ord_(x) for x in data[(row*rowlength):((row+1)*rowlength)]]
-                    filterByte = rowdata[0]
-                    if filterByte == 0:
-                        pass
-                    elif filterByte == 1:
-                        for i in range(2, rowlength):
-                            rowdata[i] = (rowdata[i] + rowdata[i-1]) % 256
-                    elif filterByte == 2:
-                        for i in range(1, rowlength):
-                            rowdata[i] = (rowdata[i] + prev_rowdata[i]) % 256
-                    else:
-                        # unsupported PNG filter
-                        raise PdfReadError("Unsupported PNG filter %r" % filterByte)
-                    prev_rowdata = rowdata
-                    output.write(''.join([chr(x) for x in rowdata[1:]]))
-                data = output.getvalue()
-            else:
-                # unsupported predictor
-                raise PdfReadError("Unsupported flatedecode predictor %r" % predictor)
-        return data
+        return _unpredict(data, decodeParms)
     decode = staticmethod(decode)
 
     def encode(data):
@@ -177,160 +334,225 @@ class ASCIIHexDecode(object):
 
 
 class LZWDecode(object):
-    """Taken from:
-    http://www.java2s.com/Open-Source/Java-Document/PDF/PDF-Renderer/com/sun/pdfview/decode/LZWDecode.java.htm
     """
-    class decoder(object):
-        def __init__(self, data):
-            self.STOP=257
-            self.CLEARDICT=256
-            self.data=data
-            self.bytepos=0
-            self.bitpos=0
-            self.dict=[""]*4096
-            for i in range(256):
-                self.dict[i]=chr(i)
-            self.resetDict()
-
-        def resetDict(self):
-            self.dictlen=258
-            self.bitspercode=9
-
-        def nextCode(self):
-            fillbits=self.bitspercode
-            value=0
-            while fillbits>0 :
-                if self.bytepos >= len(self.data):
-                    return -1
-                nextbits=ord(self.data[self.bytepos])
-                bitsfromhere=8-self.bitpos
-                if bitsfromhere>fillbits:
-                    bitsfromhere=fillbits
-                value |= (((nextbits >> (8-self.bitpos-bitsfromhere)) &
-                           (0xff >> (8-bitsfromhere))) <<
-                          (fillbits-bitsfromhere))
-                fillbits -= bitsfromhere
-                self.bitpos += bitsfromhere
-                if self.bitpos >=8:
-                    self.bitpos=0
-                    self.bytepos = self.bytepos+1
-            return value
-
-        def decode(self):
-            """ algorithm derived from:
-            http://www.rasip.fer.hr/research/compress/algorithms/fund/lz/lzw.html
-            and the PDFReference
-            """
-            cW = self.CLEARDICT;
-            baos=""
-            while True:
-                pW = cW;
-                cW = self.nextCode();
-                if cW == -1:
-                    raise PdfReadError("Missed the stop code in LZWDecode!")
-                if cW == self.STOP:
-                    break;
-                elif cW == self.CLEARDICT:
-                    self.resetDict();
-                elif pW == self.CLEARDICT:
-                    baos+=self.dict[cW]
+    Lempel-Ziv-Welch compression, with codes growing from 9 to 12 bits as
+    described in the PDF Reference, section 3.3.3.
+    """
+    CLEARDICT = 256
+    STOP = 257
+
+    @staticmethod
+    def decode(data, decodeParams=None):
+        earlyChange = 1
+        if decodeParams:
+            try:
+                earlyChange = decodeParams.get("/EarlyChange", 1)
+            except AttributeError:
+                pass    # usually an array with a null object was read
+        data = LZWDecode._decode(bytearray(data), earlyChange)
+        return _unpredict(data, decodeParams)
+
+    @staticmethod
+    def _decode(data, earlyChange):
+        # The table is a list of byte strings indexed by code, so each code
+        # costs one lookup and one append to the output.
+        table = [bytes(bytearray([i])) for i in range(256)] + [None, None]
+        output = bytearray()
+        prev = None
+        bits = 9
+        buffered = 0    # bits read but not yet used, and how many there are
+        nbuffered = 0
+        for byte in data:
+            buffered = (buffered << 8) | byte
+            nbuffered += 8
+            while nbuffered >= bits:
+                nbuffered -= bits
+                code = buffered >> nbuffered
+                buffered &= (1 << nbuffered) - 1
+                if code == LZWDecode.CLEARDICT:
+                    del table[258:]
+                    bits = 9
+                    prev = None
+                    continue
+                elif code == LZWDecode.STOP:
+                    return bytes(output)
+                elif prev == None:
+                    entry = table[code]
                 else:
-                    if cW < self.dictlen:
-                        baos += self.dict[cW]
-                        p=self.dict[pW]+self.dict[cW][0]
-                        self.dict[self.dictlen]=p
-                        self.dictlen+=1
+                    if code < len(table):
+                        entry = table[code]
+                        table.append(prev + entry[:1])
+                    elif code == len(table):
+                        entry = prev + prev[:1]
+                        table.append(entry)
                     else:
-                        p=self.dict[pW]+self.dict[pW][0]
-                        baos+=p
-                        self.dict[self.dictlen] = p;
-                        self.dictlen+=1
-                    if (self.dictlen >= (1 << self.bitspercode) - 1 and
-                        self.bitspercode < 12):
-                        self.bitspercode+=1
-            return baos
+                        raise PdfReadError("Invalid code %d in LZWDecode" % code)
+                    if len(table) + earlyChange >= (1 << bits) and bits < 12:
+                        bits += 1
+                output += entry
+                prev = entry
+        raise PdfReadError("Missed the stop code in LZWDecode!")
 
     @staticmethod
-    def decode(data,decodeParams=None):
-        return LZWDecode.decoder(data).decode()
+    def encode(data):
+        """
+        Compresses data into the form read by :meth:`decode` (with the
+        default /EarlyChange of 1).
+        """
+        data = bytes(data)
+        output = bytearray()
+        state = [0, 0, 258]     # bit buffer, bits in it, decoder table size
+
+        def emit(code, added):
+            # The decoder adds each table entry one code later than the
+            # encoder does, so the width it reads codes at follows its own
+            # table size, which is tracked here.
+            buffered, nbuffered, decoded = state
+            bits = 9
+            while bits < 12 and decoded + 1 >= (1 << bits):
+                bits += 1
+            buffered = (buffered << bits) | code
+            nbuffered += bits
+            while nbuffered >= 8:
+                nbuffered -= 8
+                output.append((buffered >> nbuffered) & 0xff)
+            buffered &= (1 << nbuffered) - 1
+            state[:] = [buffered, nbuffered, decoded + added]
+
+        def reset():
+            return dict((bytes(bytearray([i])), i) for i in range(256))
+
+        table = reset()
+        emit(LZWDecode.CLEARDICT, 0)
+        first = True
+        word = bytes(bytearray())
+        for i in range(len(data)):
+            char = data[i:i+1]
+            extended = word + char
+            if extended in table:
+                word = extended
+                continue
+            emit(table[word], 0 if first else 1)
+            first = False
+            table[extended] = len(table) + 2
+            word = char
+            if len(table) + 2 == 4096:
+                emit(LZWDecode.CLEARDICT, 0)
+                state[2] = 258
+                table = reset()
+                first = True
+        if word:
+            emit(table[word], 0 if first else 1)
+        emit(LZWDecode.STOP, 0)
+        if state[1]:
+            output.append((state[0] << (8 - state[1])) & 0xff)
+        return bytes(output)
+
+
+try:
+    from base64 import a85encode
+except ImportError:
+    # Python 2
+    a85encode = None
 
 
 class ASCII85Decode(object):
     def decode(data, decodeParms=None):
-        if version_info < ( 3, 0 ):
-            retval = ""
-            group = []
-            x = 0
-            hitEod = False
-            # remove all whitespace from data
-            data = [y for y in data if not (y in ' \n\r\t')]
-            while not hitEod:
-                c = data[x]
-                if len(retval) == 0 and c == "<" and data[x+1] == "~":
-                    x += 2
-                    continue
-                #elif c.isspace():
-                #    x += 1
-                #    continue
-                elif c == 'z':
-                    assert len(group) == 0
-                    retval += '\x00\x00\x00\x00'
-                    x += 1
-                    continue
-                elif c == "~" and data[x+1] == ">":
-                    if len(group) != 0:
-                        # cannot have a final group of just 1 char
-                        assert len(group) > 1
-                        cnt = len(group) - 1
-                        group += [ 85, 85, 85 ]
-                        hitEod = cnt
-                    else:
-                        break
-                else:
-                    c = ord(c) - 33
-                    assert c >= 0 and c < 85
-                    group += [ c ]
-                if len(group) >= 5:
-                    b = group[0] * (85**4) + \
-                        group[1] * (85**3) + \
-                        group[2] * (85**2) + \
-                        group[3] * 85 + \
-                        group[4]
-                    assert b < (2**32 - 1)
-                    c4 = chr((b >> 0) % 256)
-                    c3 = chr((b >> 8) % 256)
-                    c2 = chr((b >> 16) % 256)
-                    c1 = chr(b >> 24)
-                    retval += (c1 + c2 + c3 + c4)
-                    if hitEod:
-                        retval = retval[:-4+hitEod]
-                    group = []
-                x += 1
-            return retval
-        else:
-            if isinstance(data, str):
-                data = data.encode('ascii')
-            n = b = 0
-            out = bytearray()
-            for c in data:
-                if ord('!') <= c and c <= ord('u'):
-                    n += 1
-                    b = b*85+(c-33)
-                    if n == 5:
-                        out += struct.pack(b'>L',b)
-                        n = b = 0
-                elif c == ord('z'):
-                    assert n == 0
-                    out += b'\0\0\0\0'
-                elif c == ord('~'):
-                    if n:
-                        for _ in range(5-n):
-                            b = b*85+84
-                        out += struct.pack(b'>L',b)[:n-1]
-                    break
-            return bytes(out)
+        return ASCII85Decode._decode(data)
     decode = staticmethod(decode)
 
+    @staticmethod
+    def _decode(data):
+        # Decodes every 5-character group at once.  Each of the five digit
+        # positions is spread into its own wide integer with one 40-bit lane
+        # per group, and the lanes are combined by Horner's rule, so the
+        # arithmetic for all groups happens inside a few big-integer
+        # operations.  A group is below 85**5 < 2**33, so nothing carries
+        # from one lane into the next, and a group out of range leaves a
+        # non-zero top byte in its lane.  (base64.a85decode is a pure
+        # Python loop, and slower.)
+        if isinstance(data, string_type):
+            data = data.encode('ascii')
+        end = data.find(b'~>')
+        if end != -1:
+            data = data[:end]
+        data = data.translate(None, b' \t\n\r\x0b\x0c\x00')
+        if data.startswith(b'<~'):
+            data = data[2:]
+        if b'z' in data:
+            # z stands for a group of zeros, so may only come between groups
+            pieces = data.split(b'z')
+            for piece in pieces[:-1]:
+                if len(piece) % 5:
+                    raise PdfReadError("z inside an ASCII85 group")
+            data = b'!!!!!'.join(pieces)
+        if data.translate(None, _A85_ALPHABET):
+            raise PdfReadError("Invalid character in ASCII85 stream")
+        padding = -len(data) % 5
+        if padding == 4:
+            # cannot have a final group of just 1 char
+            raise PdfReadError("Truncated ASCII85 stream")
+        data = (data + b'u' * padding).translate(_A85_DIGITS)
+        groups = len(data) // 5
+        if not groups:
+            return b''
+        total = 0
+        for k in range(5):
+            lanes = bytearray(5 * groups)
+            lanes[4::5] = data[k::5]
+            total = total * 85 + _fromBytes(lanes)
+        output = bytearray(_toBytes(total, 5 * groups))
+        if output[0::5].count(b'\x00') != groups:
+            raise PdfReadError("ASCII85 group out of range")
+        del output[0::5]
+        return bytes(output[:4 * groups - padding])
+
+    def encode(data):
+        """
+        Encodes data as ASCII base-85, ending with the ``~>`` end-of-data
+        marker.
+        """
+        if a85encode != None:
+            return a85encode(data, wrapcol=75) + b'~>'
+        data = bytearray(data)
+        padding = -len(data) % 4
+        data += bytearray(padding)
+        output = bytearray()
+        for i in range(0, len(data), 4):
+            b = (data[i] << 24) | (data[i+1] << 16) | (data[i+2] << 8) | data[i+3]
+            if b == 0 and i + 4 <= len(data) - padding:
+                output += b'z'
+                continue
+            group = bytearray(5)
+            for j in range(4, -1, -1):
+                b, group[j] = divmod(b, 85)
+                group[j] += 33
+            output += group
+        if padding:
+            del output[-padding:]
+        return bytes(output + b'~>')
+    encode = staticmethod(encode)
+
+
+if hasattr(int, 'from_bytes'):
+    def _fromBytes(data):
+        return int.from_bytes(data, 'big')
+
+    def _toBytes(n, length):
+        return n.to_bytes(length, 'big')
+else:
+    # Python 2 has no int.from_bytes, but converts between longs and hex
+    # digits in linear time
+    def _fromBytes(data):
+        return int(hexlify(data), 16)
+
+    def _toBytes(n, length):
+        return unhexlify('%0*x' % (2 * length, n))
+
+
+_A85_ALPHABET = bytes(bytearray(range(33, 118)))
+_A85_DIGITS = bytes(bytearray((i - 33) % 256 for i in range(256)))
+
 
 def decodeStreamData(stream):
     from .generic import NameObject
@@ -42,6 +42,7 @@ import warnings
 from . import filters
 from . import utils
 import decimal
+import math
 import codecs
 import sys
 #import debugging
@@ -99,12 +100,18 @@ def readObject(stream, pdf):
 
 
 class PdfObject(object):
+    # the leaf object classes define __slots__ too, so that the many numbers,
+    # names and references in a file carry no instance dictionary
+    __slots__ = ()
+
     def getObject(self):
         """Resolves indirect references."""
         return self
 
 
 class NullObject(PdfObject):
+    __slots__ = ()
+
     def writeToStream(self, stream, encryption_key):
         stream.write(b_("null"))
 
@@ -117,6 +124,8 @@ class NullObject(PdfObject):
 
 
 class BooleanObject(PdfObject):
+    __slots__ = ("value",)
+
     def __init__(self, value):
         self.value = value
 
@@ -169,6 +178,8 @@ class ArrayObject(list, PdfObject):
 
 
 class IndirectObject(PdfObject):
+    __slots__ = ("idnum", "generation", "pdf")
+
     def __init__(self, idnum, generation, pdf):
         self.idnum = idnum
         self.generation = generation
@@ -223,28 +234,47 @@ class IndirectObject(PdfObject):
     readFromStream = staticmethod(readFromStream)
 
 
-class FloatObject(decimal.Decimal, PdfObject):
+class FloatObject(float, PdfObject):
+    """
+    A real number.  Arithmetic is done in native floats; when written out,
+    the number is given in the shortest decimal form that reads back as the
+    same float, and never in exponent notation, which PDF does not allow.
+    """
+    __slots__ = ()
+
     def __new__(cls, value="0", context=None):
-        try:
-            return decimal.Decimal.__new__(cls, utils.str_(value), context)
-        except:
-            return decimal.Decimal.__new__(cls, str(value))
+        # context is accepted for compatibility with the old Decimal-based
+        # class and ignored
+        return float.__new__(cls, value)
+
+    # the largest real number a PDF reader is sure to take, written out in
+    # place of an infinity
+    LargestReal = 3.403e38
 
     def __repr__(self):
-        if self == self.to_integral():
-            return str(self.quantize(decimal.Decimal(1)))
-        else:
-            # XXX: this adds useless extraneous zeros.
-            return "%.5f" % self
+        r = float.__repr__(self)
+        if r.endswith(".0"):
+            return r[:-2]
+        if "e" in r or "n" in r:
+            # PDF has no exponents, infinities or NaNs
+            if self != self:
+                return "0"
+            if r.endswith("inf"):
+                r = repr(math.copysign(self.LargestReal, self))
+            r = format(decimal.Decimal(r), "f")
+            if r.endswith(".0"):
+                r = r[:-2]
+        return r
 
     def as_numeric(self):
-        return float(b_(repr(self)))
+        return float(self)
 
     def writeToStream(self, stream, encryption_key):
         stream.write(b_(repr(self)))
 
 
 class NumberObject(int, PdfObject):
+    __slots__ = ()
     NumberPattern = re.compile(b_('[^+-.0-9]'))
     ByteDot = b_(".")
 
@@ -394,6 +424,7 @@ def readStringFromStream(stream):
 # represent strings -- for example, the encryption data stored in files (like
 # /O) is clearly not text, but is still stored in a "String" object.
 class ByteStringObject(utils.bytes_type, PdfObject):
+    __slots__ = ()
 
     ##
     # For compatibility with TextStringObject.original_bytes.  This method
@@ -461,8 +492,28 @@ class TextStringObject(utils.string_type, PdfObject):
 
 
 class NameObject(str, PdfObject):
+    __slots__ = ()
     delimiterPattern = re.compile(b_(r"\s+|[\(\)<>\[\]{}/%]"))
     surfix = b_("/")
+    # names read from files, by their bytes.  The same few dozen keys recur
+    # in every dictionary, so they are shared rather than created anew each
+    # time (which also lets dict lookups reuse their cached hashes).
+    _interned = {}
+    _internLimit = 4096
+
+    def fromBytes(name):
+        """
+        :return: the name whose UTF-8 encoding (with the leading ``/``) is
+            ``name``, shared with other names read from the same bytes.
+        :raises UnicodeDecodeError: if ``name`` is not UTF-8.
+        """
+        obj = NameObject._interned.get(name)
+        if obj == None:
+            obj = NameObject(name.decode('utf-8'))
+            if len(NameObject._interned) < NameObject._internLimit:
+                NameObject._interned[name] = obj
+        return obj
+    fromBytes = staticmethod(fromBytes)
 
     def writeToStream(self, stream, encryption_key):
         stream.write(b_(self))
@@ -477,7 +528,7 @@ class NameObject(str, PdfObject):
             ignore_eof=True)
         if debug: print(name)
         try:
-            return NameObject(name.decode('utf-8'))
+            return NameObject.fromBytes(name)
         except (UnicodeEncodeError, UnicodeDecodeError) as e:
             # Name objects should represent irregular characters
             # with a '#' followed by the symbol's hex number
@@ -509,7 +560,10 @@ class DictionaryObject(dict, PdfObject):
         return dict.setdefault(self, key, value)
 
     def __getitem__(self, key):
-        return dict.__getitem__(self, key).getObject()
+        value = dict.__getitem__(self, key)
+        if isinstance(value, IndirectObject):
+            return value.getObject()
+        return value
 
     ##
     # Retrieves XMP (Extensible Metadata Platform) data relevant to the
@@ -769,10 +823,27 @@ class TreeObject(DictionaryObject):
 
 
 class StreamObject(DictionaryObject):
+    # A stream read from an encrypted file keeps its ciphertext, and the
+    # function that decrypts it, until the data is first used.
+    _rawData = None
+    _decryptor = None
+
     def __init__(self):
         self._data = None
         self.decodedSelf = None
 
+    def _getData(self):
+        if self._decryptor != None:
+            self._rawData = self._decryptor(self._rawData)
+            self._decryptor = None
+        return self._rawData
+
+    def _setData(self, data):
+        self._rawData = data
+        self._decryptor = None
+
+    _data = property(_getData, _setData)
+
     def writeToStream(self, stream, encryption_key):
         self[NameObject("/Length")] = NumberObject(len(self._data))
         DictionaryObject.writeToStream(self, stream, encryption_key)
@@ -823,13 +894,27 @@ class DecodedStreamObject(StreamObject):
 
 
 class EncodedStreamObject(StreamObject):
+    # Set by the PdfFileReader the stream was read from: a
+    # :class:`SizedCache<PyPDF2.utils.SizedCache>` of decoded data shared by
+    # all of its streams, so that the memory they hold stays bounded.
+    _decodeCache = None
+
     def __init__(self):
         self.decodedSelf = None
 
     def getData(self):
-        if self.decodedSelf:
+        if self.decodedSelf != None:
             # cached version of decoded object
             return self.decodedSelf.getData()
+        cache = self._decodeCache
+        if cache != None:
+            # keyed by id(); holding the stream in the entry keeps that unique
+            entry = cache.get(id(self))
+            if entry != None:
+                return entry[1]
+            data = filters.decodeStreamData(self)
+            cache.put(id(self), (self, data), len(data))
+            return data
         else:
             # create decoded object
             decoded = DecodedStreamObject()
@@ -0,0 +1,341 @@
+"""
+Parses PDF objects straight out of an in-memory buffer.
+
+:class:`PdfFileReader<PyPDF2.PdfFileReader>` uses this in place of
+:func:`readObject<PyPDF2.generic.readObject>`, which pulls the file through a
+stream object a byte at a time.  Here the whole file is held in one ``bytes``
+object with an integer cursor into it, tokens are recognised with precompiled
+regular expressions matched in place, and only the finished tokens are sliced
+out.  Every method takes the position to start at and returns the position
+after what it read, so parsing can safely re-enter the same lexer (to resolve
+an indirect stream ``/Length``, for instance).
+"""
+
+import binascii
+import re
+import warnings
+
+from . import utils
+from .utils import b_, PdfStreamError
+from .generic import NullObject, BooleanObject, ArrayObject, IndirectObject, \
+    FloatObject, NumberObject, NameObject, DictionaryObject, StreamObject, \
+    createStringObject
+
+# One token, after any whitespace and comments.  Which group matched says
+# what kind of token it is; anything else (or the end of the data) leaves
+# m.lastindex as None.
+_TOKEN = re.compile(b_(r"(?:[\x00\t\n\x0c\r ]+|%[^\r\n]*)*(?:"
+                       r"(/[^\s()<>\[\]{}/%]*)"                # 1 name
+                       r"|(\d+)\s+(\d+)\s+R(?![a-zA-Z])"       # 2, 3 reference
+                       r"|([+\-.0-9]+)"                        # 4 number
+                       r"|(<<)|(<)|(\[)|(\()"                   # 5-8 openers
+                       r"|(>>)|(\])"                            # 9, 10 closers
+                       r"|(true)|(false)|(null))?"))            # 11-13 keywords
+_NAME, _REFERENCE, _NUMBER = 1, 3, 4
+_DICTIONARY, _HEX_STRING, _ARRAY, _STRING = 5, 6, 7, 8
+_DICTIONARY_END, _ARRAY_END = 9, 10
+_TRUE, _FALSE, _NULL = 11, 12, 13
+
+_WHITESPACE = re.compile(b_(r"[\x00\t\n\x0c\r ]*"))
+_INTEGER = re.compile(b_(r"\d+"))
+_STRING_SPECIAL = re.compile(b_(r"[()\\]"))
+_OCTAL = re.compile(b_(r"[0-7]{1,3}"))
+_HEX_DIGITS = re.compile(b_(r"([^>]*)>"))
+_STREAM = re.compile(b_(r"[\x00\t\n\r ]*stream"))
+_STREAM_EOL = re.compile(b_(r" *(?:\r\n|\r|\n)"))
+_ENDSTREAM = re.compile(b_(r"[\x00\t\n\r ]*endstream"))
+_OPERATOR = re.compile(b_(r"[^\x00\t\n\x0c\r ()<>\[\]{}/%]+"))
+# the end of an inline image: EI on its own between white-space characters
+_INLINE_IMAGE_END = re.compile(
+    b_(r"(?<=[\x00\t\n\x0c\r ])EI(?:[\x00\t\n\x0c\r ]|$)"))
+_OBJECT_HEADER = re.compile(
+    b_(r"(?:%[^\r\n]*)?([\x00\s]*)(\d+)([\x00\s]+)(\d+)[\x00\s]*obj[\x00\s]*"))
+
+_BEGIN_IMAGE = b_("BI")
+_CR = b_("\r")
+_DOT = b_(".")
+_EMPTY = b_("")
+_ENDSTREAM_KEYWORD = b_("endstream")
+_EOL = b_("\n\r")
+_IMAGE_DATA = b_("ID")
+_INLINE_IMAGE = b_("INLINE IMAGE")
+_LF = b_("\n")
+_LPAREN = b_("(")
+_RPAREN = b_(")")
+_ZERO = b_("0")
+
+_ESCAPES = {
+    b_("n"): b_("\n"), b_("r"): b_("\r"), b_("t"): b_("\t"),
+    b_("b"): b_("\b"), b_("f"): b_("\f"), b_("c"): b_("\\c"),
+}
+# odd/unnecessary escape sequences we have encountered stand for themselves
+for _c in "()/\\ %<>[]#_&$":
+    _ESCAPES[b_(_c)] = b_(_c)
+del _c
+
+
+class Lexer(object):
+    """
+    Reads PDF objects from a buffer.
+
+    :param bytes data: the buffer to parse.
+    :param pdf: the :class:`PdfFileReader<PyPDF2.PdfFileReader>` that
+        indirect references read from the buffer point into, or None.
+    """
+    def __init__(self, data, pdf):
+        self.data = data
+        self.pdf = pdf
+        self.strict = pdf != None and pdf.strict
+
+    def readObject(self, pos):
+        """
+        Reads the object starting at (or after whitespace at) ``pos``.
+
+        :return: the object and the position just after it.
+        """
+        return self._readObject(_TOKEN.match(self.data, pos))
+
+    def _readObject(self, m):
+        # the object whose first token is m
+        kind = m.lastindex
+        if kind == _NAME:
+            return self._readName(m)
+        elif kind == _NUMBER:
+            num = m.group(_NUMBER)
+            if _DOT in num:
+                return FloatObject(num), m.end()
+            return NumberObject(num), m.end()
+        elif kind == _REFERENCE:
+            return IndirectObject(int(m.group(2)), int(m.group(3)),
+                                  self.pdf), m.end()
+        elif kind == _DICTIONARY:
+            return self._readDictionary(m.end())
+        elif kind == _ARRAY:
+            return self._readArray(m.end())
+        elif kind == _STRING:
+            return self._readString(m.end())
+        elif kind == _HEX_STRING:
+            return self._readHexString(m.end())
+        elif kind == _TRUE:
+            return BooleanObject(True), m.end()
+        elif kind == _FALSE:
+            return BooleanObject(False), m.end()
+        elif kind == _NULL:
+            return NullObject(), m.end()
+        pos = m.end() if kind == None else m.start(kind)
+        if pos == len(self.data):
+            # stream has truncated prematurely
+            raise PdfStreamError("Stream has ended unexpectedly")
+        raise utils.PdfReadError("Unexpected %r at byte %s" %
+                                 (self.data[pos:pos + 1], utils.hexStr(pos)))
+
+    def readObjectHeader(self, pos):
+        """
+        Reads the ``idnum generation obj`` header of an indirect object.
+
+        :return: the object number, generation and the position of the
+            object itself.
+        """
+        m = _OBJECT_HEADER.match(self.data, pos)
+        if m == None:
+            raise utils.PdfReadError("Could not read object header at byte %s" %
+                                     utils.hexStr(pos))
+        idnum, generation = int(m.group(2)), int(m.group(4))
+        if self.strict and (m.group(1) or len(m.group(3)) > 1):
+            # not a fatal error
+            warnings.warn("Superfluous whitespace found in object header %s %s" %
+                          (idnum, generation), utils.PdfReadWarning)
+        return idnum, generation, m.end()
+
+    def readIntegers(self, pos, end):
+        """
+        Reads every unsigned integer between ``pos`` and ``end``, such as the
+        index at the start of an object stream.
+        """
+        return [int(n) for n in _INTEGER.findall(self.data, pos, end)]
+
+    def readOperations(self, pos=0):
+        """
+        Reads the operations of a content stream, one at a time.
+
+        :return: a generator of ``(operands, operator)`` pairs, where the
+            operator is a byte string.  An inline image is returned as the
+            pair ``({"settings": ..., "data": ...}, b"INLINE IMAGE")``.
+        """
+        data = self.data
+        operands = []
+        while True:
+            m = _TOKEN.match(data, pos)
+            if m.lastindex != None:
+                obj, pos = self._readObject(m)
+                operands.append(obj)
+                continue
+            op = _OPERATOR.match(data, m.end())
+            if op == None:
+                if m.end() == len(data):
+                    return
+                self._readObject(m)  # raises the error for what is there
+            pos = op.end()
+            if op.group() == _BEGIN_IMAGE:
+                image, pos = self._readInlineImage(pos)
+                yield image, _INLINE_IMAGE
+            else:
+                yield operands, op.group()
+            operands = []
+
+    def _readInlineImage(self, pos):
+        # just after the BI operator: the image parameters, up to ID
+        data = self.data
+        settings = DictionaryObject()
+        while True:
+            m = _TOKEN.match(data, pos)
+            if m.lastindex == None:
+                break
+            key, pos = self._readObject(m)
+            settings[key], pos = self.readObject(pos)
+        op = _OPERATOR.match(data, m.end())
+        if op == None or op.group() != _IMAGE_DATA:
+            raise utils.PdfReadError("Expected ID after inline image parameters at byte %s" %
+                                     utils.hexStr(m.end()))
+        # one white-space character separates ID from the image data
+        start = op.end() + 1
+        end = _INLINE_IMAGE_END.search(data, start)
+        if end == None:
+            raise PdfStreamError("Stream has ended unexpectedly")
+        return {"settings": settings, "data": data[start:end.start()]}, end.end()
+
+    def _readName(self, m):
+        name = m.group(_NAME)
+        try:
+            return NameObject.fromBytes(name), m.end()
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            # Name objects should represent irregular characters
+            # with a '#' followed by the symbol's hex number
+            if not self.strict:
+                warnings.warn("Illegal character in Name Object", utils.PdfReadWarning)
+                return NameObject(name), m.end()
+            else:
+                raise utils.PdfReadError("Illegal character in Name Object")
+
+    def _readString(self, pos):
+        data = self.data
+        parts = []
+        parens = 1
+        while True:
+            m = _STRING_SPECIAL.search(data, pos)
+            if m == None:
+                # stream has truncated prematurely
+                raise PdfStreamError("Stream has ended unexpectedly")
+            parts.append(data[pos:m.start()])
+            tok = m.group()
+            pos = m.end()
+            if tok == _LPAREN:
+                parens += 1
+            elif tok == _RPAREN:
+                parens -= 1
+                if parens == 0:
+                    break
+            else:
+                tok = data[pos:pos + 1]
+                pos += 1
+                if tok in _ESCAPES:
+                    tok = _ESCAPES[tok]
+                elif _OCTAL.match(tok):
+                    # "The number ddd may consist of one, two, or three
+                    # octal digits; high-order overflow shall be ignored."
+                    # (PDF reference 7.3.4.2, p 16)
+                    m = _OCTAL.match(data, pos - 1)
+                    pos = m.end()
+                    tok = b_(chr(int(m.group(), base=8) & 0xff))
+                elif tok and tok in _EOL:
+                    # an escaped line break isn't part of the string; if it's
+                    # a multi-char EOL, consume the second character too
+                    if tok == _CR and data[pos:pos + 1] == _LF:
+                        pos += 1
+                    tok = _EMPTY
+                elif not tok:
+                    raise PdfStreamError("Stream has ended unexpectedly")
+                else:
+                    raise utils.PdfReadError(r"Unexpected escaped string: %s" % tok)
+            parts.append(tok)
+        return createStringObject(_EMPTY.join(parts)), pos
+
+    def _readHexString(self, pos):
+        m = _HEX_DIGITS.match(self.data, pos)
+        if m == None:
+            # stream has truncated prematurely
+            raise PdfStreamError("Stream has ended unexpectedly")
+        digits = _EMPTY.join(m.group(1).split())
+        if len(digits) % 2:
+            digits += _ZERO
+        try:
+            txt = binascii.unhexlify(digits)
+        except (TypeError, ValueError):
+            raise utils.PdfReadError("Invalid hexadecimal string at byte %s" %
+                                     utils.hexStr(pos))
+        return createStringObject(txt), m.end()
+
+    def _readArray(self, pos):
+        data = self.data
+        arr = ArrayObject()
+        while True:
+            m = _TOKEN.match(data, pos)
+            if m.lastindex == _ARRAY_END:
+                return arr, m.end()
+            obj, pos = self._readObject(m)
+            arr.append(obj)
+
+    def _readDictionary(self, pos):
+        data = self.data
+        entries = {}
+        while True:
+            m = _TOKEN.match(data, pos)
+            if m.lastindex == _DICTIONARY_END:
+                pos = m.end()
+                break
+            key, pos = self._readObject(m)
+            value, pos = self.readObject(pos)
+            if not entries.get(key):
+                entries[key] = value
+            elif self.strict:
+                # multiple definitions of key not permitted
+                raise utils.PdfReadError("Multiple definitions in dictionary at byte %s for key %s" \
+                                           % (utils.hexStr(pos), key))
+            else:
+                warnings.warn("Multiple definitions in dictionary at byte %s for key %s" \
+                                           % (utils.hexStr(pos), key), utils.PdfReadWarning)
+
+        m = _STREAM.match(data, pos)
+        if m == None:
+            retval = DictionaryObject()
+            retval.update(entries)
+            return retval, pos
+
+        # this is a stream object, not a dictionary.  odd PDF file output has
+        # spaces after 'stream' keyword but before EOL.
+        eol = _STREAM_EOL.match(data, m.end())
+        if eol == None:
+            raise utils.PdfReadError("No end of line after 'stream' at byte %s" %
+                                     utils.hexStr(m.end()))
+        assert "/Length" in entries
+        length = entries["/Length"]
+        if isinstance(length, IndirectObject):
+            length = self.pdf.getObject(length)
+        start = eol.end()
+        end = start + int(length)
+        streamdata = data[start:end]
+        m = _ENDSTREAM.match(data, end)
+        if m != None:
+            pos = m.end()
+        else:
+            # (sigh) - the odd PDF file has a length that is too long, so we
+            # look back one character further for the "endstream" ending and
+            # chop the extra character off the stream data.
+            pos = _WHITESPACE.match(data, end).end()
+            if data[pos - 1:pos + 8] == _ENDSTREAM_KEYWORD:
+                streamdata = streamdata[:-1]
+                pos += 8
+            else:
+                raise utils.PdfReadError("Unable to find 'endstream' marker after stream at byte %s." % utils.hexStr(pos + 9))
+        entries["__streamdata__"] = streamdata
+        return StreamObject.initializeFromDictionary(entries), pos
@@ -29,8 +29,9 @@
 
 from .generic import *
 from .utils import isString, str_
-from .pdf import PdfFileReader, PdfFileWriter
+from .pdf import PdfFileReader, PdfFileWriter, PageObject
 from .pagerange import PageRange
+import multiprocessing
 from sys import version_info
 if version_info < ( 3, 0 ):
     from cStringIO import StringIO
@@ -53,6 +54,97 @@ class _MergedPage(object):
         self.id = id
 
 
+class _DetachedInput(object):
+    """
+    _DetachedInput holds the pages, outline and named destinations read from
+    one of PdfFileMerger's inputs, copied out of their PdfFileReader along
+    with everything the pages refer to.  Unlike the reader, it can be
+    pickled, so that inputs can be read by worker processes.  It stands in
+    for the reader afterwards: indirect references in the copies point at
+    it.
+    """
+    def __init__(self, pdfr, pages, outline, dests):
+        self.objects = {}
+        self._pdf = pdfr
+        self._copies = {}
+        self._pending = []
+        self.pages = [self._detach(pg) for pg in pages]
+        self.outline = self._detachOutline(outline)
+        self.dests = [self._detach(d) for d in dests]
+        del self._pdf, self._copies, self._pending
+
+    def getObject(self, ref):
+        return self.objects[ref.generation, ref.idnum]
+
+    def _detachOutline(self, outline):
+        return [self._detachOutline(o) if isinstance(o, list) else self._detach(o)
+                for o in outline]
+
+    def _detach(self, value):
+        # copies value and everything it refers to, without recursion.  Page
+        # tree parents are left out; the writer gives pages new ones.
+        copy = self._copy(value)
+        while self._pending:
+            original, new = self._pending.pop()
+            if isinstance(original, DictionaryObject):
+                isPage = original.get("/Type") in ("/Page", "/Pages")
+                for key, item in list(original.items()):
+                    if not (isPage and key == "/Parent"):
+                        new[key] = self._copy(item)
+            else:
+                for item in original:
+                    new.append(self._copy(item))
+        return copy
+
+    def _copy(self, value):
+        # a copy of value whose contents are filled in by _detach
+        if isinstance(value, IndirectObject):
+            key = value.generation, value.idnum
+            if key not in self.objects:
+                self.objects[key] = NullObject()
+                obj = self._pdf.getObject(value)
+                if obj != None:
+                    self.objects[key] = self._copy(obj)
+            return IndirectObject(value.idnum, value.generation, self)
+        if not isinstance(value, (DictionaryObject, ArrayObject)):
+            # the other objects are never changed in place
+            return value
+        new = self._copies.get(id(value))
+        if new != None:
+            return new
+        if isinstance(value, StreamObject):
+            if isinstance(value, EncodedStreamObject):
+                new = EncodedStreamObject()
+            else:
+                new = DecodedStreamObject()
+            new._data = value._data
+        elif isinstance(value, PageObject):
+            ref = value.indirectRef
+            if ref != None:
+                ref = IndirectObject(ref.idnum, ref.generation, self)
+            new = PageObject(self, ref)
+        else:
+            new = value.__class__.__new__(value.__class__)
+        self._copies[id(value)] = new
+        self._pending.append((value, new))
+        return new
+
+
+def _readDetachedInput(job):
+    # Runs in the worker processes.
+    path, data, decryption_key, pages, import_bookmarks, strict = job
+    fileobj = file(path, 'rb') if path != None else StreamIO(data)
+    try:
+        pdfr = PdfFileReader(fileobj, strict=strict)
+        if decryption_key is not None:
+            pdfr._decryption_key = decryption_key
+        merger = PdfFileMerger(strict=strict)
+        srcpages, outline, dests = merger._readInput(pdfr, pages, import_bookmarks)
+        return _DetachedInput(pdfr, srcpages, outline, dests)
+    finally:
+        fileobj.close()
+
+
 class PdfFileMerger(object):
     """
     Initializes a PdfFileMerger object. PdfFileMerger merges multiple PDFs
@@ -75,6 +167,9 @@ class PdfFileMerger(object):
         self.named_dests = []
         self.id_count = 0
         self.strict = strict
+        # where each bookmark is in self.bookmarks, by title and by id();
+        # built by findBookmark and dropped whenever bookmarks are added
+        self._bookmark_index = None
 
     def merge(self, position, fileobj, bookmark=None, pages=None, import_bookmarks=True):
         """
@@ -123,9 +218,9 @@ class PdfFileMerger(object):
             fileobj.stream.seek(0)
             filecontent = StreamIO(fileobj.stream.read())
             fileobj.stream.seek(orig_tell) # reset the stream to its original location
-            fileobj = filecontent
             if hasattr(fileobj, '_decryption_key'):
                 decryption_key = fileobj._decryption_key
+            fileobj = filecontent
             my_file = True
 
         # Create a new PdfFileReader instance using the stream
@@ -134,6 +229,15 @@ class PdfFileMerger(object):
         if decryption_key is not None:
             pdfr._decryption_key = decryption_key
 
+        pagedata, outline, dests = self._readInput(pdfr, pages, import_bookmarks)
+        self._insertInput(position, pdfr, pagedata, outline, dests, bookmark)
+
+        # Keep track of our input files so we can close them later
+        self.inputs.append((fileobj, pdfr, my_file))
+
+    def _readInput(self, pdfr, pages, import_bookmarks):
+        # the pages to be merged from pdfr, and the outline and named
+        # destinations that point at them
         # Find the range of pages to merge.
         if pages == None:
             pages = (0, pdfr.getNumPages())
@@ -142,44 +246,46 @@ class PdfFileMerger(object):
         elif not isinstance(pages, tuple):
             raise TypeError('"pages" must be a tuple of (start, stop[, step])')
 
-        srcpages = []
-        if bookmark:
-            bookmark = Bookmark(TextStringObject(bookmark), NumberObject(self.id_count), NameObject('/Fit'))
-
         outline = []
         if import_bookmarks:
             outline = pdfr.getOutlines()
             outline = self._trim_outline(pdfr, outline, pages)
 
+        dests = pdfr.namedDestinations
+        dests = self._trim_dests(pdfr, dests, pages)
+
+        return [pdfr.getPage(i) for i in range(*pages)], outline, dests
+
+    def _insertInput(self, position, src, pagedata, outline, dests, bookmark):
+        srcpages = []
+        if bookmark:
+            bookmark = Bookmark(TextStringObject(bookmark), NumberObject(self.id_count), NameObject('/Fit'))
+
         if bookmark:
             self.bookmarks += [bookmark, outline]
         else:
             self.bookmarks += outline
+        self._bookmark_index = None
 
-        dests = pdfr.namedDestinations
-        dests = self._trim_dests(pdfr, dests, pages)
         self.named_dests += dests
 
         # Gather all the pages that are going to be merged
-        for i in range(*pages):
-            pg = pdfr.getPage(i)
-
+        for pg in pagedata:
             id = self.id_count
             self.id_count += 1
 
-            mp = _MergedPage(pg, pdfr, id)
+            mp = _MergedPage(pg, src, id)
 
             srcpages.append(mp)
 
-        self._associate_dests_to_pages(srcpages)
-        self._associate_bookmarks_to_pages(srcpages)
+        # only this input's entries can point at its pages; all the others
+        # have page numbers already
+        self._associate_dests_to_pages(srcpages, dests)
+        self._associate_bookmarks_to_pages(srcpages, outline)
 
         # Slice to insert the pages at the specified position
         self.pages[position:position] = srcpages
 
-        # Keep track of our input files so we can close them later
-        self.inputs.append((fileobj, pdfr, my_file))
-
     def append(self, fileobj, bookmark=None, pages=None, import_bookmarks=True):
         """
         Identical to the :meth:`merge()<merge>` method, but assumes you want to concatenate
@@ -202,12 +308,78 @@ class PdfFileMerger(object):
 
         self.merge(len(self.pages), fileobj, bookmark, pages, import_bookmarks)
 
-    def write(self, fileobj):
+    def appendAll(self, inputs, processes=None):
+        """
+        Appends several files, as :meth:`append()<append>` would one after
+        another, but reads them in parallel with a pool of worker processes.
+        Each worker copies the pages it is to merge (with everything they
+        refer to) and their bookmarks out of its file into a self-contained
+        object, which is sent back to be put into the output in order.
+
+        :param inputs: a list of the files to be appended.  Each item is
+            either the ``fileobj`` argument of :meth:`append()<append>` or a
+            tuple of its arguments, ``(fileobj[, bookmark[, pages[,
+            import_bookmarks]]])``.
+
+        :param int processes: The most worker processes to use. Defaults to
+            the number of CPUs; with fewer than two, the files are read in
+            this process.
+        """
+        jobs = []
+        for args in inputs:
+            if not isinstance(args, tuple):
+                args = (args,)
+            # with append()'s defaults for the arguments not given
+            jobs.append(args + (None, None, True)[len(args) - 1:])
+
+        processes = min(processes or multiprocessing.cpu_count(), len(jobs))
+        if processes < 2:
+            for job in jobs:
+                self.append(*job)
+            return
+
+        # workers are sent paths or the files' contents
+        work = []
+        for fileobj, bookmark, pages, import_bookmarks in jobs:
+            path = data = decryption_key = None
+            if isString(fileobj):
+                path = fileobj
+            elif isinstance(fileobj, PdfFileReader):
+                orig_tell = fileobj.stream.tell()
+                fileobj.stream.seek(0)
+                data = fileobj.stream.read()
+                fileobj.stream.seek(orig_tell)
+                decryption_key = getattr(fileobj, '_decryption_key', None)
+            else:
+                fileobj.seek(0)
+                data = fileobj.read()
+            work.append((path, data, decryption_key, pages, import_bookmarks,
+                         self.strict))
+
+        pool = multiprocessing.Pool(processes)
+        try:
+            for (fileobj, bookmark, pages, import_bookmarks), src in \
+                    zip(jobs, pool.imap(_readDetachedInput, work)):
+                self._insertInput(len(self.pages), src, src.pages,
+                                  src.outline, src.dests, bookmark)
+                self.inputs.append((None, src, False))
+        finally:
+            pool.close()
+            pool.join()
+
+    def write(self, fileobj, streaming=False, compress=False):
         """
         Writes all data that has been merged to the given output file.
 
         :param fileobj: Output file. Can be a filename or any kind of
             file-like object.
+        :param bool streaming: Passed on to
+            :meth:`PdfFileWriter.write()<PyPDF2.PdfFileWriter.write>`. If
+            true, objects are written out and released as they are resolved,
+            and the merger can't be written again.
+        :param bool compress: Passed on to
+            :meth:`PdfFileWriter.write()<PyPDF2.PdfFileWriter.write>`. If
+            true, the output uses object streams and a cross-reference stream.
         """
         my_file = False
         if isString(fileobj):
@@ -215,19 +387,16 @@ class PdfFileMerger(object):
             my_file = True
 
         # Add pages to the PdfFileWriter
-        # The commented out line below was replaced with the two lines below it to allow PdfFileMerger to work with PyPdf 1.13
         for page in self.pages:
             self.output.addPage(page.pagedata)
-            page.out_pagedata = self.output.getReference(self.output._pages.getObject()["/Kids"][-1].getObject())
-            #idnum = self.output._objects.index(self.output._pages.getObject()["/Kids"][-1].getObject()) + 1
-            #page.out_pagedata = IndirectObject(idnum, 0, self.output)
+            page.out_pagedata = self.output.getReference(page.pagedata)
 
         # Once all pages are added, create bookmarks to point at those pages
         self._write_dests()
         self._write_bookmarks()
 
         # Write the output to the file
-        self.output.write(fileobj)
+        self.output.write(fileobj, streaming, compress)
 
         if my_file:
             fileobj.close()
@@ -294,154 +463,207 @@ class PdfFileMerger(object):
         page set.
         """
         new_dests = []
-        prev_header_added = True
+        page_index = self._page_index(pdf, pages)
         for k, o in list(dests.items()):
-            for j in range(*pages):
-                if pdf.getPage(j).getObject() == o['/Page'].getObject():
-                    o[NameObject('/Page')] = o['/Page'].getObject()
-                    assert str_(k) == str_(o['/Title'])
-                    new_dests.append(o)
-                    break
+            page = self._find_page(page_index, o.raw_get('/Page'))
+            if page != None:
+                o[NameObject('/Page')] = page
+                assert str_(k) == str_(o['/Title'])
+                new_dests.append(o)
         return new_dests
 
-    def _trim_outline(self, pdf, outline, pages):
+    def _trim_outline(self, pdf, outline, pages, page_index=None):
         """
         Removes any outline/bookmark entries that are not a part of the
         specified page set.
         """
+        if page_index == None:
+            page_index = self._page_index(pdf, pages)
         new_outline = []
         prev_header_added = True
         for i, o in enumerate(outline):
             if isinstance(o, list):
-                sub = self._trim_outline(pdf, o, pages)
+                sub = self._trim_outline(pdf, o, pages, page_index)
                 if sub:
                     if not prev_header_added:
                         new_outline.append(outline[i-1])
                     new_outline.append(sub)
             else:
                 prev_header_added = False
-                for j in range(*pages):
-                    if pdf.getPage(j).getObject() == o['/Page'].getObject():
-                        o[NameObject('/Page')] = o['/Page'].getObject()
-                        new_outline.append(o)
-                        prev_header_added = True
-                        break
+                page = self._find_page(page_index, o.raw_get('/Page'))
+                if page != None:
+                    o[NameObject('/Page')] = page
+                    new_outline.append(o)
+                    prev_header_added = True
         return new_outline
 
+    def _page_index(self, pdf, pages):
+        # the pages in the range, and the first of them with each
+        # indirect reference
+        pagelist = [pdf.getPage(j) for j in range(*pages)]
+        refs = {}
+        for page in pagelist:
+            if page.indirectRef != None:
+                refs.setdefault((page.indirectRef.generation,
+                                 page.indirectRef.idnum), page)
+        return pagelist, refs
+
+    def _find_page(self, page_index, page):
+        # the page of page_index a destination's /Page points to, if any.
+        # Destinations almost always refer to their page indirectly, and so
+        # are found by reference; anything else has to be compared with
+        # each page.
+        pagelist, refs = page_index
+        if isinstance(page, IndirectObject):
+            return refs.get((page.generation, page.idnum))
+        page = page.getObject()
+        for pg in pagelist:
+            if pg.getObject() == page:
+                return pg
+        return None
+
+    def _pages_by_id(self):
+        # the position and _MergedPage of each merged page, by its id
+        positions = {}
+        for i, p in enumerate(self.pages):
+            positions.setdefault(p.id, (i, p))
+        return positions
+
     def _write_dests(self):
         dests = self.named_dests
+        positions = self._pages_by_id()
 
         for v in dests:
             pageno = None
             pdf = None
-            if '/Page' in v:
-                for i, p in enumerate(self.pages):
-                    if p.id == v['/Page']:
-                        v[NameObject('/Page')] = p.out_pagedata
-                        pageno = i
-                        pdf = p.src
-                        break
+            if '/Page' in v and isinstance(v['/Page'], NumberObject) and \
+                    v['/Page'] in positions:
+                i, p = positions[v['/Page']]
+                v[NameObject('/Page')] = p.out_pagedata
+                pageno = i
+                pdf = p.src
             if pageno != None:
                 self.output.addNamedDestinationObject(v)
 
-    def _write_bookmarks(self, bookmarks=None, parent=None):
+    def _write_bookmarks(self, bookmarks=None, parent=None, positions=None):
 
         if bookmarks == None:
             bookmarks = self.bookmarks
+        if positions == None:
+            positions = self._pages_by_id()
 
         last_added = None
         for b in bookmarks:
             if isinstance(b, list):
-                self._write_bookmarks(b, last_added)
+                self._write_bookmarks(b, last_added, positions)
                 continue
 
             pageno = None
             pdf = None
-            if '/Page' in b:
-                for i, p in enumerate(self.pages):
-                    if p.id == b['/Page']:
-                        #b[NameObject('/Page')] = p.out_pagedata
-                        args = [NumberObject(p.id), NameObject(b['/Type'])]
-                        #nothing more to add
-                        #if b['/Type'] == '/Fit' or b['/Type'] == '/FitB'
-                        if b['/Type'] == '/FitH' or b['/Type'] == '/FitBH':
-                            if '/Top' in b and not isinstance(b['/Top'], NullObject):
-                                args.append(FloatObject(b['/Top']))
-                            else:
-                                args.append(FloatObject(0))
-                            del b['/Top']
-                        elif b['/Type'] == '/FitV' or b['/Type'] == '/FitBV':
-                            if '/Left' in b and not isinstance(b['/Left'], NullObject):
-                                args.append(FloatObject(b['/Left']))
-                            else:
-                                args.append(FloatObject(0))
-                            del b['/Left']
-                        elif b['/Type'] == '/XYZ':
-                            if '/Left' in b and not isinstance(b['/Left'], NullObject):
-                                args.append(FloatObject(b['/Left']))
-                            else:
-                                args.append(FloatObject(0))
-                            if '/Top' in b and not isinstance(b['/Top'], NullObject):
-                                args.append(FloatObject(b['/Top']))
-                            else:
-                                args.append(FloatObject(0))
-                            if '/Zoom' in b and not isinstance(b['/Zoom'], NullObject):
-                                args.append(FloatObject(b['/Zoom']))
-                            else:
-                                args.append(FloatObject(0))
-                            del b['/Top'], b['/Zoom'], b['/Left']
-                        elif b['/Type'] == '/FitR':
-                            if '/Left' in b and not isinstance(b['/Left'], NullObject):
-                                args.append(FloatObject(b['/Left']))
-                            else:
-                                args.append(FloatObject(0))
-                            if '/Bottom' in b and not isinstance(b['/Bottom'], NullObject):
-                                args.append(FloatObject(b['/Bottom']))
-                            else:
-                                args.append(FloatObject(0))
-                            if '/Right' in b and not isinstance(b['/Right'], NullObject):
-                                args.append(FloatObject(b['/Right']))
-                            else:
-                                args.append(FloatObject(0))
-                            if '/Top' in b and not isinstance(b['/Top'], NullObject):
-                                args.append(FloatObject(b['/Top']))
-                            else:
-                                args.append(FloatObject(0))
-                            del b['/Left'], b['/Right'], b['/Bottom'], b['/Top']
-
-                        b[NameObject('/A')] = DictionaryObject({NameObject('/S'): NameObject('/GoTo'), NameObject('/D'): ArrayObject(args)})
-
-                        pageno = i
-                        pdf = p.src
-                        break
+            if '/Page' in b and isinstance(b['/Page'], NumberObject) and \
+                    b['/Page'] in positions:
+                i, p = positions[b['/Page']]
+                #b[NameObject('/Page')] = p.out_pagedata
+                args = [NumberObject(p.id), NameObject(b['/Type'])]
+                #nothing more to add
+                #if b['/Type'] == '/Fit' or b['/Type'] == '/FitB'
+                if b['/Type'] == '/FitH' or b['/Type'] == '/FitBH':
+                    if '/Top' in b and not isinstance(b['/Top'], NullObject):
+                        args.append(FloatObject(b['/Top']))
+                    else:
+                        args.append(FloatObject(0))
+                    del b['/Top']
+                elif b['/Type'] == '/FitV' or b['/Type'] == '/FitBV':
+                    if '/Left' in b and not isinstance(b['/Left'], NullObject):
+                        args.append(FloatObject(b['/Left']))
+                    else:
+                        args.append(FloatObject(0))
+                    del b['/Left']
+                elif b['/Type'] == '/XYZ':
+                    if '/Left' in b and not isinstance(b['/Left'], NullObject):
+                        args.append(FloatObject(b['/Left']))
+                    else:
+                        args.append(FloatObject(0))
+                    if '/Top' in b and not isinstance(b['/Top'], NullObject):
+                        args.append(FloatObject(b['/Top']))
+                    else:
+                        args.append(FloatObject(0))
+                    if '/Zoom' in b and not isinstance(b['/Zoom'], NullObject):
+                        args.append(FloatObject(b['/Zoom']))
+                    else:
+                        args.append(FloatObject(0))
+                    del b['/Top'], b['/Zoom'], b['/Left']
+                elif b['/Type'] == '/FitR':
+                    if '/Left' in b and not isinstance(b['/Left'], NullObject):
+                        args.append(FloatObject(b['/Left']))
+                    else:
+                        args.append(FloatObject(0))
+                    if '/Bottom' in b and not isinstance(b['/Bottom'], NullObject):
+                        args.append(FloatObject(b['/Bottom']))
+                    else:
+                        args.append(FloatObject(0))
+                    if '/Right' in b and not isinstance(b['/Right'], NullObject):
+                        args.append(FloatObject(b['/Right']))
+                    else:
+                        args.append(FloatObject(0))
+                    if '/Top' in b and not isinstance(b['/Top'], NullObject):
+                        args.append(FloatObject(b['/Top']))
+                    else:
+                        args.append(FloatObject(0))
+                    del b['/Left'], b['/Right'], b['/Bottom'], b['/Top']
+
+                b[NameObject('/A')] = DictionaryObject({NameObject('/S'): NameObject('/GoTo'), NameObject('/D'): ArrayObject(args)})
+
+                pageno = i
+                pdf = p.src
             if pageno != None:
                 del b['/Page'], b['/Type']
                 last_added = self.output.addBookmarkDict(b, parent)
 
-    def _associate_dests_to_pages(self, pages):
-        for nd in self.named_dests:
+    def _page_numbers(self, pages):
+        # the id given to each of pages, by the id() of its page object
+        return dict((id(p.pagedata.getObject()), p.id) for p in pages)
+
+    def _page_number(self, pages, page_numbers, page):
+        # the id of the page of pages that page is.  The trimmed outline and
+        # named destinations hold the merged page objects themselves, so
+        # the comparison with each page is only a fallback.
+        page = page.getObject()
+        pageno = page_numbers.get(id(page))
+        if pageno == None:
+            for p in pages:
+                if page == p.pagedata.getObject():
+                    pageno = p.id
+        return pageno
+
+    def _associate_dests_to_pages(self, pages, dests=None):
+        if dests == None:
+            dests = self.named_dests
+        page_numbers = self._page_numbers(pages)
+
+        for nd in dests:
             pageno = None
             np = nd['/Page']
 
             if isinstance(np, NumberObject):
                 continue
 
-            for p in pages:
-                if np.getObject() == p.pagedata.getObject():
-                    pageno = p.id
+            pageno = self._page_number(pages, page_numbers, np)
 
             if pageno != None:
                 nd[NameObject('/Page')] = NumberObject(pageno)
             else:
                 raise ValueError("Unresolved named destination '%s'" % (nd['/Title'],))
 
-    def _associate_bookmarks_to_pages(self, pages, bookmarks=None):
+    def _associate_bookmarks_to_pages(self, pages, bookmarks=None, page_numbers=None):
         if bookmarks == None:
             bookmarks = self.bookmarks
+        if page_numbers == None:
+            page_numbers = self._page_numbers(pages)
 
         for b in bookmarks:
             if isinstance(b, list):
-                self._associate_bookmarks_to_pages(pages, b)
+                self._associate_bookmarks_to_pages(pages, b, page_numbers)
                 continue
 
             pageno = None
@@ -450,9 +672,7 @@ class PdfFileMerger(object):
             if isinstance(bp, NumberObject):
                 continue
 
-            for p in pages:
-                if bp.getObject() == p.pagedata.getObject():
-                    pageno = p.id
+            pageno = self._page_number(pages, page_numbers, bp)
 
             if pageno != None:
                 b[NameObject('/Page')] = NumberObject(pageno)
@@ -461,6 +681,17 @@ class PdfFileMerger(object):
 
     def findBookmark(self, bookmark, root=None):
         if root == None:
+            if self._bookmark_index == None:
+                self._bookmark_index = self._index_bookmarks(self.bookmarks)
+            titles, ids = self._bookmark_index
+            if isinstance(bookmark, DictionaryObject):
+                if id(bookmark) in ids:
+                    return list(ids[id(bookmark)])
+            elif isString(bookmark):
+                if bookmark in titles:
+                    return list(titles[bookmark])
+                return None
+            # anything else is only found by comparing it with each
             root = self.bookmarks
 
         for i, b in enumerate(root):
@@ -473,6 +704,20 @@ class PdfFileMerger(object):
 
         return None
 
+    def _index_bookmarks(self, bookmarks, prefix=(), index=None):
+        # the location findBookmark gives for each bookmark's title and id(),
+        # keeping the first (in its search order) where one appears twice
+        if index == None:
+            index = ({}, {})
+        titles, ids = index
+        for i, b in enumerate(bookmarks):
+            if isinstance(b, list):
+                self._index_bookmarks(b, prefix + (i,), index)
+            else:
+                titles.setdefault(b['/Title'], prefix + (i,))
+                ids.setdefault(id(b), prefix + (i,))
+        return index
+
     def addBookmark(self, title, pagenum, parent=None):
         """
         Add a bookmark to this PDF file.
@@ -502,6 +747,7 @@ class PdfFileMerger(object):
                 bmparent[npos].append(dest)
             else:
                 bmparent.insert(npos, [dest])
+        self._bookmark_index = None
         return dest
 
     def addNamedDestination(self, title, pagenum):
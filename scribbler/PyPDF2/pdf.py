@@ -46,6 +46,7 @@ import string
 import math
 import struct
 import sys
+from array import array
 from sys import version_info
 if version_info < ( 3, 0 ):
     from cStringIO import StringIO
@@ -62,6 +63,9 @@ from . import utils
 import warnings
 import codecs
 from .generic import *
+from .lexer import Lexer
+from .cmap import SimpleEncoding, ToUnicode
+from . import crypto
 from .utils import readNonWhitespace, readUntilWhitespace, ConvertFunctionsToVirtualList
 from .utils import isString, b_, u_, ord_, chr_, str_, formatWarning
 
@@ -71,7 +75,7 @@ if version_info < ( 2, 4 ):
 if version_info < ( 2, 5 ):
     from md5 import md5
 else:
-    from hashlib import md5
+    from hashlib import md5, sha256, sha384, sha512
 import uuid
 
 
@@ -80,9 +84,13 @@ class PdfFileWriter(object):
     This class supports writing PDF files out, given pages produced by another
     class (typically :class:`PdfFileReader<PdfFileReader>`).
     """
+    # number of objects packed into each object stream by write(compress=True)
+    _objectStreamLength = 100
+
     def __init__(self):
         self._header = b_("%PDF-1.3")
         self._objects = []  # array of indirect objects
+        self._idnums = {}  # id() of each indirect object -> its object number
 
         # The root of our page tree node.
         pages = DictionaryObject()
@@ -111,8 +119,17 @@ class PdfFileWriter(object):
 
     def _addObject(self, obj):
         self._objects.append(obj)
+        self._idnums[id(obj)] = len(self._objects)
         return IndirectObject(len(self._objects), 0, self)
 
+    def _getIdnum(self, obj):
+        # Look the object up by identity first; fall back to the linear
+        # search by equality for callers that hold an equal copy.
+        idnum = self._idnums.get(id(obj))
+        if idnum != None and self._objects[idnum - 1] is obj:
+            return idnum
+        return self._objects.index(obj) + 1
+
     def getObject(self, ido):
         if ido.pdf != self:
             raise ValueError("pdf must be self")
@@ -427,22 +444,42 @@ class PdfFileWriter(object):
         self._encrypt = self._addObject(encrypt)
         self._encrypt_key = key
 
-    def write(self, stream):
+    def write(self, stream, streaming=False, compress=False):
         """
         Writes the collection of pages added to this object out as a PDF file.
 
         :param stream: An object to write the file to.  The object must support
             the write method and the tell method, similar to a file object.
+        :param bool streaming: If true, each object is written out as soon
+            as its references have been resolved and the writer then drops
+            it, so that only the cross-reference offsets are held until the
+            end.  Objects copied in from a
+            :class:`PdfFileReader<PdfFileReader>` are dropped from its cache
+            too, to be parsed again if it is asked for them later.  Objects
+            are numbered in the order they are reached rather than
+            depth-first, and the writer can't be used again afterwards.
+        :param bool compress: If true, objects other than streams are packed
+            into compressed object streams and the cross-reference table is
+            written as a compressed cross-reference stream.  This needs a
+            PDF 1.5 reader, and the header is raised to match.
         """
         if hasattr(stream, 'mode') and 'b' not in stream.mode:
             warnings.warn("File <%s> to write to is not in binary mode. It may not be written to correctly." % stream.name)
         debug = False
-        import struct
 
         if not self._root:
             self._root = self._addObject(self._root_object)
 
+        # {reader: {generation: {idnum: new idnum}}}
         externalReferenceMap = {}
+        # {digest of stream contents: new idnum}, and {(reader, generation,
+        # idnum): digest} for the objects streams refer to, see _streamDigest
+        sharedStreams = {}
+        digests = {}
+        # {new idnum: reference in the file it was copied from}, kept in
+        # streaming mode so that the copied objects can be dropped from
+        # their readers' caches once written
+        copied = {} if streaming else None
 
         # PDF objects sometimes have circular references to their /Page objects
         # inside their object tree (for example, annotations).  Those will be
@@ -455,50 +492,66 @@ class PdfFileWriter(object):
         for objIndex in range(len(self._objects)):
             obj = self._objects[objIndex]
             if isinstance(obj, PageObject) and obj.indirectRef != None:
-                data = obj.indirectRef
-                if data.pdf not in externalReferenceMap:
-                    externalReferenceMap[data.pdf] = {}
-                if data.generation not in externalReferenceMap[data.pdf]:
-                    externalReferenceMap[data.pdf][data.generation] = {}
-                externalReferenceMap[data.pdf][data.generation][data.idnum] = IndirectObject(objIndex + 1, 0, self)
-
-        self.stack = []
+                self._setExternalReference(externalReferenceMap, obj.indirectRef, objIndex + 1)
+
         if debug: print(("ERM:", externalReferenceMap, "root:", self._root))
-        self._sweepIndirectReferences(externalReferenceMap, self._root)
-        del self.stack
 
         # Begin writing:
-        object_positions = []
-        stream.write(self._header + b_("\n"))
-        for i in range(len(self._objects)):
-            idnum = (i + 1)
+        header = self._header
+        if compress and header < b_("%PDF-1.5"):
+            header = b_("%PDF-1.5")
+        stream.write(header + b_("\n"))
+        if not streaming:
+            self._sweepIndirectReferences(externalReferenceMap, sharedStreams, self._root,
+                                          digests=digests)
+        objectCount = len(self._objects)
+
+        # {idnum: (type, offset or object stream number, index)}, laid out
+        # like the rows of a cross-reference stream
+        xref = utils.ObjectNumberMap(width=3)
+        packed = []  # (idnum, data) for objects awaiting an object stream
+        # In streaming mode, objects copied in from other files are appended
+        # to self._objects as the references to them are rewritten, so this
+        # loop keeps going until everything reachable has been written.
+        # Numbers reserved for object streams hold None and are skipped.
+        i = 0
+        while i < len(self._objects):
             obj = self._objects[i]
-            object_positions.append(stream.tell())
-            stream.write(b_(str(idnum) + " 0 obj\n"))
-            key = None
-            if hasattr(self, "_encrypt") and idnum != self._encrypt.idnum:
-                pack1 = struct.pack("<i", i + 1)[:3]
-                pack2 = struct.pack("<i", 0)[:2]
-                key = self._encrypt_key + pack1 + pack2
-                assert len(key) == (len(self._encrypt_key) + 5)
-                md5_hash = md5(key).digest()
-                key = md5_hash[:min(16, len(self._encrypt_key) + 5)]
-            obj.writeToStream(stream, key)
-            stream.write(b_("\nendobj\n"))
+            i += 1
+            if obj is None:
+                continue
+            if streaming:
+                self._sweepIndirectReferences(externalReferenceMap, sharedStreams, obj, False,
+                                              copied, digests)
+            if compress and not isinstance(obj, StreamObject) and \
+                    not (hasattr(self, "_encrypt") and i == self._encrypt.idnum):
+                data = BytesIO()
+                obj.writeToStream(data, None)
+                packed.append((i, data.getvalue()))
+                if len(packed) == self._objectStreamLength:
+                    self._writeObjectStream(stream, packed, xref)
+                    packed = []
+            else:
+                xref[i] = (1, stream.tell(), 0)
+                self._writeObject(stream, i, obj)
+            if streaming:
+                self._objects[i - 1] = None
+                # the same direct stream may have been added more than once
+                self._idnums.pop(id(obj), None)
+                source = copied.pop(i, None)
+                if source != None and hasattr(source.pdf, "_uncacheIndirectObject"):
+                    source.pdf._uncacheIndirectObject(source.generation, source.idnum)
+        if packed:
+            self._writeObjectStream(stream, packed, xref)
+        size = len(self._objects) + 1
+        if not streaming:
+            # drop the numbers reserved for object streams, so that the
+            # writer can be written out again
+            del self._objects[objectCount:]
 
-        # xref table
-        xref_location = stream.tell()
-        stream.write(b_("xref\n"))
-        stream.write(b_("0 %s\n" % (len(self._objects) + 1)))
-        stream.write(b_("%010d %05d f \n" % (0, 65535)))
-        for offset in object_positions:
-            stream.write(b_("%010d %05d n \n" % (offset, 0)))
-
-        # trailer
-        stream.write(b_("trailer\n"))
         trailer = DictionaryObject()
         trailer.update({
-                NameObject("/Size"): NumberObject(len(self._objects) + 1),
+                NameObject("/Size"): NumberObject(size),
                 NameObject("/Root"): self._root,
                 NameObject("/Info"): self._info,
                 })
@@ -506,11 +559,85 @@ class PdfFileWriter(object):
             trailer[NameObject("/ID")] = self._ID
         if hasattr(self, "_encrypt"):
             trailer[NameObject("/Encrypt")] = self._encrypt
-        trailer.writeToStream(stream, None)
+
+        xref_location = stream.tell()
+        if compress:
+            # the cross-reference stream takes the next object number and
+            # carries the trailer entries in its own dictionary
+            xref[size] = (1, xref_location, 0)
+            size += 1
+            trailer[NameObject("/Size")] = NumberObject(size)
+            rows = [(0, 0, 65535)] + [xref[idnum] for idnum in range(1, size)]
+            widths = [1] + [max(1, (max(row[j] for row in rows).bit_length() + 7) // 8)
+                            for j in (1, 2)]
+            data = bytearray()
+            for row in rows:
+                for value, width in zip(row, widths):
+                    for shift in range((width - 1) * 8, -8, -8):
+                        data.append((value >> shift) & 0xff)
+            xrefstream = DecodedStreamObject()
+            xrefstream.setData(bytes(data))
+            xrefstream = xrefstream.flateEncode()
+            xrefstream.update(trailer)
+            xrefstream.update({
+                    NameObject("/Type"): NameObject("/XRef"),
+                    NameObject("/W"): ArrayObject([NumberObject(w) for w in widths]),
+                    })
+            stream.write(b_(str(size - 1) + " 0 obj\n"))
+            xrefstream.writeToStream(stream, None)
+            stream.write(b_("\nendobj\n"))
+        else:
+            # xref table
+            stream.write(b_("xref\n"))
+            stream.write(b_("0 %s\n" % size))
+            stream.write(b_("%010d %05d f \n" % (0, 65535)))
+            for idnum in range(1, size):
+                stream.write(b_("%010d %05d n \n" % (xref[idnum][1], 0)))
+
+            # trailer
+            stream.write(b_("trailer\n"))
+            trailer.writeToStream(stream, None)
 
         # eof
         stream.write(b_("\nstartxref\n%s\n%%%%EOF\n" % (xref_location)))
 
+    def _writeObjectStream(self, stream, packed, xref):
+        # Writes the serialised objects in packed out as one compressed
+        # object stream, under a newly reserved object number.
+        self._objects.append(None)
+        stmnum = len(self._objects)
+        offsets = []
+        position = 0
+        for idx in range(len(packed)):
+            idnum, data = packed[idx]
+            offsets.append("%d %d" % (idnum, position))
+            position += len(data) + 1
+            xref[idnum] = (2, stmnum, idx)
+        index = b_(" ".join(offsets) + "\n")
+        objStm = DecodedStreamObject()
+        objStm.setData(index + b_("\n").join(data for idnum, data in packed))
+        objStm = objStm.flateEncode()
+        objStm.update({
+                NameObject("/Type"): NameObject("/ObjStm"),
+                NameObject("/N"): NumberObject(len(packed)),
+                NameObject("/First"): NumberObject(len(index)),
+                })
+        xref[stmnum] = (1, stream.tell(), 0)
+        self._writeObject(stream, stmnum, objStm)
+
+    def _writeObject(self, stream, idnum, obj):
+        stream.write(b_(str(idnum) + " 0 obj\n"))
+        key = None
+        if hasattr(self, "_encrypt") and idnum != self._encrypt.idnum:
+            pack1 = struct.pack("<i", idnum)[:3]
+            pack2 = struct.pack("<i", 0)[:2]
+            key = self._encrypt_key + pack1 + pack2
+            assert len(key) == (len(self._encrypt_key) + 5)
+            md5_hash = md5(key).digest()
+            key = md5_hash[:min(16, len(self._encrypt_key) + 5)]
+        obj.writeToStream(stream, key)
+        stream.write(b_("\nendobj\n"))
+
     def addMetadata(self, infos):
         """
         Add custom metadata to the output.
@@ -523,67 +650,180 @@ class PdfFileWriter(object):
             args[NameObject(key)] = createStringObject(value)
         self.getObject(self._info).update(args)
 
-    def _sweepIndirectReferences(self, externMap, data):
-        debug = False
-        if debug: print((data, "TYPE", data.__class__.__name__))
-        if isinstance(data, DictionaryObject):
-            for key, value in list(data.items()):
-                origvalue = value
-                value = self._sweepIndirectReferences(externMap, value)
-                if isinstance(value, StreamObject):
-                    # a dictionary value is a stream.  streams must be indirect
-                    # objects, so we need to change this value.
-                    value = self._addObject(value)
-                data[key] = value
-            return data
-        elif isinstance(data, ArrayObject):
-            for i in range(len(data)):
-                value = self._sweepIndirectReferences(externMap, data[i])
-                if isinstance(value, StreamObject):
-                    # an array value is a stream.  streams must be indirect
-                    # objects, so we need to change this value
-                    value = self._addObject(value)
-                data[i] = value
-            return data
-        elif isinstance(data, IndirectObject):
-            # internal indirect references are fine
-            if data.pdf == self:
-                if data.idnum in self.stack:
-                    return data
+    def _sweepIndirectReferences(self, externMap, sharedStreams, data, descend=True, copied=None, digests=None):
+        # Walks everything reachable from data, rewriting references to
+        # objects in other files so that they point at copies added to this
+        # one, and turning direct streams into indirect objects.  Streams
+        # identical to one already copied share its copy.  The walk
+        # uses an explicit stack of container iterators rather than
+        # recursion, so deep outline and annotation trees can't exhaust the
+        # interpreter's recursion limit.  Objects are visited in the same
+        # depth-first order as a recursive walk would use.  If descend is
+        # False, indirect objects referenced from data are not walked; only
+        # the references held directly by data are rewritten.  If copied is
+        # given (in streaming mode), the reference each object was copied
+        # from is put in it under the object's new number, and streams
+        # shared rather than copied are dropped from their readers' caches.
+        # digests is kept for _streamDigest across calls.
+        if digests == None:
+            digests = {}
+
+        def arrayItems(array):
+            for i in range(len(array)):
+                yield i, array[i]
+
+        visited = set()  # object numbers in this file already swept
+        walked = set()   # id()s of containers already swept
+        holder = [data]
+        stack = [(holder, iter([(0, data)]), None, None)]
+        while stack:
+            container, items, parent, parentKey = stack[-1]
+            for key, value in items:
+                if isinstance(value, IndirectObject):
+                    if value.pdf == self:
+                        # internal indirect references are fine
+                        if not descend or value.idnum in visited:
+                            continue
+                        visited.add(value.idnum)
+                        value = self.getObject(value)
+                    else:
+                        idnum = self._getExternalReference(externMap, value)
+                        if idnum != None:
+                            container[key] = IndirectObject(idnum, 0, self)
+                            continue
+                        newobj = value.pdf.getObject(value)
+                        digest = self._streamDigest(newobj, digests)
+                        if digest in sharedStreams:
+                            # an identical stream, typically a font or image
+                            # embedded in several of the merged files, has
+                            # already been copied; share it
+                            idnum = sharedStreams[digest]
+                            self._setExternalReference(externMap, value, idnum)
+                            container[key] = IndirectObject(idnum, 0, self)
+                            if copied != None and hasattr(value.pdf, "_uncacheIndirectObject"):
+                                value.pdf._uncacheIndirectObject(value.generation, value.idnum)
+                            continue
+                        ref = self._addObject(newobj)
+                        visited.add(ref.idnum)
+                        self._setExternalReference(externMap, value, ref.idnum)
+                        if copied != None:
+                            copied[ref.idnum] = value
+                        if digest != None:
+                            sharedStreams[digest] = ref.idnum
+                        container[key] = ref
+                        if not descend:
+                            continue
+                        value = newobj
+                    key = None
+                if not isinstance(value, (DictionaryObject, ArrayObject)):
+                    continue
+                if id(value) in walked:
+                    if key != None and isinstance(value, StreamObject):
+                        container[key] = self._addObject(value)
+                    continue
+                walked.add(id(value))
+                if isinstance(value, DictionaryObject):
+                    children = iter(list(value.items()))
+                else:
+                    children = arrayItems(value)
+                if key == None:
+                    stack.append((value, children, None, None))
                 else:
-                    self.stack.append(data.idnum)
-                    realdata = self.getObject(data)
-                    self._sweepIndirectReferences(externMap, realdata)
-                    return data
+                    stack.append((value, children, container, key))
+                break
             else:
-                newobj = externMap.get(data.pdf, {}).get(data.generation, {}).get(data.idnum, None)
-                if newobj == None:
-                    newobj = data.pdf.getObject(data)
-                    self._objects.append(None) # placeholder
-                    idnum = len(self._objects)
-                    newobj_ido = IndirectObject(idnum, 0, self)
-                    if data.pdf not in externMap:
-                        externMap[data.pdf] = {}
-                    if data.generation not in externMap[data.pdf]:
-                        externMap[data.pdf][data.generation] = {}
-                    externMap[data.pdf][data.generation][data.idnum] = newobj_ido
-                    newobj = self._sweepIndirectReferences(externMap, newobj)
-                    self._objects[idnum-1] = newobj
-                    return newobj_ido
-                return newobj
+                stack.pop()
+                if parent is not holder and parent != None and \
+                        isinstance(container, StreamObject):
+                    # a dictionary or array value is a stream.  streams must
+                    # be indirect objects, so we need to change this value.
+                    parent[parentKey] = self._addObject(container)
+        return holder[0]
+
+    def _streamDigest(self, obj, digests):
+        # Digest identifying the contents of a stream copied from another
+        # file, or None if it isn't a stream or can't be digested.
+        # References are numbered per file, so each object the stream refers
+        # to is digested in its place; digests holds those already worked
+        # out, by reference.  /Length is left out; it's recomputed from the
+        # data when the stream is written.
+        if not isinstance(obj, StreamObject):
+            return None
+        data = BytesIO()
+        if not self._digestObject(data, obj, digests, set()):
+            return None
+        return md5(data.getvalue()).digest(), len(obj._data)
+
+    def _digestObject(self, data, value, digests, pending):
+        # Writes value out to data for _streamDigest, with the digests of
+        # the objects it refers to in place of the references.  Returns
+        # False if it refers to a page, which would take in the whole page
+        # tree, or, through pending, to an object still being digested.
+        if isinstance(value, IndirectObject):
+            key = (value.pdf, value.generation, value.idnum)
+            if key not in digests:
+                if key in pending or len(pending) > 100:
+                    return False
+                pending.add(key)
+                obj = value.getObject()
+                out = BytesIO()
+                if isinstance(obj, DictionaryObject) and \
+                        obj.get("/Type") in ("/Page", "/Pages"):
+                    digests[key] = None
+                elif self._digestObject(out, obj, digests, pending):
+                    digests[key] = md5(out.getvalue()).digest()
+                else:
+                    digests[key] = None
+                pending.discard(key)
+            if digests[key] == None:
+                return False
+            data.write(b_("R"))
+            data.write(digests[key])
+        elif isinstance(value, DictionaryObject):
+            data.write(b_(value.__class__.__name__ + "<<"))
+            for key in sorted(value):
+                if key == "/Length" and isinstance(value, StreamObject):
+                    continue
+                key.writeToStream(data, None)
+                data.write(b_(" "))
+                if not self._digestObject(data, value.raw_get(key), digests, pending):
+                    return False
+                data.write(b_(" "))
+            data.write(b_(">>"))
+            if isinstance(value, StreamObject):
+                data.write(b_("%d\n" % len(value._data)))
+                data.write(value._data)
+        elif isinstance(value, ArrayObject):
+            data.write(b_("["))
+            for item in value:
+                if not self._digestObject(data, item, digests, pending):
+                    return False
+                data.write(b_(" "))
+            data.write(b_("]"))
         else:
-            return data
+            value.writeToStream(data, None)
+        return True
+
+    def _getExternalReference(self, externMap, ref):
+        # Object number in this file of the object ref points to in another
+        # file, or None if it hasn't been copied yet.
+        return externMap.get(ref.pdf, {}).get(ref.generation, {}).get(ref.idnum, None)
+
+    def _setExternalReference(self, externMap, ref, idnum):
+        generations = externMap.setdefault(ref.pdf, {})
+        if ref.generation not in generations:
+            generations[ref.generation] = utils.ObjectNumberMap()
+        generations[ref.generation][ref.idnum] = idnum
 
     def getReference(self, obj):
-        idnum = self._objects.index(obj) + 1
-        ref = IndirectObject(idnum, 0, self)
+        ref = IndirectObject(self._getIdnum(obj), 0, self)
         assert ref.getObject() == obj
         return ref
 
     def getOutlineRoot(self):
         if '/Outlines' in self._root_object:
             outline = self._root_object['/Outlines']
-            idnum = self._objects.index(outline) + 1
+            idnum = self._getIdnum(outline)
             outlineRef = IndirectObject(idnum, 0, self)
             assert outlineRef.getObject() == outline
         else:
@@ -597,12 +837,12 @@ class PdfFileWriter(object):
     def getNamedDestRoot(self):
         if '/Names' in self._root_object and isinstance(self._root_object['/Names'], DictionaryObject):
             names = self._root_object['/Names']
-            idnum = self._objects.index(names) + 1
+            idnum = self._getIdnum(names)
             namesRef = IndirectObject(idnum, 0, self)
             assert namesRef.getObject() == names
             if '/Dests' in names and isinstance(names['/Dests'], DictionaryObject):
                 dests = names['/Dests']
-                idnum = self._objects.index(dests) + 1
+                idnum = self._getIdnum(dests)
                 destsRef = IndirectObject(idnum, 0, self)
                 assert destsRef.getObject() == dests
                 if '/Names' in dests:
@@ -1039,6 +1279,9 @@ class PdfFileReader(object):
         ``warnings.py`` module with a custom implementation (defaults to
         ``True``).
     """
+    # total length of the decoded stream data kept for reuse
+    _decodeCacheSize = 32 * 1024 * 1024
+
     def __init__(self, stream, strict=True, warndest = None, overwriteWarnings = True):
         if overwriteWarnings:
             # have to dynamically override the default showwarning since there are no
@@ -1053,7 +1296,10 @@ class PdfFileReader(object):
             warnings.showwarning = _showwarning
         self.strict = strict
         self.flattenedPages = None
+        self._pageObjects = {} # pages found so far by descending the page tree
+        self._flatKids = {}
         self.resolvedObjects = {}
+        self._decodeCache = utils.SizedCache(self._decodeCacheSize)
         self.xrefIndex = 0
         self._pageId2Num = None # map page IndirectRef number to Page Number
         if hasattr(stream, 'mode') and 'b' not in stream.mode:
@@ -1133,6 +1379,9 @@ class PdfFileReader(object):
                 self._override_encryption = False
         else:
             if self.flattenedPages == None:
+                count = self._pageCount(self.trailer["/Root"]["/Pages"])
+                if count != None and count >= 0:
+                    return count
                 self._flatten()
             return len(self.flattenedPages)
 
@@ -1153,9 +1402,22 @@ class PdfFileReader(object):
         """
         ## ensure that we're not trying to access an encrypted PDF
         #assert not self.trailer.has_key("/Encrypt")
-        if self.flattenedPages == None:
-            self._flatten()
-        return self.flattenedPages[pageNumber]
+        if self.flattenedPages != None:
+            return self.flattenedPages[pageNumber]
+        if pageNumber < 0:
+            pageNumber += self.getNumPages()
+        page = self._pageObjects.get(pageNumber)
+        if page is None:
+            if not 0 <= pageNumber < self.getNumPages():
+                raise IndexError("page index out of range")
+            found = self._findPage(pageNumber)
+            if found == None:
+                # the page tree's counts are wrong; read all of it instead
+                self._flatten()
+                return self.flattenedPages[pageNumber]
+            page = self._pageObject(*found)
+            self._pageObjects[pageNumber] = page
+        return page
 
     namedDestinations = property(lambda self:
                                   self.getNamedDestinations(), None, None)
@@ -1466,23 +1728,111 @@ class PdfFileReader(object):
     """Read-only property accessing the
     :meth:`getPageMode()<PdfFileReader.getPageMode>` method."""
 
+    _inheritablePageAttributes = (
+        NameObject("/Resources"), NameObject("/MediaBox"),
+        NameObject("/CropBox"), NameObject("/Rotate")
+        )
+
+    def _findPage(self, pageNumber):
+        # Descends the page tree to the page numbered pageNumber, skipping
+        # over whole subtrees by their /Count, so that only the nodes on the
+        # way to the page are read.  Returns the page's dictionary, the
+        # attributes it inherits and its indirect reference, or None if the
+        # tree does not have the page it claims to.
+        node = self.trailer["/Root"]["/Pages"].getObject()
+        inherit = {}
+        n = pageNumber
+        visited = set()
+        while id(node) not in visited:
+            visited.add(id(node))
+            inherit = dict(inherit)
+            for attr in self._inheritablePageAttributes:
+                if attr in node:
+                    inherit[attr] = node[attr]
+            kids = node["/Kids"].getObject()
+            if n < len(kids) and self._onlyPages(kids):
+                # the usual flat list of pages
+                kid = kids[n]
+                return kid.getObject(), inherit, self._pageRef(kid)
+            for kid in kids:
+                obj = kid.getObject()
+                t = self._pageTreeNodeType(obj)
+                if t == "/Pages":
+                    count = self._pageCount(obj)
+                    if count == None:
+                        return None
+                    if n < count:
+                        node = obj
+                        break
+                    n -= count
+                elif t == "/Page":
+                    if n == 0:
+                        return obj, inherit, self._pageRef(kid)
+                    n -= 1
+            else:
+                return None
+        # a loop in the page tree
+        return None
+
+    def _onlyPages(self, kids):
+        # whether every one of kids is a page, rather than a page tree
+        # node; kept for each array of kids, with the array itself so that
+        # its id is not reused
+        found = self._flatKids.get(id(kids))
+        if found == None:
+            found = (kids, all(self._pageTreeNodeType(kid.getObject()) == "/Page"
+                               for kid in kids))
+            self._flatKids[id(kids)] = found
+        return found[1]
+
+    def _pageCount(self, node):
+        # the /Count of a page tree node, if it has a usable one
+        count = node.get("/Count")
+        if count != None:
+            count = count.getObject()
+        if isinstance(count, int):
+            return count
+        return None
+
+    def _pageTreeNodeType(self, node):
+        if "/Type" in node:
+            return node["/Type"]
+        return "/Pages"
+
+    def _pageRef(self, kid):
+        if isinstance(kid, IndirectObject):
+            return kid
+        return None
+
+    def _pageObject(self, page, inherit, indirectRef):
+        for attr, value in list(inherit.items()):
+            # if the page has it's own value, it does not inherit the
+            # parent's value:
+            if attr not in page:
+                page[attr] = value
+        pageObj = PageObject(self, indirectRef)
+        pageObj.update(page)
+        return pageObj
+
     def _flatten(self, pages=None, inherit=None, indirectRef=None):
-        inheritablePageAttributes = (
-            NameObject("/Resources"), NameObject("/MediaBox"),
-            NameObject("/CropBox"), NameObject("/Rotate")
-            )
+        inheritablePageAttributes = self._inheritablePageAttributes
         if inherit == None:
             inherit = dict()
         if pages == None:
             self.flattenedPages = []
             catalog = self.trailer["/Root"].getObject()
-            pages = catalog["/Pages"].getObject()
+            self._flatten(catalog["/Pages"].getObject(), inherit)
+            self._keepPageObjects()
+            return
 
         t = "/Pages"
         if "/Type" in pages:
             t = pages["/Type"]
 
         if t == "/Pages":
+            # a copy for each node, so that one branch's attributes are not
+            # inherited by its siblings
+            inherit = dict(inherit)
             for attr in inheritablePageAttributes:
                 if attr in pages:
                     inherit[attr] = pages[attr]
@@ -1492,14 +1842,22 @@ class PdfFileReader(object):
                     addt["indirectRef"] = page
                 self._flatten(page.getObject(), inherit, **addt)
         elif t == "/Page":
-            for attr, value in list(inherit.items()):
-                # if the page has it's own value, it does not inherit the
-                # parent's value:
-                if attr not in pages:
-                    pages[attr] = value
-            pageObj = PageObject(self, indirectRef)
-            pageObj.update(pages)
-            self.flattenedPages.append(pageObj)
+            self.flattenedPages.append(
+                self._pageObject(pages, inherit, indirectRef))
+
+    def _keepPageObjects(self):
+        # the pages already given out by getPage stay the same objects once
+        # the whole tree has been read, as callers such as the merger tell
+        # pages apart by their ids
+        found = {}
+        for page in self._pageObjects.values():
+            if page.indirectRef != None:
+                found[(page.indirectRef.idnum, page.indirectRef.generation)] = page
+        for i, page in enumerate(self.flattenedPages):
+            if page.indirectRef != None:
+                self.flattenedPages[i] = found.get(
+                    (page.indirectRef.idnum, page.indirectRef.generation), page)
+        self._pageObjects = {}
 
     def _getObjectFromStream(self, indirectReference):
         # indirect reference to object in object stream
@@ -1513,31 +1871,19 @@ class PdfFileReader(object):
         assert objStm['/Type'] == '/ObjStm'
         # /N is the number of indirect objects in the stream
         assert idx < objStm['/N']
-        streamData = BytesIO(b_(objStm.getData()))
-        for i in range(objStm['/N']):
-            readNonWhitespace(streamData)
-            streamData.seek(-1, 1)
-            objnum = NumberObject.readFromStream(streamData)
-            readNonWhitespace(streamData)
-            streamData.seek(-1, 1)
-            offset = NumberObject.readFromStream(streamData)
-            readNonWhitespace(streamData)
-            streamData.seek(-1, 1)
+        lexer = Lexer(b_(objStm.getData()), self)
+        # pairs of object number and offset precede the objects themselves
+        index = lexer.readIntegers(0, objStm['/First'])
+        for i in range(min(objStm['/N'], len(index) // 2)):
+            objnum, offset = index[2 * i], index[2 * i + 1]
             if objnum != indirectReference.idnum:
                 # We're only interested in one object
                 continue
             if self.strict and idx != i:
                 raise utils.PdfReadError("Object is in wrong index.")
-            streamData.seek(objStm['/First']+offset, 0)
-            if debug:
-                pos = streamData.tell()
-                streamData.seek(0, 0)
-                lines = streamData.readlines()
-                for i in range(0, len(lines)):
-                    print((lines[i]))
-                streamData.seek(pos, 0)
+            if debug: print((lexer.data[objStm['/First']+offset:]))
             try:
-                obj = readObject(streamData, self)
+                obj, pos = lexer.readObject(objStm['/First']+offset)
             except utils.PdfStreamError as e:
                 # Stream object cannot be read. Normally, a critical error, but
                 # Adobe Reader doesn't complain, so continue (in strict mode?)
@@ -1568,8 +1914,7 @@ class PdfFileReader(object):
                 indirectReference.idnum in self.xref[indirectReference.generation]:
             start = self.xref[indirectReference.generation][indirectReference.idnum]
             if debug: print(("  Uncompressed Object", indirectReference.idnum, indirectReference.generation, ":", start))
-            self.stream.seek(start, 0)
-            idnum, generation = self.readObjectHeader(self.stream)
+            idnum, generation, pos = self._lexer.readObjectHeader(start)
             if idnum != indirectReference.idnum and self.xrefIndex:
                 # Xref table probably had bad indexes due to not being zero-indexed
                 if self.strict:
@@ -1581,22 +1926,20 @@ class PdfFileReader(object):
                 raise utils.PdfReadError("Expected object ID (%d %d) does not match actual (%d %d)." \
                                          % (indirectReference.idnum, indirectReference.generation, idnum, generation))
             assert generation == indirectReference.generation
-            retval = readObject(self.stream, self)
+            retval, pos = self._lexer.readObject(pos)
 
             # override encryption is used for the /Encrypt dictionary
             if not self._override_encryption and self.isEncrypted:
                 # if we don't have the encryption key:
                 if not hasattr(self, '_decryption_key'):
                     raise utils.PdfReadError("file has not been decrypted")
-                # otherwise, decrypt here...
-                import struct
-                pack1 = struct.pack("<i", indirectReference.idnum)[:3]
-                pack2 = struct.pack("<i", indirectReference.generation)[:2]
-                key = self._decryption_key + pack1 + pack2
-                assert len(key) == (len(self._decryption_key) + 5)
-                md5_hash = md5(key).digest()
-                key = md5_hash[:min(16, len(self._decryption_key) + 5)]
-                retval = self._decryptObject(retval, key)
+                # otherwise, decrypt here (streams only once they are read)
+                stmMethod, strMethod = self._getCryptMethods()
+                retval = self._decryptObject(retval,
+                    self._decryptor(strMethod, indirectReference),
+                    self._decryptor(stmMethod, indirectReference))
+            if isinstance(retval, EncodedStreamObject):
+                retval._decodeCache = self._decodeCache
         else:
             warnings.warn("Object %d %d not defined."%(indirectReference.idnum,
                         indirectReference.generation), utils.PdfReadWarning)
@@ -1606,19 +1949,63 @@ class PdfFileReader(object):
                     indirectReference.idnum, retval)
         return retval
 
-    def _decryptObject(self, obj, key):
+    def _decryptObject(self, obj, decryptString, decryptStream):
         if isinstance(obj, ByteStringObject) or isinstance(obj, TextStringObject):
-            obj = createStringObject(utils.RC4_encrypt(key, obj.original_bytes))
-        elif isinstance(obj, StreamObject):
-            obj._data = utils.RC4_encrypt(key, obj._data)
-        elif isinstance(obj, DictionaryObject):
+            if decryptString != None:
+                obj = createStringObject(decryptString(obj.original_bytes))
+            return obj
+        if isinstance(obj, StreamObject) and decryptStream != None and \
+                (self._encryptMetadata() or obj.get("/Type") != "/Metadata"):
+            obj._decryptor = decryptStream
+        if isinstance(obj, DictionaryObject):
             for dictkey, value in list(obj.items()):
-                obj[dictkey] = self._decryptObject(value, key)
+                obj[dictkey] = self._decryptObject(value, decryptString, decryptStream)
         elif isinstance(obj, ArrayObject):
             for i in range(len(obj)):
-                obj[i] = self._decryptObject(obj[i], key)
+                obj[i] = self._decryptObject(obj[i], decryptString, decryptStream)
         return obj
 
+    def _getCryptMethods(self):
+        # The crypt filter methods (/V2 for RC4, /AESV2, /AESV3 or /None)
+        # applied to streams and to strings.
+        if not hasattr(self, '_cryptMethods'):
+            encrypt = self.trailer['/Encrypt'].getObject()
+            if encrypt['/V'] < 4:
+                self._cryptMethods = "/V2", "/V2"
+            else:
+                filters = encrypt.get("/CF", DictionaryObject()).getObject()
+                def method(name):
+                    if name == "/Identity":
+                        return "/None"
+                    return filters[name].getObject().get("/CFM", "/None")
+                self._cryptMethods = (method(encrypt.get("/StmF", "/Identity")),
+                                      method(encrypt.get("/StrF", "/Identity")))
+        return self._cryptMethods
+
+    def _encryptMetadata(self):
+        encrypt = self.trailer['/Encrypt'].getObject()
+        return encrypt.get("/EncryptMetadata", BooleanObject(True)).getObject().value
+
+    def _decryptor(self, method, indirectReference):
+        # Returns the function that decrypts a string or stream of the
+        # given object with the given crypt filter method, or None.
+        if method == "/None":
+            return None
+        key = self._decryption_key
+        if method != "/AESV3":
+            # algorithm 1: the key for each object mixes in its number
+            pack1 = struct.pack("<i", indirectReference.idnum)[:3]
+            pack2 = struct.pack("<i", indirectReference.generation)[:2]
+            key = key + pack1 + pack2
+            if method == "/AESV2":
+                key += b_("sAlT")
+            key = md5(key).digest()[:min(16, len(self._decryption_key) + 5)]
+        if method == "/V2":
+            return lambda data: crypto.rc4(key, data)
+        elif method in ("/AESV2", "/AESV3"):
+            return lambda data: crypto.aesDecrypt(key, data)
+        raise NotImplementedError("crypt filter method %s is not supported" % method)
+
     def readObjectHeader(self, stream):
         # Should never be necessary to read out whitespace, since the
         # cross-reference table should put us in the right spot to read the
@@ -1646,6 +2033,14 @@ class PdfFileReader(object):
         elif debug: print(("cache miss: %d %d"%(idnum, generation)))
         return out
 
+    def _uncacheIndirectObject(self, generation, idnum):
+        # Drops an object, and any data decoded from it, from the caches, so
+        # that a writer done with it doesn't keep it alive through this
+        # reader.  It is parsed again if asked for.
+        obj = self.resolvedObjects.pop((generation, idnum), None)
+        if isinstance(obj, StreamObject):
+            self._decodeCache.discard(id(obj))
+
     def cacheIndirectObject(self, generation, idnum, obj):
         # return None # Sometimes we want to turn off cache for debugging.
         if (generation, idnum) in self.resolvedObjects:
@@ -1658,6 +2053,13 @@ class PdfFileReader(object):
     def read(self, stream):
         debug = False
         if debug: print(">>read", stream)
+        # objects are parsed out of an in-memory copy of the whole file
+        if hasattr(stream, 'getvalue'):
+            data = stream.getvalue()
+        else:
+            stream.seek(0, 0)
+            data = stream.read()
+        self._lexer = Lexer(data, self)
         # start at the end:
         stream.seek(-1, 2)
         if not stream.tell():
@@ -1686,8 +2088,9 @@ class PdfFileReader(object):
                 raise utils.PdfReadError("startxref not found")
 
         # read all cross reference tables and their trailers
+        # {generation: {idnum: offset}}, with compact maps for the inner level
         self.xref = {}
-        self.xref_objStm = {}
+        self.xref_objStm = utils.ObjectNumberMap(width=2)
         self.trailer = DictionaryObject()
         while True:
             # load the xref table
@@ -1741,7 +2144,7 @@ class PdfFileReader(object):
                         offset, generation = line[:16].split(b_(" "))
                         offset, generation = int(offset), int(generation)
                         if generation not in self.xref:
-                            self.xref[generation] = {}
+                            self.xref[generation] = utils.ObjectNumberMap()
                         if num in self.xref[generation]:
                             # It really seems like we should allow the last
                             # xref table in the file to override previous
@@ -1823,7 +2226,7 @@ class PdfFileReader(object):
                             byte_offset = getEntry(1)
                             generation = getEntry(2)
                             if generation not in self.xref:
-                                self.xref[generation] = {}
+                                self.xref[generation] = utils.ObjectNumberMap()
                             if not used_before(num, generation):
                                 self.xref[generation][num] = byte_offset
                                 if debug: print(("XREF Uncompressed: %s %s"%(
@@ -1890,7 +2293,10 @@ class PdfFileReader(object):
             stream.seek(loc, 0) #return to where it was
 
     def _zeroXref(self, generation):
-        self.xref[generation] = dict( (k-self.xrefIndex, v) for (k, v) in list(self.xref[generation].items()) )
+        zeroed = utils.ObjectNumberMap()
+        for k, v in list(self.xref[generation].items()):
+            zeroed[k-self.xrefIndex] = v
+        self.xref[generation] = zeroed
 
     def _pairs(self, array):
         i = 0
@@ -1965,8 +2371,10 @@ class PdfFileReader(object):
         encrypt = self.trailer['/Encrypt'].getObject()
         if encrypt['/Filter'] != '/Standard':
             raise NotImplementedError("only Standard PDF encryption handler is available")
-        if not (encrypt['/V'] in (1, 2)):
-            raise NotImplementedError("only algorithm code 1 and 2 are supported")
+        if not (encrypt['/V'] in (1, 2, 4, 5)):
+            raise NotImplementedError("only algorithm code 1, 2, 4 and 5 are supported")
+        if encrypt['/V'] == 5:
+            return self._decryptAES256(password, encrypt)
         user_password, key = self._authenticateUserPassword(password)
         if user_password:
             self._decryption_key = key
@@ -1976,7 +2384,7 @@ class PdfFileReader(object):
             if rev == 2:
                 keylen = 5
             else:
-                keylen = encrypt['/Length'].getObject() // 8
+                keylen = _keyLength(encrypt)
             key = _alg33_1(password, rev, keylen)
             real_O = encrypt["/O"].getObject()
             if rev == 2:
@@ -2006,13 +2414,34 @@ class PdfFileReader(object):
         if rev == 2:
             U, key = _alg34(password, owner_entry, p_entry, id1_entry)
         elif rev >= 3:
-            U, key = _alg35(password, rev,
-                    encrypt["/Length"].getObject() // 8, owner_entry,
-                    p_entry, id1_entry,
-                    encrypt.get("/EncryptMetadata", BooleanObject(False)).getObject())
+            U, key = _alg35(password, rev, _keyLength(encrypt), owner_entry,
+                    p_entry, id1_entry, self._encryptMetadata())
             U, real_U = U[:16], real_U[:16]
         return U == real_U, key
 
+    def _decryptAES256(self, password, encrypt):
+        # Algorithms 2.A, 11 and 12 of ISO 32000-2: the AES-256 security
+        # handler (revisions 5 and 6), where the file key is stored
+        # encrypted under a hash of the password.
+        rev = encrypt['/R'].getObject()
+        if not isinstance(password, bytes):
+            password = password.encode("utf-8")
+        password = password[:127]
+        O = encrypt['/O'].getObject().original_bytes
+        U = encrypt['/U'].getObject().original_bytes
+        zeroIv = b_("\x00") * 16
+        if _alg2B(password, U[32:40], b_(""), rev) == U[:32]:
+            key = _alg2B(password, U[40:48], b_(""), rev)
+            self._decryption_key = crypto.aesCbcDecrypt(key, zeroIv,
+                    encrypt['/UE'].getObject().original_bytes)
+            return 1
+        if _alg2B(password, O[32:40], U[:48], rev) == O[:32]:
+            key = _alg2B(password, O[40:48], U[:48], rev)
+            self._decryption_key = crypto.aesCbcDecrypt(key, zeroIv,
+                    encrypt['/OE'].getObject().original_bytes)
+            return 2
+        return 0
+
     def getIsEncrypted(self):
         return "/Encrypt" in self.trailer
 
@@ -2024,6 +2453,52 @@ class PdfFileReader(object):
     """
 
 
+# codecs for the /Encoding names of simple fonts that Python knows
+_SIMPLE_ENCODINGS = {
+    "/WinAnsiEncoding": "cp1252",
+    "/MacRomanEncoding": "mac_roman",
+}
+
+
+def _simpleDecoder(encoding):
+    # The function turning the strings of a font without a /ToUnicode CMap
+    # into text, given its /Encoding: the name of a standard encoding
+    # Python knows, or a dictionary of a base encoding and differences from
+    # it.  None if the encoding doesn't say.
+    if isinstance(encoding, IndirectObject):
+        encoding = encoding.getObject()
+    if isinstance(encoding, NameObject):
+        codec = _SIMPLE_ENCODINGS.get(encoding)
+        if codec == None:
+            return None
+        return lambda data: data.decode(codec, "replace")
+    if not isinstance(encoding, DictionaryObject):
+        return None
+    base = encoding.get("/BaseEncoding")
+    differences = encoding.get("/Differences")
+    if differences != None:
+        differences = differences.getObject()
+    if not isinstance(differences, ArrayObject):
+        return _simpleDecoder(base)
+    if base != None:
+        base = base.getObject()
+    if isinstance(base, NameObject):
+        base = _SIMPLE_ENCODINGS.get(base)
+    else:
+        base = None
+    return SimpleEncoding(base, [item.getObject() for item in differences]).decode
+
+
+def _decodeText(string, decode):
+    # The text a string operand of a text-showing operator stands for, or
+    # None if it is not known.
+    if decode != None and isinstance(string, (ByteStringObject, TextStringObject)):
+        return decode(string.original_bytes)
+    if isinstance(string, TextStringObject):
+        return string
+    return None
+
+
 def getRectangle(self, name, defaults):
     retval = self.get(name)
     if isinstance(retval, RectangleObject):
@@ -2157,13 +2632,19 @@ class PageObject(DictionaryObject):
         if not rename:
             return stream
         stream = ContentStream(stream, pdf)
-        for operands, operator in stream.operations:
+        PageObject._renameOperands(stream.operations, rename)
+        return stream
+    _contentStreamRename = staticmethod(_contentStreamRename)
+
+    def _renameOperands(operations, rename):
+        for operands, operator in operations:
+            if operator == b_("INLINE IMAGE"):
+                continue
             for i in range(len(operands)):
                 op = operands[i]
                 if isinstance(op, NameObject):
                     operands[i] = rename.get(op,op)
-        return stream
-    _contentStreamRename = staticmethod(_contentStreamRename)
+    _renameOperands = staticmethod(_renameOperands)
 
     def _pushPopGS(contents, pdf):
         # adds a graphics state "push" and "pop" to the beginning and end
@@ -2300,6 +2781,89 @@ class PageObject(DictionaryObject):
         self._mergePage(page2, lambda page2Content:
             PageObject._addTransformationMatrix(page2Content, page2.pdf, ctm), ctm, expand)
 
+    def mergeTransformedPages(self, pages, ctms, expand=False):
+        """
+        Merges several pages into this one, each with a transformation
+        matrix applied, as :meth:`mergeTransformedPage` would one after
+        another.  This is much faster for laying many pages out on one (as
+        when printing n-up): the content of each page is parsed just once,
+        where merging pages one at a time re-reads everything merged so
+        far, and the bounds for ``expand`` are computed for all the pages
+        together.
+
+        :param pages: the :class:`PageObject<PageObject>` instances to be
+            merged into this one, each drawn on top of those before it.
+        :param ctms: a 6-element transformation matrix for each page, or a
+            single one for all of them.  Matrices may be composed in bulk
+            with :func:`composeTransformations<PyPDF2.utils.composeTransformations>`.
+        :param bool expand: Whether the page should be expanded to fit the
+            dimensions of the pages to be merged.
+        """
+        pages = list(pages)
+        if not utils._isMatrixBatch(ctms):
+            ctms = [ctms] * len(pages)
+        ctms = [[float(x) for x in ctm] for ctm in ctms]
+        if len(ctms) != len(pages):
+            raise ValueError("need one transformation matrix for each page")
+
+        resources = self["/Resources"].getObject()
+        procSet = set(resources.get("/ProcSet", ArrayObject()).getObject())
+        newAnnots = ArrayObject()
+        newContentArray = ArrayObject()
+
+        originalContent = self.getContents()
+        if originalContent is not None:
+            newContentArray.append(PageObject._pushPopGS(
+                  originalContent, self.pdf))
+
+        for page in [self] + pages:
+            if "/Annots" in page:
+                annots = page["/Annots"]
+                if isinstance(annots, ArrayObject):
+                    for ref in annots:
+                        newAnnots.append(ref)
+
+        for page2, ctm in zip(pages, ctms):
+            page2Resources = page2["/Resources"].getObject()
+            newResources = DictionaryObject()
+            rename = {}
+            for res in "/ExtGState", "/Font", "/XObject", "/ColorSpace", "/Pattern", "/Shading", "/Properties":
+                new, newrename = PageObject._mergeResources(resources, page2Resources, res)
+                if new:
+                    newResources[NameObject(res)] = new
+                    rename.update(newrename)
+            resources = newResources
+            procSet.update(page2Resources.get("/ProcSet", ArrayObject()).getObject())
+
+            page2Content = page2.getContents()
+            if page2Content is not None:
+                # transform, rename and isolate the page's operations in
+                # place, rather than reparsing it for each step
+                page2Content = ContentStream(page2Content, self.pdf)
+                operations = page2Content.operations
+                PageObject._renameOperands(operations, rename)
+                operations.insert(0, [[FloatObject(x) for x in ctm], b_("cm")])
+                operations.insert(0, [[], b_("q")])
+                operations.append([[], b_("Q")])
+                newContentArray.append(page2Content)
+
+        if expand and pages:
+            llx, lly, urx, ury = utils.transformedBounds(
+                [[page2.mediaBox.getLowerLeft_x(), page2.mediaBox.getLowerLeft_y(),
+                  page2.mediaBox.getUpperRight_x(), page2.mediaBox.getUpperRight_y()]
+                 for page2 in pages], ctms)
+            self.mediaBox.setLowerLeft([
+                min(float(self.mediaBox.getLowerLeft_x()), llx),
+                min(float(self.mediaBox.getLowerLeft_y()), lly)])
+            self.mediaBox.setUpperRight([
+                max(float(self.mediaBox.getUpperRight_x()), urx),
+                max(float(self.mediaBox.getUpperRight_y()), ury)])
+
+        resources[NameObject("/ProcSet")] = ArrayObject(procSet)
+        self[NameObject('/Contents')] = ContentStream(newContentArray, self.pdf)
+        self[NameObject('/Resources')] = resources
+        self[NameObject('/Annots')] = newAnnots
+
     def mergeScaledPage(self, page2, scale, expand=False):
         """
         This is similar to mergePage, but the stream to be merged is scaled
@@ -2363,22 +2927,14 @@ class PageObject(DictionaryObject):
             dimensions of the page to be merged.
         """
 
-        translation = [[1, 0, 0],
-                       [0, 1, 0],
-                       [-tx, -ty, 1]]
         rotation = math.radians(rotation)
-        rotating = [[math.cos(rotation), math.sin(rotation), 0],
-                    [-math.sin(rotation), math.cos(rotation), 0],
-                    [0,                  0,                  1]]
-        rtranslation = [[1, 0, 0],
-                       [0, 1, 0],
-                       [tx, ty, 1]]
-        ctm = utils.matrixMultiply(translation, rotating)
-        ctm = utils.matrixMultiply(ctm, rtranslation)
-
-        return self.mergeTransformedPage(page2, [ctm[0][0], ctm[0][1],
-                                                 ctm[1][0], ctm[1][1],
-                                                 ctm[2][0], ctm[2][1]], expand)
+        ctm = utils.composeTransformations(
+            [1, 0, 0, 1, -tx, -ty],
+            [math.cos(rotation), math.sin(rotation),
+             -math.sin(rotation), math.cos(rotation), 0, 0],
+            [1, 0, 0, 1, tx, ty])
+
+        return self.mergeTransformedPage(page2, ctm, expand)
 
     def mergeRotatedScaledPage(self, page2, rotation, scale, expand=False):
         """
@@ -2393,18 +2949,12 @@ class PageObject(DictionaryObject):
             dimensions of the page to be merged.
         """
         rotation = math.radians(rotation)
-        rotating = [[math.cos(rotation), math.sin(rotation), 0],
-                    [-math.sin(rotation), math.cos(rotation), 0],
-                    [0,                  0,                  1]]
-        scaling = [[scale, 0,    0],
-                   [0,    scale, 0],
-                   [0,    0,    1]]
-        ctm = utils.matrixMultiply(rotating, scaling)
+        ctm = utils.composeTransformations(
+            [math.cos(rotation), math.sin(rotation),
+             -math.sin(rotation), math.cos(rotation), 0, 0],
+            [scale, 0, 0, scale, 0, 0])
 
-        return self.mergeTransformedPage(page2,
-                                         [ctm[0][0], ctm[0][1],
-                                          ctm[1][0], ctm[1][1],
-                                          ctm[2][0], ctm[2][1]], expand)
+        return self.mergeTransformedPage(page2, ctm, expand)
 
     def mergeScaledTranslatedPage(self, page2, scale, tx, ty, expand=False):
         """
@@ -2420,17 +2970,10 @@ class PageObject(DictionaryObject):
             dimensions of the page to be merged.
         """
 
-        translation = [[1, 0, 0],
-                       [0, 1, 0],
-                       [tx, ty, 1]]
-        scaling = [[scale, 0,    0],
-                   [0,    scale, 0],
-                   [0,    0,    1]]
-        ctm = utils.matrixMultiply(scaling, translation)
+        ctm = utils.composeTransformations([scale, 0, 0, scale, 0, 0],
+                                           [1, 0, 0, 1, tx, ty])
 
-        return self.mergeTransformedPage(page2, [ctm[0][0], ctm[0][1],
-                                                 ctm[1][0], ctm[1][1],
-                                                 ctm[2][0], ctm[2][1]], expand)
+        return self.mergeTransformedPage(page2, ctm, expand)
 
     def mergeRotatedScaledTranslatedPage(self, page2, rotation, scale, tx, ty, expand=False):
         """
@@ -2446,22 +2989,14 @@ class PageObject(DictionaryObject):
         :param bool expand: Whether the page should be expanded to fit the
             dimensions of the page to be merged.
         """
-        translation = [[1, 0, 0],
-                       [0, 1, 0],
-                       [tx, ty, 1]]
         rotation = math.radians(rotation)
-        rotating = [[math.cos(rotation), math.sin(rotation), 0],
-                    [-math.sin(rotation), math.cos(rotation), 0],
-                    [0,                  0,                  1]]
-        scaling = [[scale, 0,    0],
-                   [0,    scale, 0],
-                   [0,    0,    1]]
-        ctm = utils.matrixMultiply(rotating, scaling)
-        ctm = utils.matrixMultiply(ctm, translation)
-
-        return self.mergeTransformedPage(page2, [ctm[0][0], ctm[0][1],
-                                                 ctm[1][0], ctm[1][1],
-                                                 ctm[2][0], ctm[2][1]], expand)
+        ctm = utils.composeTransformations(
+            [math.cos(rotation), math.sin(rotation),
+             -math.sin(rotation), math.cos(rotation), 0, 0],
+            [scale, 0, 0, scale, 0, 0],
+            [1, 0, 0, 1, tx, ty])
+
+        return self.mergeTransformedPage(page2, ctm, expand)
 
     ##
     # Applys a transformation matrix the page.
@@ -2562,36 +3097,86 @@ class PageObject(DictionaryObject):
 
         :return: a unicode string object.
         """
-        text = u_("")
+        text = []
         content = self["/Contents"].getObject()
         if not isinstance(content, ContentStream):
             content = ContentStream(content, self.pdf)
-        # Note: we check all strings are TextStringObjects.  ByteStringObjects
-        # are strings where the byte->string encoding was unknown, so adding
-        # them to the text here would be gibberish.
-        for operands, operator in content.operations:
-            if operator == b_("Tj"):
-                _text = operands[0]
-                if isinstance(_text, TextStringObject):
-                    text += _text
+        decoders = self._getTextDecoders()
+        decode = None
+        newline = u_("\n")
+        space = u_(" ")
+        # Note: without a decoder for the font, we check all strings are
+        # TextStringObjects.  ByteStringObjects are strings where the
+        # byte->string encoding was unknown, so adding them to the text here
+        # would be gibberish.
+        for operands, operator in content.iterOperations():
+            if operator == b_("Tf"):
+                decode = decoders.get(operands[0])
+            elif operator == b_("Tj"):
+                _text = _decodeText(operands[0], decode)
+                if _text != None:
+                    text.append(_text)
             elif operator == b_("T*"):
-                text += "\n"
+                text.append(newline)
             elif operator == b_("'"):
-                text += "\n"
-                _text = operands[0]
-                if isinstance(_text, TextStringObject):
-                    text += operands[0]
+                text.append(newline)
+                _text = _decodeText(operands[0], decode)
+                if _text != None:
+                    text.append(_text)
             elif operator == b_('"'):
-                _text = operands[2]
-                if isinstance(_text, TextStringObject):
-                    text += "\n"
-                    text += _text
+                _text = _decodeText(operands[2], decode)
+                if _text != None:
+                    text.append(newline)
+                    text.append(_text)
             elif operator == b_("TJ"):
                 for i in operands[0]:
-                    if isinstance(i, TextStringObject):
-                        text += i
-                text += "\n"
-        return text
+                    if isinstance(i, NumberObject) or isinstance(i, FloatObject):
+                        # a gap wider than a quarter of an em (in thousandths
+                        # of one) separates words rather than glyphs
+                        if i < -250:
+                            text.append(space)
+                        continue
+                    _text = _decodeText(i, decode)
+                    if _text != None:
+                        text.append(_text)
+                text.append(newline)
+        return u_("").join(text)
+
+    def _getTextDecoders(self):
+        # Maps the names of this page's fonts to functions turning their
+        # strings into text, for the fonts that say how to: through a
+        # /ToUnicode CMap, or a single-byte /Encoding.
+        decoders = {}
+        resources = self.get("/Resources")
+        if resources == None:
+            return decoders
+        fonts = resources.getObject().get("/Font")
+        if fonts == None:
+            return decoders
+        for name, font in fonts.getObject().items():
+            font = font.getObject()
+            if not isinstance(font, DictionaryObject):
+                continue
+            if "/ToUnicode" not in font:
+                decode = _simpleDecoder(font.get("/Encoding"))
+                if decode != None:
+                    decoders[name] = decode
+                continue
+            # the parsed CMap is kept with the font, which pages share
+            toUnicode = getattr(font, "_toUnicode", None)
+            if toUnicode == None:
+                stream = font["/ToUnicode"].getObject()
+                if not isinstance(stream, StreamObject):
+                    continue
+                try:
+                    toUnicode = ToUnicode(stream.getData())
+                except Exception:
+                    warnings.warn("Unreadable /ToUnicode CMap in font %s" % name,
+                                  utils.PdfReadWarning)
+                    continue
+                font._toUnicode = toUnicode
+            decoders[name] = toUnicode.decode
+        return decoders
 
     mediaBox = createRectangleAccessor("/MediaBox", ())
     """
@@ -2631,109 +3216,57 @@ class PageObject(DictionaryObject):
 
 
 class ContentStream(DecodedStreamObject):
+    """
+    The operations of a page's content stream.  They are parsed only as they
+    are iterated over by :meth:`iterOperations`, unless the
+    :attr:`operations` list is asked for (to be changed, say).
+    """
     def __init__(self, stream, pdf):
         self.pdf = pdf
-        self.operations = []
+        self._operations = None
         # stream may be a StreamObject or an ArrayObject containing
         # multiple StreamObjects to be cat'd together.
         stream = stream.getObject()
         if isinstance(stream, ArrayObject):
-            data = b_("")
-            for s in stream:
-                data += s.getObject().getData()
-            stream = BytesIO(b_(data))
+            # the parts may only be split between tokens, so a line break
+            # between each is harmless and stops tokens running together
+            self._source = b_("\n").join([b_(s.getObject().getData()) for s in stream])
         else:
-            stream = BytesIO(b_(stream.getData()))
-        self.__parseContentStream(stream)
+            self._source = b_(stream.getData())
 
-    def __parseContentStream(self, stream):
-        # file("f:\\tmp.txt", "w").write(stream.read())
-        stream.seek(0, 0)
-        operands = []
-        while True:
-            peek = readNonWhitespace(stream)
-            if peek == b_('') or ord_(peek) == 0:
-                break
-            stream.seek(-1, 1)
-            if peek.isalpha() or peek == b_("'") or peek == b_('"'):
-                operator = utils.readUntilRegex(stream,
-                        NameObject.delimiterPattern, True)
-                if operator == b_("BI"):
-                    # begin inline image - a completely different parsing
-                    # mechanism is required, of course... thanks buddy...
-                    assert operands == []
-                    ii = self._readInlineImage(stream)
-                    self.operations.append((ii, b_("INLINE IMAGE")))
-                else:
-                    self.operations.append((operands, operator))
-                    operands = []
-            elif peek == b_('%'):
-                # If we encounter a comment in the content stream, we have to
-                # handle it here.  Typically, readObject will handle
-                # encountering a comment -- but readObject assumes that
-                # following the comment must be the object we're trying to
-                # read.  In this case, it could be an operator instead.
-                while peek not in (b_('\r'), b_('\n')):
-                    peek = stream.read(1)
-            else:
-                operands.append(readObject(stream, None))
+    def iterOperations(self):
+        """
+        Iterates over the ``(operands, operator)`` pairs of the stream.  An
+        inline image is given as ``({"settings": ..., "data": ...},
+        b"INLINE IMAGE")``.
+        """
+        if self._operations != None:
+            return iter(self._operations)
+        return Lexer(self._source, None).readOperations()
 
-    def _readInlineImage(self, stream):
-        # begin reading just after the "BI" - begin image
-        # first read the dictionary of settings.
-        settings = DictionaryObject()
-        while True:
-            tok = readNonWhitespace(stream)
-            stream.seek(-1, 1)
-            if tok == b_("I"):
-                # "ID" - begin of image data
-                break
-            key = readObject(stream, self.pdf)
-            tok = readNonWhitespace(stream)
-            stream.seek(-1, 1)
-            value = readObject(stream, self.pdf)
-            settings[key] = value
-        # left at beginning of ID
-        tmp = stream.read(3)
-        assert tmp[:2] == b_("ID")
-        data = b_("")
-        while True:
-            # Read the inline image, while checking for EI (End Image) operator.
-            tok = stream.read(1)
-            if tok == b_("E"):
-                # Check for End Image
-                tok2 = stream.read(1)
-                if tok2 == b_("I"):
-                    # Sometimes that data will contain EI, so check for the Q operator.
-                    tok3 = stream.read(1)
-                    info = tok + tok2
-                    while tok3 in utils.WHITESPACES:
-                        info += tok3
-                        tok3 = stream.read(1)
-                    if tok3 == b_("Q"):
-                        stream.seek(-1, 1)
-                        break
-                    else:
-                        stream.seek(-1,1)
-                        data += info
-                else:
-                    stream.seek(-1, 1)
-                    data += tok
-            else:
-                data += tok
-        return {"settings": settings, "data": data}
+    def _getOperations(self):
+        if self._operations == None:
+            self._operations = list(self.iterOperations())
+            self._source = None
+        return self._operations
+
+    def _setOperations(self, operations):
+        self._operations = operations
+        self._source = None
+
+    operations = property(_getOperations, _setOperations)
 
     def _getData(self):
         newdata = BytesIO()
-        for operands, operator in self.operations:
-            if operator == "INLINE IMAGE":
-                newdata.write("BI")
-                dicttext = StringIO()
+        for operands, operator in self.iterOperations():
+            if operator == b_("INLINE IMAGE"):
+                newdata.write(b_("BI"))
+                dicttext = BytesIO()
                 operands["settings"].writeToStream(dicttext, None)
                 newdata.write(dicttext.getvalue()[2:-2])
-                newdata.write("ID ")
+                newdata.write(b_("ID "))
                 newdata.write(operands["data"])
-                newdata.write("EI")
+                newdata.write(b_("EI"))
             else:
                 for op in operands:
                     op.writeToStream(newdata, None)
@@ -2743,7 +3276,8 @@ class ContentStream(DecodedStreamObject):
         return newdata.getvalue()
 
     def _setData(self, value):
-        self.__parseContentStream(BytesIO(b_(value)))
+        self._source = b_(value)
+        self._operations = None
 
     _data = property(_getData, _setData)
 
@@ -2848,9 +3382,9 @@ def _alg32(password, rev, keylen, owner_entry, p_entry, id1_entry, metadata_encr
     # 5. Pass the first element of the file's file identifier array to the MD5
     # hash function.
     m.update(id1_entry.original_bytes)
-    # 6. (Revision 3 or greater) If document metadata is not being encrypted,
+    # 6. (Revision 4 or greater) If document metadata is not being encrypted,
     # pass 4 bytes with the value 0xFFFFFFFF to the MD5 hash function.
-    if rev >= 3 and not metadata_encrypt:
+    if rev >= 4 and not metadata_encrypt:
         m.update(b_("\xff\xff\xff\xff"))
     # 7. Finish the hash.
     md5_hash = m.digest()
@@ -2940,7 +3474,8 @@ def _alg34(password, owner_entry, p_entry, id1_entry):
 def _alg35(password, rev, keylen, owner_entry, p_entry, id1_entry, metadata_encrypt):
     # 1. Create an encryption key based on the user password string, as
     # described in Algorithm 3.2.
-    key = _alg32(password, rev, keylen, owner_entry, p_entry, id1_entry)
+    key = _alg32(password, rev, keylen, owner_entry, p_entry, id1_entry,
+                 metadata_encrypt)
     # 2. Initialize the MD5 hash function and pass the 32-byte padding string
     # shown in step 1 of Algorithm 3.2 as input to this function.
     m = md5()
@@ -2972,3 +3507,30 @@ def _alg35(password, rev, keylen, owner_entry, p_entry, id1_entry, metadata_encr
     # mean, so I have used null bytes.  This seems to match a few other
     # people's implementations)
     return val + (b_('\x00') * 16), key
+
+
+# Length in bytes of the file key for the RC4 and AES-128 handlers.
+def _keyLength(encrypt):
+    if "/Length" in encrypt:
+        return encrypt["/Length"].getObject() // 8
+    elif encrypt["/V"] == 4:
+        return 16
+    return 5
+
+
+# Implementation of algorithm 2.B of ISO 32000-2, which hashes a password for
+# the AES-256 security handler.  Revision 5 only takes the first SHA-256.
+def _alg2B(password, salt, udata, rev):
+    K = sha256(password + salt + udata).digest()
+    if rev < 6:
+        return K
+    hashes = (sha256, sha384, sha512)
+    i = 0
+    while True:
+        K1 = (password + K + udata) * 64
+        E = crypto.aesCbcEncrypt(K[:16], K[16:32], K1)
+        # the first 16 bytes of E as a big-endian number, modulo 3
+        K = hashes[sum(bytearray(E[:16])) % 3](E).digest()
+        i += 1
+        if i >= 64 and ord_(E[-1]) <= i - 32:
+            return K[:32]
@@ -33,6 +33,13 @@ __author_email__ = "biziqe@mathieu.fenniak.net"
 
 
 import sys
+from array import array
+from collections import OrderedDict
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 try:
     import __builtin__ as builtins
@@ -47,6 +54,24 @@ bytes_type = type(bytes()) # Works the same in Python 2.X and 3.X
 string_type = getattr(builtins, "unicode", str)
 int_types = (int, long) if sys.version_info[0] < 3 else (int,)
 
+# Python 2's array module has no 'q' typecode, and its 'l' is only 32 bits
+# on Windows, too narrow for offsets past 2 GiB, so a list is used there.
+try:
+    array('q')
+    int64_typecode = 'q'
+except ValueError:
+    int64_typecode = 'l' if array('l').itemsize >= 8 else None
+
+
+def int64_array(values=()):
+    """
+    Returns a compact sequence of 64-bit integers holding VALUES: an
+    ``array`` where there is a 64-bit typecode, otherwise a list.
+    """
+    if int64_typecode == None:
+        return list(values)
+    return array(int64_typecode, values)
+
 
 # Make basic type tests more consistent
 def isString(s):
@@ -165,21 +190,173 @@ class ConvertFunctionsToVirtualList(object):
         return self.getFunction(index)
 
 
+class ObjectNumberMap(object):
+    """
+    A compact mapping from object numbers to non-negative integers (byte
+    offsets, object numbers in another file, and so on).
+
+    Object numbers are allocated densely in almost every PDF, so values are
+    stored in a flat ``array`` indexed by object number, with -1 marking
+    unused slots. Entries whose object number lies far beyond the end of the
+    array, or whose value is negative, are kept in a dictionary instead, so
+    that a single stray object number does not allocate a huge array.
+
+    :param int width: number of integers stored per entry. When greater
+        than one, values are set and returned as tuples.
+    """
+    _SLACK = 1024
+
+    def __init__(self, width=1):
+        self._width = width
+        self._values = int64_array()
+        self._sparse = {}
+        self._len = 0
+
+    def _capacity(self):
+        return len(self._values) // self._width
+
+    def _fields(self, value):
+        if self._width == 1:
+            return (value,)
+        assert len(value) == self._width
+        return value
+
+    def __setitem__(self, idnum, value):
+        fields = self._fields(value)
+        cap = self._capacity()
+        if idnum >= cap and 0 <= idnum < 2 * cap + self._SLACK and fields[0] >= 0:
+            newcap = max(idnum + 1, 2 * cap)
+            self._values.extend(int64_array([-1]) *
+                                ((newcap - cap) * self._width))
+            cap = newcap
+        if 0 <= idnum < cap and fields[0] >= 0:
+            pos = idnum * self._width
+            if self._values[pos] == -1:
+                if idnum in self._sparse:
+                    del self._sparse[idnum]
+                else:
+                    self._len += 1
+            self._values[pos:pos + self._width] = int64_array(fields)
+        else:
+            if idnum not in self:
+                self._len += 1
+            elif 0 <= idnum < cap:
+                self._values[idnum * self._width] = -1
+            self._sparse[idnum] = value
+
+    def __getitem__(self, idnum):
+        if 0 <= idnum < self._capacity():
+            pos = idnum * self._width
+            if self._values[pos] != -1:
+                if self._width == 1:
+                    return self._values[pos]
+                return tuple(self._values[pos:pos + self._width])
+        return self._sparse[idnum]
+
+    def __delitem__(self, idnum):
+        if 0 <= idnum < self._capacity() and \
+                self._values[idnum * self._width] != -1:
+            self._values[idnum * self._width] = -1
+        else:
+            del self._sparse[idnum]
+        self._len -= 1
+
+    def __contains__(self, idnum):
+        if 0 <= idnum < self._capacity() and \
+                self._values[idnum * self._width] != -1:
+            return True
+        return idnum in self._sparse
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, idnum, default=None):
+        try:
+            return self[idnum]
+        except KeyError:
+            return default
+
+    def keys(self):
+        values, width = self._values, self._width
+        dense = [i for i in xrange_fn(self._capacity())
+                 if values[i * width] != -1]
+        return sorted(dense + list(self._sparse))
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def __repr__(self):
+        return "ObjectNumberMap(%r)" % dict(self.items())
+
+
+class SizedCache(object):
+    """
+    A least-recently-used cache whose entries each have a size (typically
+    the length of a byte string), discarding the oldest entries whenever
+    their total size would exceed a limit.
+
+    :param int maxSize: the limit on the total size of the entries.  An
+        entry bigger than this is never stored.
+    """
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, key, default=None):
+        try:
+            value, size = self._entries.pop(key)
+        except KeyError:
+            return default
+        self._entries[key] = value, size
+        return value
+
+    def put(self, key, value, size):
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        if size > self.maxSize:
+            return
+        while self._size + size > self.maxSize:
+            self._size -= self._entries.popitem(last=False)[1][1]
+        self._entries[key] = value, size
+        self._size += size
+
+    def discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry != None:
+            self._size -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
 def RC4_encrypt(key, plaintext):
-    S = [i for i in range(256)]
+    key = bytearray(b_(key))
+    keylen = len(key)
+    S = list(range(256))
     j = 0
     for i in range(256):
-        j = (j + S[i] + ord_(key[i % len(key)])) % 256
+        j = (j + S[i] + key[i % keylen]) & 0xff
         S[i], S[j] = S[j], S[i]
+    # the cipher XORs in place over a mutable copy; rebuilding an immutable
+    # string a byte at a time made this quadratic
+    data = bytearray(plaintext)
     i, j = 0, 0
-    retval = b_("")
-    for x in range(len(plaintext)):
-        i = (i + 1) % 256
-        j = (j + S[i]) % 256
-        S[i], S[j] = S[j], S[i]
-        t = S[(S[i] + S[j]) % 256]
-        retval += b_(chr(ord_(plaintext[x]) ^ t))
-    return retval
+    for x in range(len(data)):
+        i = (i + 1) & 0xff
+        si = S[i]
+        j = (j + si) & 0xff
+        sj = S[j]
+        S[i], S[j] = sj, si
+        data[x] ^= S[(si + sj) & 0xff]
+    return bytes(data)
 
 
 def matrixMultiply(a, b):
@@ -189,6 +366,84 @@ def matrixMultiply(a, b):
             for row in a]
 
 
+def _isMatrixBatch(ctm):
+    # a sequence of transformation matrices, rather than a single one
+    return len(ctm) > 0 and hasattr(ctm[0], "__len__")
+
+
+def composeTransformations(*ctms):
+    """
+    Composes transformation matrices, each given as the six operands of a
+    ``cm`` operator, into the one matrix that applies them in turn: the
+    first given is applied first.
+
+    Any of the arguments may instead be a sequence of matrices (or an
+    ``N x 6`` array), in which case a composed matrix is returned for each
+    of its matrices, with single matrices applying to all of them.  Batches
+    are composed with NumPy when it is installed.
+
+    :return: a list of six floats, or a list of such lists when any
+        argument was a sequence of matrices.
+    """
+    if not any(_isMatrixBatch(ctm) for ctm in ctms):
+        a, b, c, d, e, f = 1.0, 0.0, 0.0, 1.0, 0.0, 0.0
+        for ctm in ctms:
+            a2, b2, c2, d2, e2, f2 = [float(x) for x in ctm]
+            a, b, c, d, e, f = (a * a2 + b * c2, a * b2 + b * d2,
+                                c * a2 + d * c2, c * b2 + d * d2,
+                                e * a2 + f * c2 + e2, e * b2 + f * d2 + f2)
+        return [a, b, c, d, e, f]
+
+    if numpy == None:
+        n = max(len(ctm) for ctm in ctms if _isMatrixBatch(ctm))
+        batches = [ctm if _isMatrixBatch(ctm) else [ctm] * n for ctm in ctms]
+        return [composeTransformations(*matrices)
+                for matrices in zip(*batches)]
+
+    result = numpy.array([1.0, 0.0, 0.0, 1.0, 0.0, 0.0])
+    for ctm in ctms:
+        m = numpy.asarray(ctm, dtype=float)
+        a, b, c, d, e, f = [result[..., i] for i in range(6)]
+        a2, b2, c2, d2, e2, f2 = [m[..., i] for i in range(6)]
+        result = numpy.stack([a * a2 + b * c2, a * b2 + b * d2,
+                              c * a2 + d * c2, c * b2 + d * d2,
+                              e * a2 + f * c2 + e2, e * b2 + f * d2 + f2],
+                             axis=-1)
+    return result.tolist()
+
+
+def transformedBounds(boxes, ctms):
+    """
+    Finds the smallest rectangle enclosing all of ``boxes`` once each is
+    transformed by the corresponding matrix of ``ctms``.  The corners are
+    transformed all at once with NumPy when it is installed.
+
+    :param boxes: a sequence of ``(llx, lly, urx, ury)`` rectangles.
+    :param ctms: a transformation matrix (the six operands of a ``cm``
+        operator) for each box.
+    :return: the bounds ``(llx, lly, urx, ury)``.
+    """
+    if numpy != None:
+        box = numpy.asarray(boxes, dtype=float).reshape(-1, 4)
+        m = numpy.asarray(ctms, dtype=float).reshape(-1, 6)
+        # the four corners of each box, one box to a row
+        x = box[:, [0, 0, 2, 2]]
+        y = box[:, [1, 3, 3, 1]]
+        newX = m[:, 0:1] * x + m[:, 2:3] * y + m[:, 4:5]
+        newY = m[:, 1:2] * x + m[:, 3:4] * y + m[:, 5:6]
+        return (float(newX.min()), float(newY.min()),
+                float(newX.max()), float(newY.max()))
+
+    xs, ys = [], []
+    for box, ctm in zip(boxes, ctms):
+        llx, lly, urx, ury = [float(v) for v in box]
+        a, b, c, d, e, f = [float(v) for v in ctm]
+        for x, y in ((llx, lly), (llx, ury), (urx, ury), (urx, lly)):
+            xs.append(a * x + c * y + e)
+            ys.append(b * x + d * y + f)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
 def markLocation(stream):
     """Creates text file showing current location in context."""
     # Mainly for debugging
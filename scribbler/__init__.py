@@ -377,6 +377,43 @@ def pdf(ident, date, note):
     for n in note_files:
         click.launch(os.path.join(cur_notebook.location, n.pdf_path))
 
+
+@cli.command(help='Searches the text, titles, tags and dates of the notes, '
+                  'appendices and PDF files in the currently loaded notebook, '
+                  'as of when it was last built, and lists those best matching '
+                  'QUERY. All the words in QUERY must be found, except those '
+                  'prefixed with "-", which must not be. Words in double quotes '
+                  'must be found together and a word ending in "*" matches any '
+                  'word starting with it.')
+@click.argument('query', nargs=-1, required=True)
+@click.option('--limit', '-n', default=10,
+              help='The number of matches to list. Default: 10.')
+@click.option('--open', '-o', 'action', type=click.Choice(['src','html','pdf']),
+              help='Opens the source, HTML or PDF file of a match.')
+@click.option('--match', '-m', default=1,
+              help='The number of the match to open with `--open`. Default: 1.')
+def search(query, limit, action, match):
+    check_if_loaded(cur_notebook)
+    mark = (click.style('', bold=True, reset=False), click.style('', reset=True))
+    try:
+        results = cur_notebook.search(' '.join(query), limit, mark)
+    except ScribblerError as e:
+        click.echo(ERROR + str(e))
+        sys.exit(1)
+    if len(results) == 0:
+        click.echo('No matches found.')
+        sys.exit(1)
+    for i, r in enumerate(results):
+        click.echo(u'{:>3}. {:10}  {}  ({})'.format(i + 1, r.date, r.title, r.path))
+        click.echo(u'     ' + ' '.join(r.snippet.split()))
+    if action:
+        if not 1 <= match <= len(results):
+            click.echo(ERROR + 'There is no match {}.'.format(match))
+            sys.exit(1)
+        path = search_result_path(results[match - 1], action)
+        click.launch(os.path.join(cur_notebook.location, path))
+
+
 @cli.command(help='Opens the YAML file containing the notebook\'s settings.')
 def settings():
     check_if_loaded(cur_notebook)
@@ -454,6 +491,38 @@ def add_file(method, src, dest, nb=cur_notebook, force=False):
             else:
                 add_file(method, src, newpath(newname), nb)
 
+def search_result_path(result, action):
+    """
+    Returns the path, relative to the notebook root, of the source, HTML
+    or PDF file (as ACTION is 'src', 'html' or 'pdf') of the search
+    RESULT, building the notebook first if that file does not exist. A
+    PDF file in the notebook is all three.
+    """
+    if result.kind == 'pdf':
+        return result.path
+    if result.kind == 'article':
+        contents = cur_notebook.notes
+    else:
+        contents = cur_notebook.appendices
+    name = os.path.basename(result.path)
+    if name not in contents:
+        click.echo(ERROR + "'{}' is no longer in the notebook.".format(result.path))
+        sys.exit(1)
+    n = contents[name]
+    if action == 'src':
+        return n.src_path
+    path = n.html_path if action == 'html' else n.pdf_path
+    if not path:
+        try:
+            cur_notebook.build()
+        except ScribblerError as e:
+            click.echo(ERROR + str(e))
+            sys.exit(1)
+        n = contents[name]
+        path = n.html_path if action == 'html' else n.pdf_path
+    return path
+
+
 def note_from_ident(ident, date=True, notes=True):
     """
     Iterates through notes and returns a list of any matching IDENT.
@@ -9,8 +9,8 @@ also adds option to include an image by default if one exists in your article
 from pelican import signals
 from pelican.contents import Content, Article
 from pelican.generators import ArticlesGenerator
-from bs4 import BeautifulSoup
-from six import text_type
+
+from scribbler.html_analysis import analyse
 
 def init(pelican):
     global maximum_images
@@ -22,17 +22,18 @@ def init(pelican):
 def clean_summary(instance):
     if type(instance) == Article:
         summary = instance.summary
-        summary = BeautifulSoup(instance.summary, 'html.parser')
-        images = summary.findAll('img')
+        images = analyse(instance, summary).images
         if (len(images) > maximum_images):
-            for image in images[maximum_images:]:
-                image.extract()
+            # from the end, so that the earlier offsets still hold
+            for start, end in reversed(images[maximum_images:]):
+                summary = summary[:start] + summary[end:]
         if len(images) < 1 and minimum_one: #try to find one
-            content = BeautifulSoup(instance.content, 'html.parser')
-            first_image = content.find('img')
-            if first_image:
-                summary.insert(0, first_image)
-        instance._summary = text_type(summary)
+            content = instance.content
+            content_images = analyse(instance, content).images
+            if content_images:
+                start, end = content_images[0]
+                summary = content[start:end] + summary
+        instance._summary = summary
 
 
 def run_plugin(generators):
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  html_analysis.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+"""
+Contains the analysis of HTML shared by the Pelican plugins: its text, its
+images and its math. The HTML is read once, by a streaming parser which
+builds no tree, and what the plugins want from it is recorded along with
+where in the HTML it was found, so that they can edit the HTML by slicing
+it rather than by parsing and re-serialising it.
+"""
+
+try:
+    from html.parser import HTMLParser
+    from html.entities import name2codepoint
+except ImportError:
+    from HTMLParser import HTMLParser
+    from htmlentitydefs import name2codepoint
+
+try:
+    unichr
+except NameError:
+    unichr = chr
+
+# elements which have no end tag
+VOID_ELEMENTS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img',
+                           'input', 'link', 'meta', 'param', 'source',
+                           'track', 'wbr'])
+
+# elements whose contents are not text
+SKIPPED_ELEMENTS = frozenset(['script', 'style'])
+
+
+class MathNode(object):
+    """
+    An element with the class ``math``. The element runs from ``start``
+    to ``end`` in the HTML, its contents from ``inner_start`` to
+    ``inner_end``, and ``text`` is the text of its contents.
+    """
+    def __init__(self, start, inner_start):
+        self.start = start
+        self.inner_start = inner_start
+        self.inner_end = None
+        self.end = None
+        self.text = None
+
+
+class HtmlAnalysis(object):
+    """
+    The analysis of a string of HTML. Has attributes ``text``, the text of
+    the HTML with runs of white space collapsed; ``title``, the text of its
+    ``<title>`` element, or None; ``images``, the ``(start, end)`` of each
+    ``<img>`` tag in the HTML; and ``math``, a list of MathNode objects in
+    the order they start in.
+    """
+    def __init__(self, html):
+        self.html = html
+        self.images = []
+        self.math = []
+        self.title = None
+        parser = _Parser(self)
+        parser.feed(html)
+        parser.close()
+        self.text = parser.finish()
+        self.math.sort(key=lambda node: node.start)
+
+
+class _Parser(HTMLParser):
+    def __init__(self, analysis):
+        HTMLParser.__init__(self)
+        self.analysis = analysis
+        self.html = analysis.html
+        # the offsets of the starts of the lines, as getpos() gives the
+        # line and column
+        self.lines = [0]
+        i = self.html.find('\n')
+        while i >= 0:
+            self.lines.append(i + 1)
+            i = self.html.find('\n', i + 1)
+        self.text = []
+        self.open = []
+        self.open_math = []
+        self.skipping = 0
+        # whether the last thing read was text, which more text continues
+        self.in_text = False
+
+    def finish(self):
+        end = len(self.html)
+        for node, text in self.open_math:
+            self.end_math(node, end, end, text)
+        return ' '.join(' '.join(self.text).split())
+
+    def position(self):
+        line, column = self.getpos()
+        return self.lines[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        self.in_text = False
+        start = self.position()
+        end = start + len(self.get_starttag_text())
+        if tag == 'img':
+            self.analysis.images.append((start, end))
+        if tag in VOID_ELEMENTS:
+            return
+        node = None
+        classes = dict(attrs).get('class') or ''
+        if 'math' in classes.split():
+            node = MathNode(start, end)
+            self.open_math.append((node, len(self.text)))
+        if tag in SKIPPED_ELEMENTS:
+            self.skipping += 1
+        self.open.append((tag, node, len(self.text)))
+
+    def handle_startendtag(self, tag, attrs):
+        self.in_text = False
+        if tag == 'img':
+            start = self.position()
+            end = start + len(self.get_starttag_text())
+            self.analysis.images.append((start, end))
+
+    def handle_endtag(self, tag):
+        self.in_text = False
+        if not any(entry[0] == tag for entry in self.open):
+            # a stray end tag
+            return
+        start = self.position()
+        end = self.html.find('>', start) + 1 or len(self.html)
+        # closes any elements left open inside this one
+        while self.open:
+            t, node, text = self.open.pop()
+            if node is not None:
+                self.open_math.remove((node, text))
+                self.end_math(node, start, end, text)
+            if t in SKIPPED_ELEMENTS:
+                self.skipping -= 1
+            if t == 'title' and self.analysis.title is None:
+                title = ' '.join(self.text[text:])
+                self.analysis.title = ' '.join(title.split())
+            if t == tag:
+                break
+
+    def end_math(self, node, inner_end, end, text):
+        node.inner_end = inner_end
+        node.end = end
+        node.text = ''.join(self.text[text:])
+        self.analysis.math.append(node)
+
+    def handle_data(self, data):
+        if self.skipping:
+            return
+        if self.in_text:
+            self.text[-1] += data
+        else:
+            self.text.append(data)
+            self.in_text = True
+
+    def handle_entityref(self, name):
+        # only called by parsers which do not convert references themselves
+        if name in name2codepoint:
+            self.handle_data(unichr(name2codepoint[name]))
+        else:
+            self.handle_data('&{};'.format(name))
+
+    def handle_charref(self, name):
+        try:
+            if name[0] in 'xX':
+                self.handle_data(unichr(int(name[1:], 16)))
+            else:
+                self.handle_data(unichr(int(name)))
+        except ValueError:
+            self.handle_data('&#{};'.format(name))
+
+
+def analyse(instance, html):
+    """
+    Returns the HtmlAnalysis of HTML, the content or summary of the Pelican
+    content object INSTANCE. It is made the first time it is asked for and
+    kept on INSTANCE, so that each plugin asking for it afterwards gets the
+    same one.
+    """
+    analyses = instance.__dict__.setdefault('_html_analyses', {})
+    analysis = analyses.get(html)
+    if analysis is None:
+        analysis = analyses[html] = HtmlAnalysis(html)
+    return analysis
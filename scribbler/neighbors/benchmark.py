@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Times the linking of neighbors in a synthetic notebook. Run with
+
+    python -m scribbler.neighbors.benchmark [ARTICLES]
+
+which makes ARTICLES (default 50000) articles over a few years, spread
+over categories and subcategories, with one in ten translated.
+"""
+from __future__ import print_function
+
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from .neighbors import neighbors
+
+CATEGORIES = 20
+SUBCATEGORIES = 5
+LANGS = ['fr', 'de']
+
+
+class Category(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class Article(object):
+    def __init__(self, date, lang='en'):
+        self.date = date
+        self.lang = lang
+        self.translations = []
+
+
+class Generator(object):
+    def __init__(self, count, seed=0):
+        rand = random.Random(seed)
+        start = datetime(2010, 1, 1)
+        categories = defaultdict(list)
+        subcategories = defaultdict(list)
+        self.articles = []
+        for i in range(count):
+            article = Article(start + timedelta(minutes=rand.randrange(10 ** 7)))
+            if rand.random() < 0.1:
+                article.translations.append(Article(article.date,
+                                                    rand.choice(LANGS)))
+            category = 'category{}'.format(rand.randrange(CATEGORIES))
+            categories[category].append(article)
+            if rand.random() < 0.5:
+                sub = '{}/sub{}'.format(category, rand.randrange(SUBCATEGORIES))
+                subcategories[sub].append(article)
+            self.articles.append(article)
+        self.articles.sort(key=lambda a: a.date, reverse=True)
+        self.categories = [(Category(name), sorted(articles, key=lambda a: a.date,
+                                                   reverse=True))
+                           for name, articles in sorted(categories.items())]
+        self.subcategories = [(Category(name), sorted(articles, key=lambda a: a.date,
+                                                      reverse=True))
+                              for name, articles in sorted(subcategories.items())]
+
+
+def main(count=50000, runs=5):
+    generator = Generator(count)
+    times = []
+    for run in range(runs):
+        start = time.time()
+        neighbors(generator)
+        times.append(time.time() - start)
+    print('{} articles: best {:.3f}s of {} runs'.format(count, min(times), runs))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
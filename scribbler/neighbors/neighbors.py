@@ -3,56 +3,79 @@
 Neighbor Articles Plugin for Pelican
 ====================================
 
-This plugin adds ``next_article`` (newer) and ``prev_article`` (older) 
+This plugin adds ``next_article`` (newer) and ``prev_article`` (older)
 variables to the article's context
 """
+from collections import defaultdict
+from operator import attrgetter
+
 from pelican import signals
 
-def iter3(seq):
-    it = iter(seq)
-    nxt = None
-    cur = next(it)
-    for prv in it:
-        yield nxt, cur, prv
-        nxt, cur = cur, prv
-    yield nxt, cur, None
-
-def get_translation(article, prefered_language):
-    if not article:
-        return None
-    for translation in article.translations:
-        if translation.lang == prefered_language:
-            return translation
-    return article
-
-def set_neighbors(articles, next_name, prev_name):
-    for nxt, cur, prv in iter3(articles):
-        exec("cur.{} = nxt".format(next_name))
-        exec("cur.{} = prv".format(prev_name))
-
-        for translation in cur.translations:
-            exec(
-            "translation.{} = get_translation(nxt, translation.lang)".format(
-                next_name))
-            exec(
-            "translation.{} = get_translation(prv, translation.lang)".format(
-                prev_name))
-      
-def neighbors(generator):
-    set_neighbors(generator.articles, 'next_article', 'prev_article')
-    
+
+def translations_by_lang(article):
+    return dict((translation.lang, translation)
+                for translation in article.translations)
+
+
+def neighbor_groups(generator):
+    """
+    Returns, for each article (by its id), the groups of articles it has
+    neighbors in, as ``(next_name, prev_name, key)``: all the articles,
+    its category and each of its subcategories.
+    """
+    groups = defaultdict(lambda: [('next_article', 'prev_article', None)])
     for category, articles in generator.categories:
-        articles.sort(key=(lambda x: x.date), reverse=(True))
-        set_neighbors(
-            articles, 'next_article_in_category', 'prev_article_in_category')
-
-    if hasattr(generator, 'subcategories'):
-        for subcategory, articles in generator.subcategories:
-            articles.sort(key=(lambda x: x.date), reverse=(True))
-            index = subcategory.name.count('/')
-            next_name = 'next_article_in_subcategory{}'.format(index)
-            prev_name = 'prev_article_in_subcategory{}'.format(index)
-            set_neighbors(articles, next_name, prev_name)
+        group = ('next_article_in_category', 'prev_article_in_category',
+                 category)
+        for article in articles:
+            groups[id(article)].append(group)
+
+    for subcategory, articles in getattr(generator, 'subcategories', []):
+        index = subcategory.name.count('/')
+        group = ('next_article_in_subcategory{}'.format(index),
+                 'prev_article_in_subcategory{}'.format(index),
+                 subcategory)
+        for article in articles:
+            groups[id(article)].append(group)
+    return groups
+
+
+def set_neighbors(articles, groups):
+    """
+    Links each of ARTICLES, sorted newest first, to its neighbors in each
+    of its GROUPS (see :func:`neighbor_groups`), as are its translations
+    to theirs in the same language. Each article is linked as it is
+    reached to the last one reached in each of its groups, so that the
+    articles are gone through just once.
+    """
+    # the last article reached in each group, and its translations
+    newer = {}
+    for cur in articles:
+        cur_translations = translations_by_lang(cur)
+        for next_name, prev_name, key in groups[id(cur)]:
+            nxt, nxt_translations = newer.get((next_name, key), (None, None))
+            setattr(cur, next_name, nxt)
+            setattr(cur, prev_name, None)
+            for translation in cur.translations:
+                if nxt is not None:
+                    setattr(translation, next_name,
+                            nxt_translations.get(translation.lang, nxt))
+                else:
+                    setattr(translation, next_name, None)
+                setattr(translation, prev_name, None)
+            if nxt is not None:
+                setattr(nxt, prev_name, cur)
+                for translation in nxt.translations:
+                    setattr(translation, prev_name,
+                            cur_translations.get(translation.lang, cur))
+            newer[(next_name, key)] = (cur, cur_translations)
+
+
+def neighbors(generator):
+    # a stable sort, which is quick when the articles are already in order
+    articles = sorted(generator.articles, key=attrgetter('date'), reverse=True)
+    set_neighbors(articles, neighbor_groups(generator))
+
 
 def register():
     signals.article_generator_finalized.connect(neighbors)
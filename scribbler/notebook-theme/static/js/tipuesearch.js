@@ -1,21 +1,340 @@
-
 /*
 Tipue Search 4.0
 Copyright (c) 2014 Tipue
 Tipue Search is released under the MIT License
 http://www.tipue.com/search
-*/ 
+*/
 
 /*
 Modified by Chris MacMackin, May 17 2015
+
+Searches the inverted index written by the tipue_search plugin
+(tipuesearch_index.js) rather than the text of every page.
 */
 
 (function($) {
 
+     // These must match tokenize() and stem() in
+     // scribbler/tipue_search/index.py
+     var separators = /[\s\x1c-\x1f\x85\u180e\ufeff!-\/:-@\[-`{-~\u00a0-\u00bf\u2000-\u206f]+/;
+     var suffixes = [['ies', 'y'], ['sses', 'ss'], ['ss', null], ['us', null],
+                     ['is', null], ['s', ''], ['ing', ''], ['ed', '']];
+     var min_stem = 3;
+
+     function tokenize(text)
+     {
+          var words = text.toLowerCase().split(separators);
+          var out = [];
+          for (var i = 0; i < words.length; i++)
+          {
+               if (words[i].length > 1)
+               {
+                    out.push(words[i]);
+               }
+          }
+          return out;
+     }
+
+     function endsWith(word, suffix)
+     {
+          return word.length >= suffix.length &&
+                 word.substring(word.length - suffix.length) == suffix;
+     }
+
+     function stem(word)
+     {
+          if (word.length <= min_stem)
+          {
+               return word;
+          }
+          for (var i = 0; i < suffixes.length; i++)
+          {
+               if (endsWith(word, suffixes[i][0]))
+               {
+                    if (suffixes[i][1] === null)
+                    {
+                         return word;
+                    }
+                    var stemmed = word.substring(0, word.length - suffixes[i][0].length) + suffixes[i][1];
+                    return stemmed.length >= min_stem ? stemmed : word;
+               }
+          }
+          return word;
+     }
+
+     function escapeHtml(text)
+     {
+          return text.replace(/&/g, '&amp;').replace(/</g, '&lt;')
+                     .replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+     }
+
+     function escapeRegExp(text)
+     {
+          return text.replace(/[.*+?^${}()|[\]\\\/]/g, '\\$&');
+     }
+
+     // The shards of the index register themselves with these as they load
+     var shard_terms = {};
+     var shard_pages = {};
+
+     window.tipuesearch_add_terms = function(prefix, terms)
+     {
+          var keys = [];
+          for (var term in terms)
+          {
+               if (terms.hasOwnProperty(term))
+               {
+                    keys.push(term);
+               }
+          }
+          // sorted so that the terms starting with a stem can be found by
+          // binary search
+          keys.sort();
+          shard_terms[prefix] = {terms: terms, keys: keys};
+     };
+
+     window.tipuesearch_add_pages = function(first, pages)
+     {
+          for (var i = 0; i < pages.length; i++)
+          {
+               shard_pages[first + i] = pages[i];
+          }
+     };
+
+     // The scripts being loaded, by URL, with the callbacks waiting for
+     // them; true once they have loaded (or failed to)
+     var scripts = {};
+
+     // Loads the scripts at URLS by adding them to the page, which unlike
+     // XMLHttpRequest works for pages opened from file://, then calls
+     // CALLBACK.
+     function loadScripts(urls, callback)
+     {
+          var pending = 1;
+          function done()
+          {
+               if (--pending == 0)
+               {
+                    callback();
+               }
+          }
+          for (var i = 0; i < urls.length; i++)
+          {
+               var url = urls[i];
+               if (scripts[url] === true)
+               {
+                    continue;
+               }
+               pending++;
+               if (scripts[url])
+               {
+                    scripts[url].push(done);
+                    continue;
+               }
+               scripts[url] = [done];
+               var script = document.createElement('script');
+               script.type = 'text/javascript';
+               script.onload = script.onerror = (function(url)
+               {
+                    return function()
+                    {
+                         var waiting = scripts[url];
+                         scripts[url] = true;
+                         for (var w = 0; w < waiting.length; w++)
+                         {
+                              waiting[w]();
+                         }
+                    };
+               })(url);
+               script.src = url;
+               document.getElementsByTagName('head')[0].appendChild(script);
+          }
+          done();
+     }
+
+     // The index described by MANIFEST (tipuesearch_index.js), whose shards
+     // are loaded from LOCATION as they are needed
+     function Index(manifest, location)
+     {
+          this.manifest = manifest;
+          this.location = location;
+          this.stop = {};
+          for (var i = 0; i < manifest.stop.length; i++)
+          {
+               this.stop[manifest.stop[i]] = true;
+          }
+          for (var i = 0; i < tipuesearch_stop_words.length; i++)
+          {
+               this.stop[tipuesearch_stop_words[i]] = true;
+          }
+     }
+
+     // Returns the prefixes of the shards holding STEM and, if it is at
+     // least MINIMUM characters long, the terms it starts.
+     Index.prototype.prefixes = function(stem, minimum)
+     {
+          var length = this.manifest.prefixLength;
+          var terms = this.manifest.terms;
+          if (stem.length >= length)
+          {
+               return [stem.substring(0, length)];
+          }
+          var out = [stem];
+          if (stem.length >= minimum)
+          {
+               for (var prefix in terms)
+               {
+                    if (terms.hasOwnProperty(prefix) && prefix != stem && prefix.indexOf(stem) == 0)
+                    {
+                         out.push(prefix);
+                    }
+               }
+          }
+          return out;
+     };
+
+     // Loads the shards needed to look up STEMS, then calls CALLBACK.
+     Index.prototype.loadTerms = function(stems, minimum, callback)
+     {
+          var urls = [];
+          for (var s = 0; s < stems.length; s++)
+          {
+               var prefixes = this.prefixes(stems[s], minimum);
+               for (var i = 0; i < prefixes.length; i++)
+               {
+                    if (this.manifest.terms.hasOwnProperty(prefixes[i]))
+                    {
+                         urls.push(this.location + this.manifest.terms[prefixes[i]]);
+                    }
+               }
+          }
+          loadScripts(urls, callback);
+     };
+
+     // Loads the metadata of the numbered PAGES, then calls CALLBACK.
+     Index.prototype.loadPages = function(pages, callback)
+     {
+          var urls = [];
+          for (var i = 0; i < pages.length; i++)
+          {
+               urls.push(this.location + 'pages-' + Math.floor(pages[i] / this.manifest.pageShardSize) + '.js');
+          }
+          loadScripts(urls, callback);
+     };
+
+     Index.prototype.page = function(i)
+     {
+          return shard_pages[i];
+     };
+
+     // Returns the posting list, sorted by page, of the pages containing any
+     // of the terms in STEMS. A stem of at least MINIMUM characters also
+     // matches the longer terms it starts, at half weight. The shards must
+     // have been loaded.
+     Index.prototype.postings = function(stems, minimum)
+     {
+          var weights = {};
+          for (var s = 0; s < stems.length; s++)
+          {
+               var prefixes = this.prefixes(stems[s], minimum);
+               for (var i = 0; i < prefixes.length; i++)
+               {
+                    var shard = shard_terms.hasOwnProperty(prefixes[i]) ? shard_terms[prefixes[i]] : null;
+                    if (shard)
+                    {
+                         addPostings(weights, shard, stems[s], minimum);
+                    }
+               }
+          }
+          var out = [];
+          for (var page in weights)
+          {
+               if (weights.hasOwnProperty(page))
+               {
+                    out.push([parseInt(page, 10), weights[page]]);
+               }
+          }
+          out.sort(function(a, b) { return a[0] - b[0]; });
+          return out;
+     };
+
+     function addPostings(weights, shard, stem, minimum)
+     {
+          var keys = shard.keys;
+          var lo = 0, hi = keys.length;
+          while (lo < hi)
+          {
+               var mid = (lo + hi) >> 1;
+               if (keys[mid] < stem)
+               {
+                    lo = mid + 1;
+               }
+               else
+               {
+                    hi = mid;
+               }
+          }
+          for (var k = lo; k < keys.length; k++)
+          {
+               var exact = keys[k] == stem;
+               if (!exact && (stem.length < minimum || keys[k].indexOf(stem) != 0))
+               {
+                    break;
+               }
+               // "gap,weight,gap,weight..." in base 36; see
+               // encode_postings() in index.py
+               var list = shard.terms[keys[k]].split(',');
+               var page = 0;
+               for (var p = 0; p < list.length; p += 2)
+               {
+                    page += parseInt(list[p], 36);
+                    var w = parseInt(list[p + 1], 36);
+                    weights[page] = Math.max(weights[page] || 0, exact ? w : w / 2);
+               }
+          }
+     }
+
+     // Intersects posting lists, shortest first, summing each term's weight
+     // scaled by how rare the term is.
+     Index.prototype.intersect = function(lists)
+     {
+          var n = this.manifest.pages;
+          lists.sort(function(a, b) { return a.length - b.length; });
+          var found = [];
+          for (var i = 0; i < lists[0].length; i++)
+          {
+               found.push([lists[0][i][0], lists[0][i][1] * Math.log(1 + n / lists[0].length)]);
+          }
+          for (var l = 1; l < lists.length && found.length; l++)
+          {
+               var list = lists[l];
+               var idf = Math.log(1 + n / list.length);
+               var kept = [];
+               var j = 0;
+               for (var i = 0; i < found.length; i++)
+               {
+                    while (j < list.length && list[j][0] < found[i][0])
+                    {
+                         j++;
+                    }
+                    if (j == list.length)
+                    {
+                         break;
+                    }
+                    if (list[j][0] == found[i][0])
+                    {
+                         kept.push([found[i][0], found[i][1] + list[j][1] * idf]);
+                    }
+               }
+               found = kept;
+          }
+          return found;
+     };
+
      $.fn.tipuesearch = function(options) {
 
           var set = $.extend( {
-          
+
                'show'                   : 7,
                'newWindow'              : false,
                'showURL'                : true,
@@ -23,75 +342,19 @@ Modified by Chris MacMackin, May 17 2015
                'descriptiveWords'       : 25,
                'highlightTerms'         : true,
                'highlightEveryTerm'     : false,
-               'mode'                   : 'static',
-               'liveDescription'        : '*',
-               'liveContent'            : '*',
-               'contentLocation'        : 'tipuesearch/tipuesearch_content.json'
-          
-          }, options);
-          
-          return this.each(function() {
+               'indexLocation'          : 'tipuesearch/'
 
-               var tipuesearch_in = {
-                    pages: []
-               };
-               $.ajaxSetup({
-                    async: false
-               });
+          }, options);
 
-               if (set.mode == 'live')
-               {
-                    for (var i = 0; i < tipuesearch_pages.length; i++)
-                    {
-                         $.get(tipuesearch_pages[i], '',
-                              function (html)
-                              {
-                                   var cont = $(set.liveContent, html).text();
-                                   cont = cont.replace(/\s+/g, ' ');
-                                   var desc = $(set.liveDescription, html).text();
-                                   desc = desc.replace(/\s+/g, ' ');
-                                                                      
-                                   var t_1 = html.toLowerCase().indexOf('<title>');
-                                   var t_2 = html.toLowerCase().indexOf('</title>', t_1 + 7);
-                                   if (t_1 != -1 && t_2 != -1)
-                                   {
-                                        var tit = html.slice(t_1 + 7, t_2);
-                                   }
-                                   else
-                                   {
-                                        var tit = 'No title';
-                                   }
+          return this.each(function() {
 
-                                   tipuesearch_in.pages.push({
-                                        "title": tit,
-                                        "text": desc,
-                                        "tags": cont,
-                                        "loc": tipuesearch_pages[i] 
-                                   });    
-                              }
-                         );
-                    }
-               }
-               
-               if (set.mode == 'json')
-               {
-                    $.getJSON(set.contentLocation,
-                         function(json)
-                         {
-                              tipuesearch_in = $.extend({}, json);
-                         }
-                    );
-               }
+               var index = new Index(tipuesearch_index, set.indexLocation);
+               var searches = 0;
 
-               if (set.mode == 'static')
-               {
-                    tipuesearch_in = $.extend({}, tipuesearch);
-               }                              
-               
                var tipue_search_w = '';
                if (set.newWindow)
                {
-                    tipue_search_w = ' target="_blank"';      
+                    tipue_search_w = ' target="_blank"';
                }
 
                function getURLP(name)
@@ -102,8 +365,8 @@ Modified by Chris MacMackin, May 17 2015
                {
                     $('#tipue_search_input').val(getURLP('q'));
                     getTipueSearch(0, true);
-               }               
-               
+               }
+
                $(this).keyup(function(event)
                {
                     if(event.keyCode == '13')
@@ -112,348 +375,333 @@ Modified by Chris MacMackin, May 17 2015
                     }
                });
 
+               // Splits the query D into its terms, each with the stems it
+               // may match and whether it starts with '-', to leave out the
+               // pages it is in.
+               function parse(d)
+               {
+                    var words = d.split(' ');
+                    var terms = [];
+                    var stems = [];
+                    for (var i = 0; i < words.length; i++)
+                    {
+                         var negate = words[i].charAt(0) == '-';
+                         var word = negate ? words[i].substring(1) : words[i];
+                         var tokens = tokenize(word);
+                         for (var t = 0; t < tokens.length; t++)
+                         {
+                              if (index.stop[tokens[t]])
+                              {
+                                   continue;
+                              }
+                              var term = {stems: [stem(tokens[t])], negate: negate};
+                              for (var f = 0; f < tipuesearch_stem.words.length; f++)
+                              {
+                                   // the listed words may contain separators
+                                   // ('e-mail'), so match the whole word too
+                                   if (tokens[t] == tipuesearch_stem.words[f].word ||
+                                       (tokens.length == 1 && word == tipuesearch_stem.words[f].word))
+                                   {
+                                        term.stems.push(stem(tipuesearch_stem.words[f].stem));
+                                   }
+                              }
+                              terms.push(term);
+                              stems = stems.concat(term.stems);
+                         }
+                    }
+                    return {terms: terms, stems: stems};
+               }
+
+               // Returns the pages matching every term of QUERY and none of
+               // its terms to leave out, best first, and the stems to
+               // highlight in their descriptions. The shards holding the
+               // query's stems must have been loaded.
+               function search(query)
+               {
+                    var lists = [];
+                    var excluded = {};
+                    var highlight = [];
+                    for (var i = 0; i < query.terms.length; i++)
+                    {
+                         var term = query.terms[i];
+                         var list = index.postings(term.stems, set.minimumLength);
+                         if (term.negate)
+                         {
+                              for (var p = 0; p < list.length; p++)
+                              {
+                                   excluded[list[p][0]] = true;
+                              }
+                         }
+                         else
+                         {
+                              lists.push(list);
+                              highlight = highlight.concat(term.stems);
+                         }
+                    }
+                    var found = [];
+                    if (lists.length)
+                    {
+                         var matches = index.intersect(lists);
+                         for (var i = 0; i < matches.length; i++)
+                         {
+                              if (!excluded[matches[i][0]])
+                              {
+                                   found.push(matches[i]);
+                              }
+                         }
+                         found.sort(function(a, b) { return b[1] - a[1] || a[0] - b[0]; });
+                    }
+                    return {found: found, highlight: highlight};
+               }
+
+               function describe(page, highlight)
+               {
+                    var t_w = page.text.split(' ');
+                    var t_d = t_w.slice(0, set.descriptiveWords).join(' ');
+                    t_d = escapeHtml($.trim(t_d));
+                    if (set.highlightTerms)
+                    {
+                         for (var f = 0; f < highlight.length; f++)
+                         {
+                              var patr = new RegExp('(' + escapeRegExp(escapeHtml(highlight[f])) + ')',
+                                                    set.highlightEveryTerm ? 'gi' : 'i');
+                              t_d = t_d.replace(patr, "<span class=\"h01\">$1</span>");
+                         }
+                    }
+                    if (t_d.charAt(t_d.length - 1) != '.')
+                    {
+                         t_d += ' ...';
+                    }
+                    return t_d;
+               }
+
                function getTipueSearch(start, replace)
                {
                     $('#tipue_search_content').hide();
                     var out = '';
-                    var results = '';
+                    var d_r;
                     var show_replace = false;
                     var show_stop = false;
-                    var standard = true;
-                    var c = 0;
-                    found = new Array();
-                    
+
                     var d = $('#tipue_search_input').val().toLowerCase();
                     d = $.trim(d);
-                    
+
+                    // Quoted phrases are searched for as all of their words
                     if ((d.match("^\"") && d.match("\"$")) || (d.match("^'") && d.match("'$")))
                     {
-                         standard = false;
+                         d = d.substring(1, d.length - 1);
                     }
-                    
-                    if (standard)
+
+                    var d_w = d.split(' ');
+                    d = '';
+                    for (var i = 0; i < d_w.length; i++)
                     {
-                         var d_w = d.split(' ');
-                         d = '';
-                         for (var i = 0; i < d_w.length; i++)
+                         if (index.stop[d_w[i]])
                          {
-                              var a_w = true;
-                              for (var f = 0; f < tipuesearch_stop_words.length; f++)
-                              {
-                                   if (d_w[i] == tipuesearch_stop_words[f])
-                                   {
-                                        a_w = false;
-                                        show_stop = true;          
-                                   }
-                              }
-                              if (a_w)
-                              {
-                                   d = d + ' ' + d_w[i];
-                              }
+                              show_stop = true;
+                         }
+                         else
+                         {
+                              d = d + ' ' + d_w[i];
                          }
-                         d = $.trim(d);
-                         d_w = d.split(' ');
-                    }
-                    else
-                    {
-                         d = d.substring(1, d.length - 1);
                     }
-               
+                    d = $.trim(d);
+
                     if (d.length >= set.minimumLength)
                     {
-                         if (standard)
+                         if (replace)
                          {
-                              if (replace)
-                              {
-                                   var d_r = d;
-                                   for (var i = 0; i < d_w.length; i++)
-                                   {
-                                        for (var f = 0; f < tipuesearch_replace.words.length; f++)
-                                        {
-                                             if (d_w[i] == tipuesearch_replace.words[f].word)
-                                             {
-                                                  d = d.replace(d_w[i], tipuesearch_replace.words[f].replace_with);
-                                                  show_replace = true;
-                                             }
-                                        }
-                                   }
-                                   d_w = d.split(' ');
-                              }                   
-                    
-                              var d_t = d;
+                              d_r = d;
+                              d_w = d.split(' ');
                               for (var i = 0; i < d_w.length; i++)
                               {
-                                   for (var f = 0; f < tipuesearch_stem.words.length; f++)
+                                   for (var f = 0; f < tipuesearch_replace.words.length; f++)
                                    {
-                                        if (d_w[i] == tipuesearch_stem.words[f].word)
+                                        if (d_w[i] == tipuesearch_replace.words[f].word)
                                         {
-                                             d_t = d_t + ' ' + tipuesearch_stem.words[f].stem;
+                                             d = d.replace(d_w[i], tipuesearch_replace.words[f].replace_with);
+                                             show_replace = true;
                                         }
                                    }
                               }
-                              d_w = d_t.split(' ');
+                         }
 
-                              for (var i = 0; i < tipuesearch_in.pages.length; i++)
+                         var query = parse(d);
+                         var serial = ++searches;
+                         index.loadTerms(query.stems, set.minimumLength, function()
+                         {
+                              var results = search(query);
+                              var shown = [];
+                              for (var i = start; i < results.found.length && i < start + set.show; i++)
                               {
-                                   var score = 1000000000;
-                                   var s_t = tipuesearch_in.pages[i].text;
-                                   for (var f = 0; f < d_w.length; f++)
-                                   {
-                                        var pat = new RegExp(d_w[f], 'i');
-                                        if (tipuesearch_in.pages[i].title.search(pat) != -1)
-                                        {
-                                             score -= (200000 - i);
-                                        }
-                                        if (tipuesearch_in.pages[i].text.search(pat) != -1)
-                                        {
-                                             score -= (150000 - i);
-                                        }
-                                        
-                                        if (set.highlightTerms)
-                                        {
-                                             if (set.highlightEveryTerm) 
-                                             {
-                                                  var patr = new RegExp('(' + d_w[f] + ')', 'gi');
-                                             }
-                                             else
-                                             {
-                                                  var patr = new RegExp('(' + d_w[f] + ')', 'i');
-                                             }
-                                             s_t = s_t.replace(patr, "<span class=\"h01\">$1</span>");
-                                        }
-                                        if (tipuesearch_in.pages[i].tags.search(pat) != -1)
-                                        {
-                                             score -= (100000 - i);
-                                        }
-                                        
-                                        if (d_w[f].match("^-"))
-                                        {
-                                             pat = new RegExp(d_w[f].substring(1), 'i');
-                                             if (tipuesearch_in.pages[i].title.search(pat) != -1 || tipuesearch_in.pages[i].text.search(pat) != -1 || tipuesearch_in.pages[i].tags.search(pat) != -1)
-                                             {
-                                                  score = 1000000000;     
-                                             }    
-                                        }
-                                   }
-                                   
-                                   if (score < 1000000000)
+                                   shown.push(results.found[i][0]);
+                              }
+                              index.loadPages(shown, function()
+                              {
+                                   // unless a later search has been started
+                                   if (serial == searches)
                                    {
-                                        found[c++] = score + '^' + tipuesearch_in.pages[i].title + '^' + s_t + '^' + tipuesearch_in.pages[i].loc;                                                                   
+                                        showResults(results, start, replace, show_replace, d, d_r);
                                    }
-                              }
+                              });
+                         });
+                    }
+                    else
+                    {
+                         ++searches;
+                         if (show_stop)
+                         {
+                              out += '<p>Nothing found</p><p>Common words are largely ignored</p>';
                          }
                          else
                          {
-                              for (var i = 0; i < tipuesearch_in.pages.length; i++)
+                              out += '<p>Search too short</p>';
+                              if (set.minimumLength == 1)
                               {
-                                   var score = 1000000000;
-                                   var s_t = tipuesearch_in.pages[i].text;
-                                   var pat = new RegExp(d, 'i');
-                                   if (tipuesearch_in.pages[i].title.search(pat) != -1)
-                                   {
-                                        score -= (200000 - i);
-                                   }
-                                   if (tipuesearch_in.pages[i].text.search(pat) != -1)
-                                   {
-                                        score -= (150000 - i);
-                                   }
-                                   
-                                   if (set.highlightTerms)
-                                   {
-                                        if (set.highlightEveryTerm) 
-                                        {
-                                             var patr = new RegExp('(' + d + ')', 'gi');
-                                        }
-                                        else
-                                        {
-                                             var patr = new RegExp('(' + d + ')', 'i');
-                                        }
-                                        s_t = s_t.replace(patr, "<span class=\"h01\">$1</span>");
-                                   }
-                                   if (tipuesearch_in.pages[i].tags.search(pat) != -1)
-                                   {
-                                        score -= (100000 - i);
-                                   }
-                              
-                                   if (score < 1000000000)
-                                   {
-                                        found[c++] = score + '^' + tipuesearch_in.pages[i].title + '^' + s_t + '^' + tipuesearch_in.pages[i].loc;                                                                   
-                                   }                              
+                                   out += '<p>Should be one character or more</p>';
+                              }
+                              else
+                              {
+                                   out += '<p>Should be ' + set.minimumLength + ' characters or more</p>';
                               }
-                         }                         
-                         
-                         if (c != 0)
+                         }
+                         show(out);
+                    }
+               }
+
+               function showResults(results, start, replace, show_replace, d, d_r)
+               {
+                    var found = results.found;
+                    var c = found.length;
+                    var out = '';
+
+                    if (c != 0)
+                    {
+                         if (show_replace == 1)
+                         {
+                              out += '<p>Showing results for ' + escapeHtml(d) + '</p>';
+                              out += '<p>Search instead for <a href="javascript:void(0)" id="tipue_search_replaced">' + escapeHtml(d_r) + '</a></p>';
+                         }
+                         if (c == 1)
+                         {
+                              out += '<h1>Search <small>1 result</small></h1>';
+                         }
+                         else
+                         {
+                              c_c = c.toString().replace(/\B(?=(\d{3})+(?!\d))/g, ",");
+                              out += '<h1>Search <small>' + c_c + ' results</small></h1>';
+                         }
+
+                         for (var i = start; i < found.length && i < set.show + start; i++)
                          {
-                              if (show_replace == 1)
+                              var hit = index.page(found[i][0]);
+                              out += '<h4><a href="' + escapeHtml(hit.loc) + '"' + tipue_search_w + '>' + escapeHtml(hit.title) + '</a></h4>';
+                              out += '<div class="summary">' + describe(hit, results.highlight) + '</div>';
+                              if (set.showURL)
                               {
-                                   out += '<p>Showing results for ' + d + '</p>';
-                                   out += '<p>Search instead for <a href="javascript:void(0)" id="tipue_search_replaced">' + d_r + '</a></p>'; 
+                                   out += '<div class="tipue_search_content_url"><small><a href="' + escapeHtml(hit.loc) + '"' + tipue_search_w + '>' + escapeHtml(hit.loc) + '</a></small></div>';
                               }
-                              if (c == 1)
+                              else
                               {
-                                   out += '<h1>Search <small>1 result</small></h1>';
+                                   out += '<br>';
+                              }
+                         }
+
+                         if (c > set.show)
+                         {
+                              var pages = Math.ceil(c / set.show);
+                              var page = (start / set.show);
+                              out += '<div class="pagination-centered"><ul class="pagination">';
+
+                              if (start > 0)
+                              {
+                                  out += '<li class="arrow"><a href="javascript:void(0)" class="tipue_search_foot_box" id="' + (start - set.show) + '_' + replace + '"><span aria-hidden="true">&laquo;</span></a></li>';
                               }
                               else
                               {
-                                   c_c = c.toString().replace(/\B(?=(\d{3})+(?!\d))/g, ",");
-                                   out += '<h1>Search <small>' + c_c + ' results</small></h1>';
+                                  out += '<li class="arrow unavailable"><span aria-hidden="true"><a href="">&laquo;</a></span></li>';
                               }
-                              
-                              found.sort();
-                              var l_o = 0;
-                              for (var i = 0; i < found.length; i++)
+
+                              if (page <= 2)
                               {
-                                   var fo = found[i].split('^');
-				   if (l_o >= start && l_o < set.show + start)
-                                   {                                   
-                                        out += '<h4><a href="' + fo[3] + '"' + tipue_search_w + '>' +  fo[1] + '</a></h4>';
- 
-                                        
-                                        var t = fo[2];
-                                        var t_d = '';
-                                        var t_w = t.split(' ');
-                                        if (t_w.length < set.descriptiveWords)
+                                   var p_b = pages;
+                                   if (pages > 3)
+                                   {
+                                        p_b = 3;
+                                   }
+                                   for (var f = 0; f < p_b; f++)
+                                   {
+                                        if (f == page)
                                         {
-                                             t_d = t;
+                                             out += '<li class="current"><a href="#">' + (f + 1) + '</a></li>';
                                         }
                                         else
                                         {
-                                             for (var f = 0; f < set.descriptiveWords; f++)
-                                             {
-                                                  t_d += t_w[f] + ' '; 	
-                                             }
-                                        }
-                                        t_d = $.trim(t_d);
-                                        if (t_d.charAt(t_d.length - 1) != '.')
-                                        {
-                                             t_d += ' ...';
+                                             out += '<li><a href="javascript:void(0)" class="tipue_search_foot_box" id="' + (f * set.show) + '_' + replace + '">' + (f + 1) + '</a></li>';
                                         }
-                                        out += '<div class="summary">' + t_d + '</div>';
-                                        if (set.showURL)
-                                        {  
-                                             out += '<div class="tipue_search_content_url"><small><a href="' + fo[3] + '"' + tipue_search_w + '>' + fo[3] + '</a></small></div>';
-                                        } else {
-					     out += '<br>'
-					}
-                                        
                                    }
-                                   l_o++;     
                               }
-                              
-                              if (c > set.show)
+                              else
                               {
-                                   var pages = Math.ceil(c / set.show);
-                                   var page = (start / set.show);
-                                   out += '<div class="pagination-centered"><ul class="pagination">';
-                                   
-                                   if (start > 0)
-                                   {
-                                       out += '<li class="arrow"><a href="javascript:void(0)" class="tipue_search_foot_box" id="' + (start - set.show) + '_' + replace + '"><span aria-hidden="true">&laquo;</span></a></li>'; 
-                                   }
-                                   else
-                                   {
-                                       out += '<li class="arrow unavailable"><span aria-hidden="true"><a href="">&laquo;</a></span></li>';
-                                   }
-                                                       
-                                   if (page <= 2)
+                                   var p_b = page + 2;
+                                   if (p_b > pages)
                                    {
-                                        var p_b = pages;
-                                        if (pages > 3)
-                                        {
-                                             p_b = 3;
-                                        }                    
-                                        for (var f = 0; f < p_b; f++)
-                                        {
-                                             if (f == page)
-                                             {
-                                                  out += '<li class="current"><a href="#">' + (f + 1) + '</a></li>';
-                                             }
-                                             else
-                                             {
-                                                  out += '<li><a href="javascript:void(0)" class="tipue_search_foot_box" id="' + (f * set.show) + '_' + replace + '">' + (f + 1) + '</a></li>';
-                                             }
-                                        }
+                                        p_b = pages;
                                    }
-                                   else
+                                   for (var f = page - 1; f < p_b; f++)
                                    {
-                                        var p_b = page + 2;
-                                        if (p_b > pages)
+                                        if (f == page)
                                         {
-                                             p_b = pages; 
+                                             out += '<li class="current"><a href="#">' + (f + 1) + '</a></li>';
                                         }
-                                        for (var f = page - 1; f < p_b; f++)
+                                        else
                                         {
-                                             if (f == page)
-                                             {
-                                                  out += '<li class="current"><a href="#">' + (f + 1) + '</a></li>';
-                                             }
-                                             else
-                                             {
-                                                  out += '<li><a href="javascript:void(0)" class="tipue_search_foot_box" id="' + (f * set.show) + '_' + replace + '">' + (f + 1) + '</a></li>';
-                                             }
+                                             out += '<li><a href="javascript:void(0)" class="tipue_search_foot_box" id="' + (f * set.show) + '_' + replace + '">' + (f + 1) + '</a></li>';
                                         }
-                                   }                         
-                                                      
-                                   if (page + 1 != pages)
-                                   {
-                                       out += '<li class="arrow"><a href="javascript:void(0)" class="tipue_search_foot_box" id="' + (start + set.show) + '_' + replace + '"><span aria-hidden="true">&raquo;</span></a></li>'; 
                                    }
-                                   else
-                                   {
-                                       out += '<li class="arrow unavailable"><span aria-hidden="true"><a href="">&raquo;</a></span></li>'; 
-                                   }                    
-                                   
-                                   out += '</ul></div>';
-                              }                        
-                         }
-                         else
-                         {
-                              out += '<h1>Search</h1>'
-                              out += '<p>Nothing found</p>'; 
-                         }
-                    }
-                    else
-                    {
-                         if (show_stop)
-                         {
-                              out += '<p>Nothing found</p><p>Common words are largely ignored</p>';
-                         }
-                         else
-                         {
-                              out += '<p>Search too short</p>';
-                              if (set.minimumLength == 1)
+                              }
+
+                              if (page + 1 != pages)
                               {
-                                   out += '<p>Should be one character or more</p>';
+                                  out += '<li class="arrow"><a href="javascript:void(0)" class="tipue_search_foot_box" id="' + (start + set.show) + '_' + replace + '"><span aria-hidden="true">&raquo;</span></a></li>';
                               }
                               else
                               {
-                                   out += '<p>Should be ' + set.minimumLength + ' characters or more</p>';
+                                  out += '<li class="arrow unavailable"><span aria-hidden="true"><a href="">&raquo;</a></span></li>';
                               }
+
+                              out += '</ul></div>';
                          }
                     }
-               
+                    else
+                    {
+                         out += '<h1>Search</h1>'
+                         out += '<p>Nothing found</p>';
+                    }
+
+                    show(out);
+               }
+
+               function show(out)
+               {
                     $('#tipue_search_content').html(out);
                     $('#tipue_search_content').slideDown(200);
-                    
+
                     $('#tipue_search_replaced').click(function()
                     {
                          getTipueSearch(0, false);
-                    });                
-               
+                    });
+
                     $('.tipue_search_foot_box').click(function()
                     {
                          var id_v = $(this).attr('id');
                          var id_a = id_v.split('_');
-                    
-                         getTipueSearch(parseInt(id_a[0]), id_a[1]);
-                    });                                                       
-               }          
-          
-          });
-     };
-   
-})(jQuery);
-
 
+                         getTipueSearch(parseInt(id_a[0]), id_a[1] == 'true');
+                    });
+               }
 
+          });
+     };
 
+})(jQuery);
@@ -41,6 +41,7 @@ from scribbler.PyPDF2 import PdfFileMerger
 
 from .errors import ScribblerWarning, ScribblerError
 from .content import ScribblerContent
+from .search import SearchIndex
 
 class Notebook(object):
     """
@@ -56,6 +57,7 @@ class Notebook(object):
     HTML_DIR = 'html'
     PDF_DIR = 'pdf'
     MASTER_PDF = 'FullNotebook.pdf'
+    SEARCH_FILE = 'search.sqlite'
     DEFAULT_SETTINGS = {
         'author': 'No Author',
         'notebook name': 'A Scribbler Notebook',
@@ -154,6 +156,8 @@ class Notebook(object):
         'MATH_JAX': {'message_style': 'none'},
         'CACHE_CONTENT': True,
         'CACHE_PATH': '.__cache__',
+        'TIPUE_SEARCH_PDF_PATHS': [STATIC_DIR],
+        'TIPUE_SEARCH_DATABASE': SEARCH_FILE,
         #~ 'MONTH_ARCHIVE_SAVE_AS': '{date:%Y}/{date:%b}/index.html',
         #~ 'YEAR_ARCHIVE_SAVE_AS': '{date:%Y}/index.html',
     }
@@ -535,20 +539,22 @@ class Notebook(object):
         src = os.path.join(self.location, self.HTML_DIR, 'index.html')
         dest = os.path.join(self.location, self.PDF_DIR, 'titlepage.pdf')
         pdfkit.from_file(src, dest, options=self.pdf_settings)
-        master.append(dest)
+        parts = [dest]
         for note in sorted(self.notes.values(), key=lambda n: n.slug):
             if note.pdf_date < note.src_date:
                 note.make_pdf()
                 note.update()
-            master.append(os.path.join(self.location, note.pdf_path),
-                          note.date + ': ' + note.name)
+            parts.append((os.path.join(self.location, note.pdf_path),
+                          note.date + ': ' + note.name))
         for appe in sorted(self.appendices.values(), key=lambda a: a.slug):
             if appe.pdf_date < appe.src_date:
                 appe.make_pdf()
                 appe.update()
-            master.append(os.path.join(self.location, appe.pdf_path),
-                          'Appendix: ' + appe.name)
-        master.write(os.path.join(self.location, self.PDF_DIR, self.MASTER_PDF))
+            parts.append((os.path.join(self.location, appe.pdf_path),
+                          'Appendix: ' + appe.name))
+        master.appendAll(parts)
+        master.write(os.path.join(self.location, self.PDF_DIR, self.MASTER_PDF),
+                     streaming=True, compress=True)
         print('Done.')
         self.update()
 
@@ -586,6 +592,23 @@ class Notebook(object):
             del self.appendices[a]
         self.save(self.storage_file)
 
+    def search(self, query, limit=10, mark=('', '')):
+        """
+        Returns the SearchResults for the (at most LIMIT) notes, appendices
+        and PDF files best matching QUERY, as of when the notebook was last
+        built. Matches in the snippets are put between the strings in MARK.
+        """
+        path = os.path.join(self.location, self.DEFAULT_PELICAN_SETTINGS['CACHE_PATH'],
+                            self.SEARCH_FILE)
+        if not os.path.isfile(path):
+            raise ScribblerError('Notebook has not been indexed for searching. '
+                                 'Index it with `scribbler build`.')
+        index = SearchIndex(path, readonly=True)
+        try:
+            return index.search(query, limit, mark)
+        finally:
+            index.close()
+
     def save(self, path):
         """
         Asks notebook to pickle itself and stores it in the specified path.
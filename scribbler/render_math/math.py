@@ -32,13 +32,11 @@ the math.  See README for more details.
 
 import os
 import sys
+from xml.sax.saxutils import escape
 
 from pelican import signals, generators
 
-try:
-    from bs4 import BeautifulSoup
-except ImportError as e:
-    BeautifulSoup = None
+from scribbler.html_analysis import analyse
 
 try:
     from . pelican_mathjax_markdown_extension import PelicanMathJaxExtension
@@ -68,7 +66,7 @@ def process_settings(pelicanobj):
     mathjax_settings['responsive'] = 'false'  # Tries to make displayed math responsive
     mathjax_settings['responsive_break'] = '768'  # The break point at which it math is responsively aligned (in pixels)
     mathjax_settings['mathjax_font'] = 'default'  # forces mathjax to use the specified font.
-    mathjax_settings['process_summary'] = BeautifulSoup is not None  # will fix up summaries if math is cut off. Requires beautiful soup
+    mathjax_settings['process_summary'] = True  # will fix up summaries if math is cut off
     mathjax_settings['force_tls'] = 'false'  # will force mathjax to be served by https - if set as False, it will only use https if site is served using https
     mathjax_settings['message_style'] = 'normal'  # This value controls the verbosity of the messages in the lower left-hand corner. Set it to "none" to eliminate all messages
 
@@ -146,10 +144,6 @@ def process_settings(pelicanobj):
             mathjax_settings[key] = 'true' if value else 'false'
 
         if key == 'process_summary' and isinstance(value, bool):
-            if value and BeautifulSoup is None:
-                print("BeautifulSoup4 is needed for summaries to be processed by render_math\nPlease install it")
-                value = False
-
             mathjax_settings[key] = value
 
         if key == 'responsive' and isinstance(value, bool):
@@ -200,16 +194,15 @@ def process_summary(article):
     mathjax script so that math will be rendered"""
 
     summary = article._get_summary()
-    summary_parsed = BeautifulSoup(summary, 'html.parser')
-    math = summary_parsed.find_all(class_='math')
+    math = analyse(article, summary).math
 
     if len(math) > 0:
-        last_math_text = math[-1].get_text()
+        last_math_text = math[-1].text
         if len(last_math_text) > 3 and last_math_text[-3:] == '...':
-            content_parsed = BeautifulSoup(article._content, 'html.parser')
-            full_text = content_parsed.find_all(class_='math')[len(math)-1].get_text()
-            math[-1].string = "%s ..." % full_text
-            summary = summary_parsed.decode()
+            full_text = analyse(article, article._content).math[len(math)-1].text
+            summary = "%s%s%s" % (summary[:math[-1].inner_start],
+                                  escape("%s ..." % full_text),
+                                  summary[math[-1].inner_end:])
 
         article._summary = "%s<script type='text/javascript'>%s</script>" % (summary, process_summary.mathjax_script)
 
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  search.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+"""
+Contains the full-text index of a notebook, searched from the command
+line. It is an SQLite database with an FTS5 table, kept up to date by the
+``tipue_search`` plugin as the notebook is built: each document is stored
+with a hash of what it was made from, and only those whose hash has
+changed are written again.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+import re
+import sqlite3
+from collections import namedtuple
+
+from .errors import ScribblerError
+
+# changed whenever the tables or what is stored in them are
+SCHEMA_VERSION = 1
+
+# how much more a match counts in each column of the text table than in
+# the rendered text
+WEIGHTS = {'title': 10.0, 'tags': 5.0, 'date': 5.0, 'text': 1.0,
+           'source': 0.5}
+COLUMNS = ['title', 'tags', 'date', 'text', 'source']
+
+SNIPPET_TOKENS = 16
+
+# a word or phrase of a query, perhaps excluded with "-"
+_QUERY_TERMS = re.compile(r'(-?)(?:"([^"]*)"?|(\S+))', re.UNICODE)
+
+
+class SearchResult(namedtuple('SearchResult', ['path', 'kind', 'title', 'date',
+                                               'tags', 'loc', 'snippet'])):
+    """
+    A document matching a search: PATH is that of its source, relative to
+    the content, KIND is ``'article'``, ``'page'`` or ``'pdf'``, LOC its
+    URL, and SNIPPET the part of its text which best matches the query.
+    """
+    __slots__ = ()
+
+
+def match_expression(query):
+    """
+    Returns the FTS5 expression for QUERY, a list of words all of which
+    must be found. A word prefixed with "-" must not be found, words in
+    double quotes must be found together and a word ending in "*" matches
+    any word starting with it. Returns None if nothing is to be found.
+    """
+    found = []
+    excluded = []
+    for exclude, phrase, word in _QUERY_TERMS.findall(query):
+        text = phrase or word
+        prefix = text.endswith('*')
+        text = text.rstrip('*')
+        if not text.strip():
+            continue
+        term = '"{}"'.format(text.replace('"', '""'))
+        if prefix:
+            term += ' *'
+        (excluded if exclude else found).append(term)
+    if not found:
+        return None
+    return ' AND '.join(found) + ''.join(' NOT ' + t for t in excluded)
+
+
+class SearchIndex(object):
+    """
+    The full-text index in the SQLite database at PATH, which is made if
+    it does not exist. Documents are added or replaced with
+    :meth:`document`, and :meth:`save` then removes those not given since
+    the index was opened. An index made by another version of Scribbler
+    is emptied. If READONLY, the index is only searched, and is left as
+    it is with a ScribblerError raised if it is of another version.
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.seen = set()
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if readonly:
+            if version != SCHEMA_VERSION:
+                self.db.close()
+                raise ScribblerError('The search index was made by another '
+                                     'version of Scribbler. Rebuild it with '
+                                     '`scribbler build`.')
+            self.db.execute('PRAGMA query_only = ON')
+            return
+        if version != SCHEMA_VERSION:
+            self.db.execute('DROP TABLE IF EXISTS documents')
+            self.db.execute('DROP TABLE IF EXISTS search_text')
+        self.db.execute('CREATE TABLE IF NOT EXISTS documents ('
+                        'id INTEGER PRIMARY KEY, path TEXT UNIQUE, '
+                        'digest TEXT, kind TEXT, loc TEXT)')
+        try:
+            self.db.execute('CREATE VIRTUAL TABLE IF NOT EXISTS search_text '
+                            'USING fts5({}, tokenize="porter unicode61")'
+                            .format(', '.join(COLUMNS)))
+        except sqlite3.OperationalError:
+            self.db.close()
+            raise ScribblerError('Searching needs a version of SQLite with '
+                                 'the FTS5 extension')
+        self.db.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+        self.db.commit()
+
+    def document(self, path, make, *sources):
+        """
+        Adds the document whose source is at PATH, made from the strings
+        SOURCES, unless it is already in the index. MAKE is then called
+        to get a dictionary of its ``kind`` and ``loc`` and of the text
+        of each column: its ``title``, ``tags``, ``date``, ``text`` and
+        ``source``.
+        """
+        sha = hashlib.sha1(str(SCHEMA_VERSION).encode('utf-8'))
+        for source in sources:
+            sha.update(b'\0')
+            sha.update(source.encode('utf-8'))
+        digest = sha.hexdigest()
+        self.seen.add(path)
+        row = self.db.execute('SELECT id, digest FROM documents WHERE path = ?',
+                              (path,)).fetchone()
+        if row is not None:
+            if row[1] == digest:
+                return
+            self.remove(row[0])
+        doc = make()
+        cursor = self.db.execute('INSERT INTO documents (path, digest, kind, loc) '
+                                 'VALUES (?, ?, ?, ?)',
+                                 (path, digest, doc['kind'], doc['loc']))
+        self.db.execute('INSERT INTO search_text (rowid, {}) VALUES (?{})'
+                        .format(', '.join(COLUMNS), ', ?' * len(COLUMNS)),
+                        [cursor.lastrowid] + [doc[c] for c in COLUMNS])
+
+    def remove(self, id):
+        self.db.execute('DELETE FROM documents WHERE id = ?', (id,))
+        self.db.execute('DELETE FROM search_text WHERE rowid = ?', (id,))
+
+    def save(self):
+        """
+        Removes the documents not given to :meth:`document` since the
+        index was opened, and writes the changes to the database.
+        """
+        for id, path in self.db.execute('SELECT id, path FROM documents').fetchall():
+            if path not in self.seen:
+                self.remove(id)
+        self.db.commit()
+
+    def search(self, query, limit=10, mark=('', '')):
+        """
+        Returns a list of the SearchResults for the (at most LIMIT)
+        documents best matching QUERY (see :func:`match_expression`),
+        best first. The matches in their snippets are put between the
+        strings in MARK.
+        """
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        weights = ', '.join(str(WEIGHTS[c]) for c in COLUMNS)
+        try:
+            rows = self.db.execute(
+                'SELECT documents.path, documents.kind, search_text.title, '
+                'search_text.date, search_text.tags, documents.loc, '
+                "snippet(search_text, -1, ?, ?, '...', ?) "
+                'FROM search_text JOIN documents ON documents.id = search_text.rowid '
+                'WHERE search_text MATCH ? '
+                'ORDER BY bm25(search_text, {}) LIMIT ?'.format(weights),
+                (mark[0], mark[1], SNIPPET_TOKENS, expression, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ScribblerError('Could not search for "{}": {}'.format(query, e))
+        return [SearchResult(*row) for row in rows]
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Search index for Tipue Search
+=============================
+
+Builds the inverted index searched by the theme's ``tipuesearch.js``. Each
+page is reduced to a *fragment*: its title, location, a short snippet of its
+text and the weight of every stemmed term in it. The fragments are then
+merged into one index mapping each term to its posting list: the pages it
+is in, in order, and its weight in each, so that the browser answers a
+query by intersecting the lists for its terms rather than by scanning the
+text of every page. A posting list is written as a string,
+``"gap,weight,gap,weight..."`` in base 36 with each page given by its
+distance from the one before, both to keep the index small and so that
+only the lists a query needs are ever decoded.
+
+So that a search need not wait for the whole index to download, it is
+split into shards (see :func:`shard_index`): the posting lists by the
+first letters of their terms, and the pages' metadata into blocks of
+consecutive pages. A small manifest says which shards exist, and the search
+page loads just those holding the query's terms and the results it shows.
+Shards are scripts rather than JSON, which browsers refuse to fetch for
+pages opened from ``file://``.
+
+Fragments are kept between builds by :class:`FragmentCache`, so that only
+the pages which have changed are parsed and tokenised again.
+
+The tokeniser and stemmer here are mirrored in ``tipuesearch.js``; the two
+must be changed together.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import os
+import re
+from codecs import open
+from collections import defaultdict
+
+# white space, ASCII punctuation, Latin-1 punctuation and symbols, and
+# general punctuation (dashes, quotes, ellipses...); the byte order mark and
+# Mongolian vowel separator are given as they are white space to only some
+# versions of Python and JavaScript
+_SEPARATORS = re.compile('[\\s\u180e\ufeff!-/:-@\\[-`{-~\u00a0-\u00bf'
+                         '\u2000-\u206f]+', re.UNICODE)
+
+# (suffix, replacement) pairs, of which the first to match is applied;
+# a replacement of None leaves the word alone
+_SUFFIXES = [('ies', 'y'), ('sses', 'ss'), ('ss', None), ('us', None),
+             ('is', None), ('s', ''), ('ing', ''), ('ed', '')]
+_MIN_STEM = 3
+
+# the same as the default tipuesearch_stop_words in tipuesearch_set.js
+STOP_WORDS = frozenset([
+    'and', 'be', 'by', 'do', 'for', 'he', 'how', 'if', 'is', 'it', 'my',
+    'not', 'of', 'or', 'the', 'to', 'up', 'what', 'when', 'use', 'who',
+    'she', 'his', 'her'])
+
+SNIPPET_WORDS = 40
+
+# terms are sharded by their first PREFIX_LENGTH characters, and pages into
+# blocks of PAGE_SHARD_SIZE
+PREFIX_LENGTH = 2
+PAGE_SHARD_SIZE = 500
+
+# changed whenever the fragment for the same page would be different
+FRAGMENT_VERSION = 2
+CACHE_FILE = 'tipue_search_fragments.json'
+
+# how much more an occurrence counts in the title or tags than in the text
+TITLE_WEIGHT = 5
+TAGS_WEIGHT = 3
+
+
+def tokenize(text):
+    """
+    Returns the lower-cased words of TEXT.
+    """
+    return [w for w in _SEPARATORS.split(text.lower()) if w]
+
+
+def stem(word):
+    """
+    Strips the common English inflections from WORD: a light stemmer, as
+    query terms are also matched against the terms they are a prefix of.
+    """
+    if len(word) <= _MIN_STEM:
+        return word
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix):
+            if replacement is None:
+                return word
+            stemmed = word[:-len(suffix)] + replacement
+            return stemmed if len(stemmed) >= _MIN_STEM else word
+    return word
+
+
+def terms(text, stop_words=STOP_WORDS):
+    """
+    Returns the stemmed terms of TEXT, leaving out single characters and
+    STOP_WORDS.
+    """
+    return [stem(w) for w in tokenize(text)
+            if len(w) > 1 and w not in stop_words]
+
+
+def snippet(text, words=SNIPPET_WORDS):
+    """
+    Returns the first WORDS words of TEXT, shown under a search result.
+    """
+    return ' '.join(text.split(None, words)[:words])
+
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+_SMALL = [a + b for a in ('',) + tuple(_DIGITS[1:]) for b in _DIGITS]
+
+
+def _base36(n):
+    if n < len(_SMALL):
+        return _SMALL[n]
+    digits = ''
+    while True:
+        n, d = divmod(n, 36)
+        digits = _DIGITS[d] + digits
+        if not n:
+            return digits
+
+
+def encode_postings(postings):
+    """
+    Returns the string for the posting list POSTINGS, a list of
+    ``(page, weight)`` sorted by page.
+    """
+    out = []
+    last = 0
+    for page, weight in postings:
+        out.append(_base36(page - last))
+        out.append(_base36(weight))
+        last = page
+    return ','.join(out)
+
+
+def page_fragment(title, text, tags, loc, stop_words=STOP_WORDS):
+    """
+    Returns the part of the index for one page: its metadata and, under
+    ``terms``, the weight of each of its terms.
+    """
+    weights = defaultdict(int)
+    for term in terms(text, stop_words):
+        weights[term] += 1
+    for term in terms(tags, stop_words):
+        weights[term] += TAGS_WEIGHT
+    for term in terms(title, stop_words):
+        weights[term] += TITLE_WEIGHT
+    return {'title': title,
+            'text': snippet(text),
+            'tags': tags,
+            'loc': loc,
+            'terms': dict(weights)}
+
+
+def build_index(fragments, stop_words=STOP_WORDS):
+    """
+    Merges the page FRAGMENTS into an index of the pages' metadata, the
+    stop words left out of it and the posting list of every term.
+    """
+    pages = []
+    postings = defaultdict(list)
+    for i, fragment in enumerate(fragments):
+        pages.append({'title': fragment['title'],
+                      'text': fragment['text'],
+                      'tags': fragment['tags'],
+                      'loc': fragment['loc']})
+        for term, weight in fragment['terms'].items():
+            postings[term].append((i, weight))
+    return {'pages': pages,
+            'stop': sorted(stop_words),
+            'terms': dict((term, encode_postings(p))
+                          for term, p in postings.items())}
+
+
+class FragmentCache(object):
+    """
+    The fragments made for pages by earlier builds, kept in a file in
+    CACHE_PATH under the SHA-1 of everything they were made from. Only the
+    fragments used by this build are written back by :meth:`save`, so those
+    for pages which have been changed or removed do not pile up.
+    """
+
+    def __init__(self, cache_path, stop_words=STOP_WORDS):
+        self.path = os.path.join(cache_path, CACHE_FILE)
+        self.salt = '{}\0{}'.format(FRAGMENT_VERSION, ' '.join(sorted(stop_words)))
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.cached = json.load(f)
+        except (IOError, OSError, ValueError):
+            self.cached = {}
+        self.used = {}
+        self.hits = 0
+
+    def fragment(self, make, *sources):
+        """
+        Returns the fragment for a page made from the strings SOURCES: the
+        cached one if there is one, and otherwise the one returned by
+        calling MAKE.
+        """
+        sha = hashlib.sha1(self.salt.encode('utf-8'))
+        for source in sources:
+            sha.update(b'\0')
+            sha.update(source.encode('utf-8'))
+        key = sha.hexdigest()
+        if key in self.used:
+            fragment = self.used[key]
+        elif key in self.cached:
+            fragment = self.cached[key]
+            self.hits += 1
+        else:
+            fragment = make()
+        self.used[key] = fragment
+        return fragment
+
+    def save(self):
+        if self.hits == len(self.used) == len(self.cached):
+            # nothing has changed
+            return
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp = '{}.{}'.format(self.path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.used, separators=(',', ':'),
+                               ensure_ascii=False))
+        os.rename(tmp, self.path)
+
+
+def _shard_name(prefix):
+    # keeps file names to ASCII letters and digits
+    if re.match('^[0-9a-z]+$', prefix):
+        return 'terms-{}.js'.format(prefix)
+    return 'terms-{}.js'.format('-'.join('{:x}'.format(ord(c)) for c in prefix))
+
+
+def _script(function, key, data):
+    # escaped to ASCII, as a script's encoding is guessed by the browser
+    return '{}({},{});\n'.format(
+        function, json.dumps(key),
+        json.dumps(data, separators=(',', ':'), sort_keys=True))
+
+
+def shard_index(index, prefix_length=PREFIX_LENGTH,
+                page_shard_size=PAGE_SHARD_SIZE):
+    """
+    Splits INDEX, as returned by :func:`build_index`, into shards. Returns
+    the manifest, and a dictionary of the scripts for the shards by their
+    file names. A script for terms passes its prefix and the posting lists
+    of the terms starting with it to ``tipuesearch_add_terms``; one for
+    pages passes the number of its first page and their metadata to
+    ``tipuesearch_add_pages``. These functions are defined by
+    ``tipuesearch.js``.
+    """
+    shards = defaultdict(dict)
+    for term, postings in index['terms'].items():
+        shards[term[:prefix_length]][term] = postings
+    scripts = {}
+    names = {}
+    for prefix, terms in shards.items():
+        names[prefix] = _shard_name(prefix)
+        scripts[names[prefix]] = _script('tipuesearch_add_terms', prefix, terms)
+    pages = index['pages']
+    for first in range(0, len(pages), page_shard_size):
+        scripts['pages-{}.js'.format(first // page_shard_size)] = _script(
+            'tipuesearch_add_pages', first, pages[first:first + page_shard_size])
+    manifest = {'stop': index['stop'],
+                'pages': len(pages),
+                'pageShardSize': page_shard_size,
+                'prefixLength': prefix_length,
+                'terms': names}
+    return manifest, scripts
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+PDF text for Tipue Search
+=========================
+
+Extracts the text of the PDF files attached to a site so that they can be
+searched along with its pages. Files are read by a pool of worker
+processes, and what is extracted is cached under the SHA-1 of each file's
+contents, so later builds only read new or changed PDFs. The cache keeps
+only the files of the last build.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import warnings
+import zlib
+from codecs import open
+
+from scribbler.PyPDF2 import PdfFileReader
+from scribbler.PyPDF2.utils import PdfReadError
+
+CACHE_SUBDIR = 'tipue_search_pdfs'
+
+# what reading a corrupt or unsupported PDF raises: PyPDF2 reports much
+# malformed structure by way of the wrong type of object turning up
+READ_ERRORS = (PdfReadError, NotImplementedError, ValueError, KeyError,
+               IndexError, TypeError, AttributeError, AssertionError,
+               zlib.error)
+
+logger = logging.getLogger(__name__)
+
+
+def find_pdfs(path):
+    """
+    Returns the paths of the PDF files in directory PATH and those below
+    it, in a stable order.
+    """
+    pdfs = []
+    for root, dirs, files in os.walk(path, followlinks=True):
+        dirs.sort()
+        for f in sorted(files):
+            if f.lower().endswith('.pdf'):
+                pdfs.append(os.path.join(root, f))
+    return pdfs
+
+
+def file_hash(path):
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def extract_text(path):
+    """
+    Returns the title and the text of the PDF at PATH, with runs of white
+    space collapsed. The title is the document's own if it has one, and
+    otherwise the file name. Files which cannot be read (corrupt, or
+    encrypted with a password) give no text, with a warning if corrupt.
+    """
+    title = os.path.splitext(os.path.basename(path))[0]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        try:
+            reader = PdfFileReader(path, strict=False, overwriteWarnings=False)
+            if reader.isEncrypted and not reader.decrypt(''):
+                return title, ''
+            info = reader.getDocumentInfo()
+            if info is not None and info.title:
+                title = info.title
+            text = ' '.join(page.extractText() for page in reader.pages)
+        except READ_ERRORS as e:
+            logger.warning('Could not read the text of %s: %s', path, e)
+            return title, ''
+    return title, ' '.join(text.split())
+
+
+def _cached_extract(job):
+    # Runs in the worker processes.
+    path, cache_dir = job
+    name = file_hash(path) + '.json'
+    cache_file = os.path.join(cache_dir, name)
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        return path, name, cached['title'], cached['text']
+    except (IOError, OSError, ValueError, KeyError):
+        pass
+    title, text = extract_text(path)
+    tmp = '{}.{}'.format(cache_file, os.getpid())
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'title': title, 'text': text}, f, ensure_ascii=False)
+    os.rename(tmp, cache_file)
+    return path, name, title, text
+
+
+def extract_all(paths, cache_path, processes=None):
+    """
+    Returns a list of ``(path, title, text)`` for each of the PDFs in
+    PATHS, using and updating the cache kept in CACHE_PATH. Files are
+    read in parallel by up to PROCESSES worker processes (by default, one
+    per CPU). Cached files which none of PATHS has are removed.
+    """
+    cache_dir = os.path.join(cache_path, CACHE_SUBDIR)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    jobs = [(path, cache_dir) for path in paths]
+    processes = min(processes or multiprocessing.cpu_count(), len(jobs))
+    if processes < 2:
+        results = [_cached_extract(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_cached_extract, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    # those for PDFs which have been changed or removed
+    used = set(name for path, name, title, text in results)
+    for name in os.listdir(cache_dir):
+        if name not in used:
+            os.remove(os.path.join(cache_dir, name))
+    return [(path, title, text) for path, name, title, text in results]
@@ -3,8 +3,8 @@
 Tipue Search
 ============
 
-A Pelican plugin to serialize generated HTML to JSON
-that can be used by jQuery plugin - Tipue Search.
+A Pelican plugin to build, from the generated HTML, the search index
+used by the jQuery plugin - Tipue Search.
 
 Copyright (c) Talha Mansoor
 """
@@ -13,14 +13,64 @@ from __future__ import unicode_literals
 
 import os.path
 import json
-from bs4 import BeautifulSoup
+import logging
 from codecs import open
-try:
-    from urlparse import urljoin
-except ImportError:
-    from urllib.parse import urljoin
 
 from pelican import signals
+from pelican.contents import Article
+from pelican.generators import TemplatePagesGenerator
+
+from scribbler.errors import ScribblerError
+from scribbler.html_analysis import HtmlAnalysis, analyse
+from scribbler.search import SearchIndex
+from .index import (STOP_WORDS, PREFIX_LENGTH, PAGE_SHARD_SIZE,
+                    FragmentCache, page_fragment, build_index, shard_index)
+from .pdf_text import find_pdfs, extract_all
+
+logger = logging.getLogger(__name__)
+
+# typographic punctuation replaced by its plain equivalent
+PUNCTUATION = {ord('“'): '"', ord('”'): '"', ord('’'): "'", ord('¶'): ' '}
+
+# where the HTML rendered for each template page is kept in the context
+RENDERED_TEMPLATE_PAGES = 'TIPUE_SEARCH_RENDERED_TEMPLATE_PAGES'
+
+
+class RecordingTemplate(object):
+    """
+    Wraps the template for a template page, keeping the HTML it renders
+    in PAGES under the name of its source so that the page can be indexed
+    without reading it back from the output.
+    """
+
+    def __init__(self, template, source, pages):
+        self.template = template
+        self.source = source
+        self.pages = pages
+
+    def render(self, *args, **kwargs):
+        output = self.template.render(*args, **kwargs)
+        self.pages[self.source] = output
+        return output
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+
+def record_template_pages(generator):
+    """
+    Makes the templates given out by a TemplatePagesGenerator keep what
+    they render in its context.
+    """
+    if not isinstance(generator, TemplatePagesGenerator):
+        return
+    pages = generator.context.setdefault(RENDERED_TEMPLATE_PAGES, {})
+    get_template = generator.env.get_template
+
+    def get_recording_template(name, *args, **kwargs):
+        return RecordingTemplate(get_template(name, *args, **kwargs), name, pages)
+
+    generator.env.get_template = get_recording_template
 
 
 class Tipue_Search_JSON_Generator(object):
@@ -33,6 +83,19 @@ class Tipue_Search_JSON_Generator(object):
         self.tpages = settings.get('TEMPLATE_PAGES')
         self.relative = settings.get('RELATIVE_URLS')
         self.output_path = output_path
+        self.content_path = path
+        self.pdf_paths = settings.get('TIPUE_SEARCH_PDF_PATHS', [])
+        self.pdf_processes = settings.get('TIPUE_SEARCH_PDF_PROCESSES')
+        self.cache_path = settings.get('CACHE_PATH', 'cache')
+        self.stop_words = frozenset(settings.get('TIPUE_SEARCH_STOP_WORDS',
+                                                 STOP_WORDS))
+        self.prefix_length = settings.get('TIPUE_SEARCH_PREFIX_LENGTH',
+                                          PREFIX_LENGTH)
+        self.page_shard_size = settings.get('TIPUE_SEARCH_PAGE_SHARD_SIZE',
+                                            PAGE_SHARD_SIZE)
+        self.database = settings.get('TIPUE_SEARCH_DATABASE')
+        self.cache = FragmentCache(self.cache_path, self.stop_words)
+        self.search_index = None
         self.json_nodes = []
 
 
@@ -41,13 +104,6 @@ class Tipue_Search_JSON_Generator(object):
         if getattr(page, 'status', 'published') != 'published':
             return
 
-        soup_title = BeautifulSoup(page.title.replace('&nbsp;', ' '), 'html.parser')
-        page_title = soup_title.get_text(' ', strip=True).replace('“', '"').replace('”', '"').replace('’', "'").replace('^', '&#94;')
-
-        soup_text = BeautifulSoup(page.content, 'html.parser')
-        page_text = soup_text.get_text(' ', strip=True).replace('“', '"').replace('”', '"').replace('’', "'").replace('¶', ' ').replace('^', '&#94;')
-        page_text = ' '.join(page_text.split())
-
         if getattr(page, 'category', 'None') == 'None':
             page_category = ''
         else:
@@ -58,59 +114,153 @@ class Tipue_Search_JSON_Generator(object):
         else:
             page_url = page.url
 
-        node = {'title': page_title,
-                'text': page_text,
-                'tags': page_category,
-                'loc': page_url}
+        # the text is the same with or without intrasite links resolved,
+        # and the raw content is what the other plugins analyse
+        page_title = page.title
+        page_content = page._content
+        self.json_nodes.append(self.cache.fragment(
+            lambda: self.html_fragment(page, page_title, page_content,
+                                       page_category, page_url),
+            page_title, page_content, page_category, page_url))
 
-        self.json_nodes.append(node)
+        if self.search_index is not None:
+            self.add_search_document(page, page_title, page_content,
+                                     page_category, page_url)
 
 
-    def create_tpage_node(self, srclink):
+    def html_fragment(self, page, title, content, category, url):
 
-        srcfile = open(os.path.join(self.output_path, self.tpages[srclink]))
-        soup = BeautifulSoup(srcfile, 'html.parser')
-        page_text = soup.get_text()
+        page_title = analyse(page, title.replace('&nbsp;', ' ')).text.translate(PUNCTUATION)
+        page_text = analyse(page, content).text.translate(PUNCTUATION)
+        page_text = ' '.join(page_text.split())
 
-        # What happens if there is not a title.
-        if soup.title is not None:
-            page_title = soup.title.string
-        else:
-            page_title = ''
+        return page_fragment(page_title, page_text, category, url,
+                             self.stop_words)
+
+
+    def add_search_document(self, page, title, content, category, url):
+
+        source_path = page.source_path
+        path = os.path.relpath(source_path, self.content_path).replace(os.sep, '/')
+        kind = 'article' if isinstance(page, Article) else 'page'
+        tags = ' '.join([category] + [t.name for t in getattr(page, 'tags', [])])
+        date = page.date.strftime('%Y-%m-%d') if hasattr(page, 'date') else ''
 
-        # Should set default category?
-        page_category = ''
+        def make():
+            with open(source_path, 'r', encoding='utf-8', errors='replace') as f:
+                source = f.read()
+            return {'kind': kind,
+                    'loc': url,
+                    'title': analyse(page, title.replace('&nbsp;', ' ')).text,
+                    'tags': tags,
+                    'date': date,
+                    'text': analyse(page, content).text,
+                    'source': source}
+
+        # the source is only read again once it has been changed
+        self.search_index.document(path, make, title, content, tags, date,
+                                   url, str(os.path.getmtime(source_path)))
+
+
+    def create_tpage_node(self, srclink):
+
+        # as rendered by the TemplatePagesGenerator, which runs first
+        html = self.context.get(RENDERED_TEMPLATE_PAGES, {}).get(srclink)
+        if html is None:
+            return
 
         if not self.relative:
-            page_url = urljoin(self.siteurl, self.tpages[srclink])
+            page_url = self.siteurl + '/' + self.tpages[srclink]
         else:
-            page_url = sefl.tpages[srclink]
+            page_url = self.tpages[srclink]
+
+        self.json_nodes.append(self.cache.fragment(
+            lambda: self.tpage_fragment(html, page_url), html, page_url))
+
+
+    def tpage_fragment(self, html, url):
+
+        analysis = HtmlAnalysis(html)
+        page_title = (analysis.title or '').translate(PUNCTUATION)
+        page_text = analysis.text.translate(PUNCTUATION)
+        page_text = ' '.join(page_text.split())
 
-        node = {'title': page_title,
-                'text': page_text,
-                'tags': page_category,
-                'loc': page_url}
-        
-        self.json_nodes.append(node)
+        return page_fragment(page_title, page_text, '', url, self.stop_words)
+
+
+    def create_pdf_nodes(self):
+
+        pdfs = []
+        for pdf_path in self.pdf_paths:
+            pdfs.extend(find_pdfs(os.path.join(self.content_path, pdf_path)))
+
+        for path, title, text in extract_all(pdfs, self.cache_path, self.pdf_processes):
+            # static files keep their place relative to the content
+            pdf_url = os.path.relpath(path, self.content_path).replace(os.sep, '/')
+            if not self.relative:
+                pdf_url = self.siteurl + '/' + pdf_url
+
+            self.json_nodes.append(self.cache.fragment(
+                lambda: page_fragment(title, text, '', pdf_url, self.stop_words),
+                title, text, pdf_url))
+
+            if self.search_index is not None:
+                self.search_index.document(
+                    os.path.relpath(path, self.content_path).replace(os.sep, '/'),
+                    lambda: {'kind': 'pdf', 'loc': pdf_url, 'title': title,
+                             'tags': '', 'date': '', 'text': text, 'source': ''},
+                    title, text, pdf_url)
+
+
+    def open_search_index(self):
+
+        if not os.path.isdir(self.cache_path):
+            os.makedirs(self.cache_path)
+        try:
+            self.search_index = SearchIndex(os.path.join(self.cache_path,
+                                                         self.database))
+        except ScribblerError as e:
+            logger.warning('Not updating the search database: %s', e)
 
 
     def generate_output(self, writer):
-        path = os.path.join(self.output_path, 'tipuesearch_content.js')
+        path = os.path.join(self.output_path, 'tipuesearch_index.js')
 
         pages = self.context['pages'] + self.context['articles']
 
         for article in self.context['articles']:
             pages += article.translations
 
+        if self.database:
+            self.open_search_index()
+
         for srclink in self.tpages:
             self.create_tpage_node(srclink)
 
         for page in pages:
             self.create_json_node(page)
-        root_node = {'pages': self.json_nodes}
 
-        output = json.dumps(root_node, separators=(',', ':'), ensure_ascii=False)
-        output = 'var tipuesearch = ' + output
+        self.create_pdf_nodes()
+        self.cache.save()
+        if self.search_index is not None:
+            self.search_index.save()
+            self.search_index.close()
+        index = build_index(self.json_nodes, self.stop_words)
+        manifest, shards = shard_index(index, self.prefix_length,
+                                       self.page_shard_size)
+
+        shard_dir = os.path.join(self.output_path, 'tipuesearch')
+        if not os.path.isdir(shard_dir):
+            os.makedirs(shard_dir)
+        for name in os.listdir(shard_dir):
+            if name.endswith('.js') and name not in shards:
+                os.remove(os.path.join(shard_dir, name))
+        for name, script in shards.items():
+            with open(os.path.join(shard_dir, name), 'w', encoding='utf-8') as fd:
+                fd.write(script)
+
+        output = json.dumps(manifest, separators=(',', ':'), ensure_ascii=False)
+        output = 'var tipuesearch_index = ' + output + ';\n'
         with open(path, 'w', encoding='utf-8') as fd:
             fd.write(output)
 
@@ -120,4 +270,5 @@ def get_generators(generators):
 
 
 def register():
+    signals.generator_init.connect(record_template_pages)
     signals.get_generators.connect(get_generators)
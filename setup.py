@@ -48,7 +48,7 @@ setup(
         'Programming Language :: Python :: 3.4',
     ],
     install_requires = ['pelican','MarkdownSuperscript','MarkdownSubscript',
-                        'mdx_del_ins','BeautifulSoup4','markdown-checklist',
+                        'mdx_del_ins','markdown-checklist',
                         'MarkdownHighlight','markdown-include','PyYAML',
                         'pyPDF2', 'markdown', 'typogrify', 'Wand',
                         'pybtex==0.18', 'click', 'pdfkit'],
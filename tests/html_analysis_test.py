@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  html_analysis_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+"""
+Unit tests for the analysis of HTML shared by the plugins
+"""
+
+from scribbler.html_analysis import HtmlAnalysis, analyse
+
+from nose.tools import *
+
+html = (u'<html><head><title>A  &amp; B</title><style>p {}</style></head>\n'
+        u'<body><p>Some <b>bold</b>\ntext &ldquo;quoted&rdquo;'
+        u'<img src="a.png" alt="A"></p>\n'
+        u'<p><span class="math">\\(x &lt; 1 ...\\)</span> and '
+        u'<div class="math display">$$y$$</div><img src="b.png"/>'
+        u'<script>var x = "<p>hidden</p>";</script></p></body></html>')
+
+def test_text():
+    analysis = HtmlAnalysis(html)
+    assert_equal(analysis.text, u'A & B Some bold text “quoted” '
+                                u'\\(x < 1 ...\\) and $$y$$')
+    assert_equal(analysis.title, u'A & B')
+
+def test_images():
+    analysis = HtmlAnalysis(html)
+    assert_equal([html[s:e] for s, e in analysis.images],
+                 [u'<img src="a.png" alt="A">', u'<img src="b.png"/>'])
+
+def test_math():
+    analysis = HtmlAnalysis(html)
+    assert_equal([m.text for m in analysis.math],
+                 [u'\\(x < 1 ...\\)', u'$$y$$'])
+    first = analysis.math[0]
+    assert_equal(html[first.start:first.end],
+                 u'<span class="math">\\(x &lt; 1 ...\\)</span>')
+    assert_equal(html[first.inner_start:first.inner_end],
+                 u'\\(x &lt; 1 ...\\)')
+
+def test_unclosed():
+    analysis = HtmlAnalysis(u'<p>one <span class="math">two</p> three')
+    assert_equal(analysis.text, u'one two three')
+    assert_equal([m.text for m in analysis.math], [u'two'])
+
+def test_analyse_memoised():
+    class Article(object):
+        pass
+    article = Article()
+    first = analyse(article, html)
+    assert_is(analyse(article, html), first)
+    assert_is_not(analyse(article, u'<p>other</p>'), first)
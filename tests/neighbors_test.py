@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  search_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+"""
+Unit tests for the neighbors plugin
+"""
+
+from datetime import datetime
+
+from scribbler.neighbors.benchmark import Article, Category, Generator
+from scribbler.neighbors.neighbors import neighbors
+
+from nose.tools import *
+
+
+# the plugin as it was, going through the articles once for all of them,
+# then again for each category and subcategory
+def iter3(seq):
+    it = iter(seq)
+    nxt = None
+    cur = next(it)
+    for prv in it:
+        yield nxt, cur, prv
+        nxt, cur = cur, prv
+    yield nxt, cur, None
+
+def get_translation(article, prefered_language):
+    if not article:
+        return None
+    for translation in article.translations:
+        if translation.lang == prefered_language:
+            return translation
+    return article
+
+def old_set_neighbors(articles, next_name, prev_name):
+    for nxt, cur, prv in iter3(articles):
+        setattr(cur, next_name, nxt)
+        setattr(cur, prev_name, prv)
+        for translation in cur.translations:
+            setattr(translation, next_name,
+                    get_translation(nxt, translation.lang))
+            setattr(translation, prev_name,
+                    get_translation(prv, translation.lang))
+
+def old_neighbors(generator):
+    old_set_neighbors(generator.articles, 'next_article', 'prev_article')
+    for category, articles in generator.categories:
+        articles.sort(key=(lambda x: x.date), reverse=(True))
+        old_set_neighbors(articles, 'next_article_in_category',
+                          'prev_article_in_category')
+    if hasattr(generator, 'subcategories'):
+        for subcategory, articles in generator.subcategories:
+            articles.sort(key=(lambda x: x.date), reverse=(True))
+            index = subcategory.name.count('/')
+            old_set_neighbors(articles,
+                              'next_article_in_subcategory{}'.format(index),
+                              'prev_article_in_subcategory{}'.format(index))
+
+def links(generator):
+    # the neighbors of every article and translation, each given by its
+    # place among the articles and its language
+    names = {}
+    for i, article in enumerate(generator.articles):
+        names[id(article)] = (i, article.lang)
+        for translation in article.translations:
+            names[id(translation)] = (i, translation.lang)
+    out = {}
+    for article in generator.articles:
+        for obj in [article] + article.translations:
+            out[names[id(obj)]] = dict(
+                (attr, names.get(id(value)) if value is not None else None)
+                for attr, value in vars(obj).items()
+                if attr.startswith(('next_', 'prev_')))
+    return out
+
+def test_as_before():
+    old, new = Generator(2000, seed=1), Generator(2000, seed=1)
+    for generator in old, new:
+        # a subcategory of a subcategory
+        generator.subcategories.append((Category('category0/sub0/deep'),
+                                        generator.articles[::7]))
+    old_neighbors(old)
+    neighbors(new)
+    expected = links(old)
+    assert_equal(links(new), expected)
+    # every group is linked, translations included
+    first = expected[(0, 'en')]
+    assert_in('next_article_in_category', first)
+    for name in ['next_article_in_subcategory1', 'next_article_in_subcategory2']:
+        assert_true(any(name in l for l in expected.values()))
+    assert_true(any(lang != 'en' for i, lang in expected))
+
+def test_translations():
+    newest, middle, oldest = [Article(datetime(2015, 1, day)) for day in (3, 2, 1)]
+    newest.translations = [Article(newest.date, 'fr')]
+    middle.translations = [Article(middle.date, 'fr'), Article(middle.date, 'de')]
+    generator = Generator(0)
+    generator.articles = [oldest, middle, newest]
+    generator.categories = [(Category('lab'), [newest, oldest])]
+    generator.subcategories = []
+    neighbors(generator)
+    assert_equal([middle.next_article, middle.prev_article], [newest, oldest])
+    assert_is_none(newest.next_article)
+    assert_is_none(oldest.prev_article)
+    fr, de = middle.translations
+    # linked to the translations in the same language where there are any
+    assert_equal([fr.next_article, fr.prev_article],
+                 [newest.translations[0], oldest])
+    assert_equal([de.next_article, de.prev_article], [newest, oldest])
+    assert_equal(newest.translations[0].prev_article, fr)
+    assert_equal(newest.prev_article_in_category, oldest)
+    assert_equal(oldest.next_article_in_category, newest)
+    assert_false(hasattr(middle, 'next_article_in_category'))
+
+def test_no_articles():
+    generator = Generator(0)
+    neighbors(generator)
+    assert_equal(generator.articles, [])
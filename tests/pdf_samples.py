@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  pdf_samples.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+"""
+Small PDF files, written out by hand, for the tests of PyPDF2
+"""
+
+import os.path
+from io import BytesIO
+
+from scribbler.PyPDF2 import PdfFileReader
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), 'copy_tests', 'test.pdf')
+
+
+def make_pdf(objects, trailer=b'/Root 1 0 R'):
+    """
+    Returns the bytes of a PDF file whose objects, numbered from 1, have the
+    bodies in the list OBJECTS, and whose trailer has the entries TRAILER.
+    """
+    out = BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for i, body in enumerate(objects):
+        offsets.append(out.tell())
+        out.write(('{} 0 obj\n'.format(i + 1)).encode('ascii'))
+        out.write(body)
+        out.write(b'\nendobj\n')
+    start = out.tell()
+    out.write(('xref\n0 {}\n0000000000 65535 f \n'
+               .format(len(objects) + 1)).encode('ascii'))
+    for offset in offsets:
+        out.write(('{:010d} 00000 n \n'.format(offset)).encode('ascii'))
+    out.write(('trailer\n<< /Size {} '.format(len(objects) + 1)).encode('ascii'))
+    out.write(trailer)
+    out.write((' >>\nstartxref\n{}\n%%EOF\n'.format(start)).encode('ascii'))
+    return out.getvalue()
+
+
+def stream(data, entries=b''):
+    """
+    Returns the body of a stream object holding DATA.
+    """
+    return (b'<< /Length ' + str(len(data)).encode('ascii') + b' ' + entries +
+            b' >>\nstream\n' + data + b'\nendstream')
+
+
+def text_pdf(content, font):
+    """
+    Returns the bytes of a PDF file of one page, with the content stream
+    CONTENT and, as /F1, the font dictionary FONT (object 5); any more
+    objects may follow FONT in a list.
+    """
+    if not isinstance(font, list):
+        font = [font]
+    return make_pdf([b'<< /Type /Catalog /Pages 2 0 R >>',
+                     b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+                     b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                     b'/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>',
+                     stream(content)] + font)
+
+
+def page_tree_pdf(kids, count, pages):
+    """
+    Returns the bytes of a PDF file whose root /Pages node (object 2) has
+    the entries KIDS and COUNT, followed by the objects in PAGES, numbered
+    from 3.
+    """
+    return make_pdf([b'<< /Type /Catalog /Pages 2 0 R >>',
+                     b'<< /Type /Pages /Kids ' + kids + b' /Count ' + count +
+                     b' /MediaBox [0 0 100 100] >>'] + pages)
+
+
+def reader(data):
+    return PdfFileReader(BytesIO(data))
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  pypdf2_crypto_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+
+"""
+Unit tests for the ciphers of PyPDF2 and the decryption of PDF files
+"""
+
+import hashlib
+import struct
+import zlib
+from binascii import hexlify, unhexlify
+
+from scribbler.PyPDF2 import crypto
+from scribbler.PyPDF2.utils import RC4_encrypt
+
+from pdf_samples import make_pdf, reader, stream
+
+from nose.tools import *
+
+PASSWORD_PADDING = unhexlify(b'28bf4e5e4e758a4164004e56fffa01082e2e00b6'
+                             b'd0683e802f0ca9fe6453697a')
+CONTENT = b'BT /F1 24 Tf 72 700 Td (Hello secret world) Tj ET'
+
+
+def test_aes_vectors():
+    # FIPS-197 appendix C, and the CBC example of SP 800-38A, F.2.1
+    backend = crypto.PythonBackend()
+    plain = unhexlify(b'00112233445566778899aabbccddeeff')
+    for key, cipher in [(b'000102030405060708090a0b0c0d0e0f',
+                         b'69c4e0d86a7b0430d8cdb78070b4c55a'),
+                        (b'000102030405060708090a0b0c0d0e0f1011121314151617',
+                         b'dda97ca4864cdfe06eaf70a0ec0d7191'),
+                        (b'000102030405060708090a0b0c0d0e0f'
+                         b'101112131415161718191a1b1c1d1e1f',
+                         b'8ea2b7ca516745bfeafc49904b496089')]:
+        key = unhexlify(key)
+        assert_equal(hexlify(backend.aesCbcEncrypt(key, b'\0' * 16, plain)),
+                     cipher)
+        assert_equal(backend.aesCbcDecrypt(key, b'\0' * 16, unhexlify(cipher)),
+                     plain)
+    key = unhexlify(b'2b7e151628aed2a6abf7158809cf4f3c')
+    iv = unhexlify(b'000102030405060708090a0b0c0d0e0f')
+    plain = unhexlify(b'6bc1bee22e409f96e93d7e117393172a'
+                      b'ae2d8a571e03ac9c9eb76fac45af8e51')
+    cipher = unhexlify(b'7649abac8119b246cee98e9b12e9197d'
+                       b'5086cb9b507219ee95db113a917678b2')
+    assert_equal(backend.aesCbcEncrypt(key, iv, plain), cipher)
+    assert_equal(backend.aesCbcDecrypt(key, iv, cipher), plain)
+
+def test_aes_decrypt_padding():
+    key = b'k' * 16
+    iv = b'i' * 16
+    for data in [b'', b'a', b'x' * 15, b'y' * 16, b'z' * 33]:
+        padding = 16 - len(data) % 16
+        padded = data + struct.pack('B', padding) * padding
+        assert_equal(crypto.aesDecrypt(key, iv + crypto.aesCbcEncrypt(key, iv, padded)),
+                     data)
+
+def aes(key, iv, data):
+    # the /AESV2 and /AESV3 form of data: the initialisation vector and the
+    # ciphertext of data padded as in RFC 2898
+    padding = 16 - len(data) % 16
+    return iv + crypto.aesCbcEncrypt(key, iv, data + struct.pack('B', padding) * padding)
+
+def hash_2b(password, salt, udata):
+    # algorithm 2.B of ISO 32000-2, for revision 6
+    k = hashlib.sha256(password + salt + udata).digest()
+    i = 0
+    while True:
+        e = crypto.aesCbcEncrypt(k[:16], k[16:32], (password + k + udata) * 64)
+        k = [hashlib.sha256, hashlib.sha384,
+             hashlib.sha512][int(hexlify(e[:16]), 16) % 3](e).digest()
+        i += 1
+        if i >= 64 and bytearray(e)[-1] <= i - 32:
+            return k[:32]
+
+def encrypted_pdf(revision, user=b'user', owner=b'owner'):
+    """
+    Returns the bytes of a one-page PDF file encrypted with AES-128
+    (revision 4) or AES-256 (revision 6), whose content stream says
+    CONTENT and whose title is "Secret title".
+    """
+    file_id = b'0123456789abcdef'
+    permissions = -4
+    if revision == 6:
+        file_key = b'K' * 32
+        user_hash = hash_2b(user, b'uvsaltuv', b'') + b'uvsaltuv' + b'uksaltuk'
+        ue = crypto.aesCbcEncrypt(hash_2b(user, b'uksaltuk', b''), b'\0' * 16,
+                                  file_key)
+        owner_hash = (hash_2b(owner, b'ovsaltov', user_hash) +
+                      b'ovsaltov' + b'oksaltok')
+        oe = crypto.aesCbcEncrypt(hash_2b(owner, b'oksaltok', user_hash),
+                                  b'\0' * 16, file_key)
+        object_key = lambda idnum: file_key
+        encrypt = (b'<< /Filter /Standard /V 5 /R 6 /Length 256 '
+                   b'/CF << /StdCF << /CFM /AESV3 /AuthEvent /DocOpen /Length 32 >> >> '
+                   b'/StmF /StdCF /StrF /StdCF /O <' + hexlify(owner_hash) +
+                   b'> /U <' + hexlify(user_hash) + b'> /OE <' + hexlify(oe) +
+                   b'> /UE <' + hexlify(ue) + b'> /P -4 /Perms <' +
+                   hexlify(b'p' * 16) + b'> >>')
+    else:
+        # algorithms 3, 2 and 5 of the PDF Reference, with a 128-bit key
+        digest = hashlib.md5((owner + PASSWORD_PADDING)[:32]).digest()
+        for i in range(50):
+            digest = hashlib.md5(digest).digest()
+        owner_hash = RC4_encrypt(digest, (user + PASSWORD_PADDING)[:32])
+        for i in range(1, 20):
+            owner_hash = RC4_encrypt(bytes(bytearray(b ^ i for b in bytearray(digest))),
+                                     owner_hash)
+        digest = hashlib.md5((user + PASSWORD_PADDING)[:32] + owner_hash +
+                             struct.pack('<i', permissions) + file_id).digest()
+        for i in range(50):
+            digest = hashlib.md5(digest).digest()
+        file_key = digest
+        user_hash = RC4_encrypt(file_key, hashlib.md5(PASSWORD_PADDING + file_id).digest())
+        for i in range(1, 20):
+            user_hash = RC4_encrypt(bytes(bytearray(b ^ i for b in bytearray(file_key))),
+                                    user_hash)
+        user_hash += b'\0' * 16
+        object_key = lambda idnum: hashlib.md5(file_key + struct.pack('<i', idnum)[:3] +
+                                               b'\0\0sAlT').digest()
+        encrypt = (b'<< /Filter /Standard /V 4 /R 4 /Length 128 '
+                   b'/CF << /StdCF << /CFM /AESV2 /AuthEvent /DocOpen /Length 16 >> >> '
+                   b'/StmF /StdCF /StrF /StdCF /O <' + hexlify(owner_hash) +
+                   b'> /U <' + hexlify(user_hash) + b'> /P -4 >>')
+    content = aes(object_key(4), b'v' * 16, zlib.compress(CONTENT))
+    title = aes(object_key(6), b'w' * 16, b'Secret title')
+    return make_pdf([b'<< /Type /Catalog /Pages 2 0 R >>',
+                     b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+                     b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                     b'/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>',
+                     stream(content, b'/Filter /FlateDecode'),
+                     b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+                     b'<< /Title <' + hexlify(title) + b'> >>',
+                     encrypt],
+                    b'/Root 1 0 R /Info 6 0 R /Encrypt 7 0 R '
+                    b'/ID [<' + hexlify(file_id) + b'> <' + hexlify(file_id) + b'>]')
+
+def check_decryption(revision):
+    data = encrypted_pdf(revision)
+    for password, matched in [('user', 1), ('owner', 2), ('wrong', 0)]:
+        pdf = reader(data)
+        assert_true(pdf.isEncrypted)
+        assert_equal(pdf.decrypt(password), matched)
+        if matched:
+            assert_equal(pdf.getPage(0).getContents().getData(), CONTENT)
+            assert_equal(pdf.getDocumentInfo().title, 'Secret title')
+            assert_in('Hello secret world', pdf.getPage(0).extractText())
+
+def test_aes_128():
+    check_decryption(4)
+
+def test_aes_256():
+    check_decryption(6)
+
+class RecordingBackend(crypto.PythonBackend):
+    def __init__(self):
+        self.calls = []
+
+    def aesCbcDecrypt(self, key, iv, data):
+        self.calls.append(len(data))
+        return crypto.PythonBackend.aesCbcDecrypt(self, key, iv, data)
+
+def test_backend():
+    backend = RecordingBackend()
+    saved = crypto.getBackend()
+    crypto.setBackend(backend)
+    try:
+        pdf = reader(encrypted_pdf(4))
+        pdf.decrypt('user')
+        assert_equal(pdf.getPage(0).getContents().getData(), CONTENT)
+    finally:
+        crypto.setBackend(saved)
+    assert_true(backend.calls)
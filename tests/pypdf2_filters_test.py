@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  pypdf2_filters_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+
+"""
+Unit tests for the stream filters of PyPDF2
+"""
+
+import random
+import zlib
+
+from scribbler.PyPDF2 import filters
+from scribbler.PyPDF2.generic import DictionaryObject, NameObject, NumberObject
+from scribbler.PyPDF2.utils import PdfReadError
+
+from nose.tools import *
+
+
+def random_bytes(count, seed=0):
+    rand = random.Random(seed)
+    return bytes(bytearray(rand.randrange(256) for i in range(count)))
+
+def decode_parms(**parms):
+    return DictionaryObject((NameObject('/' + key), NumberObject(value))
+                            for key, value in parms.items())
+
+def paeth(left, up, upLeft):
+    p = left + up - upLeft
+    if abs(p - left) <= abs(p - up) and abs(p - left) <= abs(p - upLeft):
+        return left
+    elif abs(p - up) <= abs(p - upLeft):
+        return up
+    return upLeft
+
+def png_filter(data, rowlength, bpp, filterTypes):
+    # a reference PNG filter, straight from the specification, filtering
+    # the rows of data with each of filterTypes in turn
+    data = bytearray(data)
+    out = bytearray()
+    prev = bytearray(rowlength)
+    for n, start in enumerate(range(0, len(data), rowlength)):
+        row = data[start:start + rowlength]
+        filterType = filterTypes[n % len(filterTypes)]
+        out.append(filterType)
+        for i in range(rowlength):
+            left = row[i - bpp] if i >= bpp else 0
+            upLeft = prev[i - bpp] if i >= bpp else 0
+            predicted = [0, left, prev[i], (left + prev[i]) // 2,
+                         paeth(left, prev[i], upLeft)][filterType]
+            out.append((row[i] - predicted) & 0xff)
+        prev = row
+    return bytes(out)
+
+def tiff_difference(data, colors, bits, columns):
+    # the reference TIFF predictor 2, on whole rows of components
+    data = bytearray(data)
+    rowlength = (colors * bits * columns + 7) // 8
+    out = bytearray()
+    for start in range(0, len(data), rowlength):
+        value = 0
+        for byte in data[start:start + rowlength]:
+            value = value << 8 | byte
+        padding = rowlength * 8 - colors * bits * columns
+        value >>= padding
+        mask = (1 << bits) - 1
+        components = [(value >> (bits * (colors * columns - 1 - i))) & mask
+                      for i in range(colors * columns)]
+        differences = components[:colors] + [
+            (components[i] - components[i - colors]) & mask
+            for i in range(colors, len(components))]
+        value = 0
+        for component in differences:
+            value = value << bits | component
+        value <<= padding
+        out += bytearray((value >> (8 * (rowlength - 1 - i))) & 0xff
+                         for i in range(rowlength))
+    return bytes(out)
+
+def without_numpy(test):
+    # runs test with the pure Python decoders, then with NumPy if it is
+    # installed
+    saved = filters.numpy
+    try:
+        filters.numpy = None
+        test()
+    finally:
+        filters.numpy = saved
+    if saved != None:
+        test()
+
+def test_png_predictors():
+    def test():
+        for colors, bits, columns in [(1, 8, 7), (3, 8, 5), (4, 16, 3),
+                                      (1, 1, 13), (2, 4, 3)]:
+            rowlength = (colors * bits * columns + 7) // 8
+            bpp = (colors * bits + 7) // 8
+            raw = random_bytes(rowlength * 12, columns)
+            # every filter alone, then all of them mixed, with runs of Up
+            for filterTypes in [[0], [1], [2], [3], [4], [2, 2, 2, 1, 4, 3, 0]]:
+                parms = decode_parms(Predictor=15, Colors=colors,
+                                     BitsPerComponent=bits, Columns=columns)
+                encoded = zlib.compress(png_filter(raw, rowlength, bpp,
+                                                   filterTypes))
+                assert_equal(filters.FlateDecode.decode(encoded, parms), raw)
+    without_numpy(test)
+
+def test_png_errors():
+    parms = decode_parms(Predictor=12, Columns=2)
+    assert_raises(PdfReadError, filters.FlateDecode.decode,
+                  zlib.compress(b'\x00\x01\x02\x00'), parms)
+    assert_raises(PdfReadError, filters.FlateDecode.decode,
+                  zlib.compress(b'\x07\x01\x02'), parms)
+
+def test_tiff_predictor():
+    def test():
+        for colors, bits, columns in [(1, 8, 9), (3, 8, 4), (2, 16, 5),
+                                      (1, 1, 11), (3, 2, 5), (1, 4, 7)]:
+            rowlength = (colors * bits * columns + 7) // 8
+            raw = random_bytes(rowlength * 6, columns)
+            padding = rowlength * 8 - colors * bits * columns
+            if padding:
+                # the bits after the last pixel of each row are zero
+                raw = bytearray(raw)
+                for end in range(rowlength - 1, len(raw), rowlength):
+                    raw[end] &= 0xff ^ ((1 << padding) - 1)
+                raw = bytes(raw)
+            parms = decode_parms(Predictor=2, Colors=colors,
+                                 BitsPerComponent=bits, Columns=columns)
+            encoded = zlib.compress(tiff_difference(raw, colors, bits, columns))
+            assert_equal(filters.FlateDecode.decode(encoded, parms), raw)
+    without_numpy(test)
+
+def test_lzw():
+    text = b'TOBEORNOTTOBEORTOBEORNOT#' * 200
+    for data in [b'', b'a', text, random_bytes(20000)]:
+        encoded = filters.LZWDecode.encode(data)
+        assert_equal(filters.LZWDecode.decode(encoded), data)
+    assert_less(len(filters.LZWDecode.encode(text)), len(text) // 5)
+    # the example of the PDF Reference, section 3.3.3
+    assert_equal(filters.LZWDecode.decode(b'\x80\x0b\x60\x50\x22\x0c\x0c\x85\x01'),
+                 b'\x2d\x2d\x2d\x2d\x2d\x41\x2d\x2d\x2d\x42')
+    assert_raises(PdfReadError, filters.LZWDecode.decode, b'\x80\x0b\x60')
+
+def test_lzw_early_change():
+    data = random_bytes(3000, 1)
+    encoded = filters.LZWDecode.encode(data)
+    assert_equal(filters.LZWDecode.decode(encoded, decode_parms(EarlyChange=1)),
+                 data)
+    # without the early change, the code width grows a code later, so the
+    # codes after the first change of width are misread
+    try:
+        decoded = filters.LZWDecode.decode(encoded, decode_parms(EarlyChange=0))
+    except PdfReadError:
+        decoded = None
+    assert_not_equal(decoded, data)
+
+def test_ascii85():
+    for data in [b'', b'a', b'ab\x00\x00\x00\x00cd', b'\x00' * 8,
+                 random_bytes(1001), b'\xff' * 4]:
+        encoded = filters.ASCII85Decode.encode(data)
+        assert_true(encoded.endswith(b'~>'))
+        assert_equal(filters.ASCII85Decode.decode(encoded), data)
+    assert_equal(filters.ASCII85Decode.decode(b'<~9jqo^ BlbD-\nzs8W-!~>'),
+                 b'Man is d\x00\x00\x00\x00\xff\xff\xff\xff')
+
+def test_ascii85_errors():
+    decode = filters.ASCII85Decode.decode
+    # z only stands for a whole group
+    assert_raises(PdfReadError, decode, b'!!z!!!~>')
+    # groups beyond 2**32 - 1, at the end and in the middle
+    assert_raises(PdfReadError, decode, b's8W-"~>')
+    assert_raises(PdfReadError, decode, b'!!!!!s8W-"!!!!!~>')
+    # a final group of one character
+    assert_raises(PdfReadError, decode, b'!!!!!!~>')
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  pypdf2_lexer_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+
+"""
+Unit tests for the buffer lexer of PyPDF2
+"""
+
+from io import BytesIO
+
+from scribbler.PyPDF2 import PdfFileReader
+from scribbler.PyPDF2.generic import DecodedStreamObject, FloatObject
+from scribbler.PyPDF2.generic import NumberObject
+from scribbler.PyPDF2.generic import readObject
+from scribbler.PyPDF2.lexer import Lexer
+from scribbler.PyPDF2.pdf import ContentStream
+from scribbler.PyPDF2.utils import PdfReadError, PdfStreamError
+
+from pdf_samples import SAMPLE_PDF
+
+from nose.tools import *
+
+OBJECTS = [
+    b'<< /Type /Page /MediaBox [0 0 612.5 -792] /Rotate 90 >>',
+    b'[1 2 R 3 4 R/Name#20x 5 -6 +.5 true false null]',
+    b'(nested (paren\\)theses) \\101\\007esc\\\\aped\\n line\\\r\nbreak)',
+    b'<48656C6C6F 2>',
+    b'<< /A << /B [<<>> []] >> /C (x) % a comment\n /D /E >>',
+    b'/Name',
+    b'[1 0 R]',
+    b'(caf\\351)',
+]
+
+def dump(obj):
+    # the types and serialisations of obj and everything in it
+    if isinstance(obj, dict):
+        return (type(obj), sorted((k, dump(v)) for k, v in obj.items()))
+    elif isinstance(obj, list):
+        return (type(obj), [dump(v) for v in obj])
+    out = BytesIO()
+    obj.writeToStream(out, None)
+    return (type(obj), out.getvalue())
+
+def same(a, b):
+    assert_equal(dump(a), dump(b))
+
+def test_objects():
+    for data in OBJECTS:
+        obj, pos = Lexer(data + b' ', None).readObject(0)
+        same(obj, readObject(BytesIO(data + b' '), None))
+
+def test_short_octal_escape():
+    # readObject loses the character after an escape of fewer than three
+    # octal digits
+    obj, pos = Lexer(b'(\\7 x\\12)', None).readObject(0)
+    assert_equal(obj, b'\x07 x\n')
+
+def test_position():
+    lexer = Lexer(b'  [1 2]  /A', None)
+    obj, pos = lexer.readObject(0)
+    assert_equal(pos, 7)
+    obj, pos = lexer.readObject(pos)
+    assert_equal(obj, '/A')
+    assert_equal(pos, 11)
+
+def test_errors():
+    assert_raises(PdfStreamError, Lexer(b'  ', None).readObject, 0)
+    assert_raises(PdfReadError, Lexer(b'  )', None).readObject, 0)
+    assert_raises(PdfReadError, Lexer(b'x', None).readObjectHeader, 0)
+    assert_equal(Lexer(b'12 0 obj\n<<>>', None).readObjectHeader(0),
+                 (12, 0, 9))
+
+def test_sample():
+    # every object of the sample file reads as it did through the stream
+    data = open(SAMPLE_PDF, 'rb').read()
+    reader = PdfFileReader(BytesIO(data))
+    stream = BytesIO(data)
+    for generation, objects in reader.xref.items():
+        for idnum, offset in objects.items():
+            if not idnum:
+                continue
+            idnum, generation, pos = reader._lexer.readObjectHeader(offset)
+            obj, pos = reader._lexer.readObject(pos)
+            stream.seek(offset)
+            reader.readObjectHeader(stream)
+            expected = readObject(stream, reader)
+            same(obj, expected)
+            if hasattr(obj, 'getData'):
+                assert_equal(obj.getData(), expected.getData())
+
+def test_float():
+    # reals are written without exponents and read back as the same float
+    for value in [0.5, -612.25, 0.1 + 0.2, 1e-05, -1.5e-07, 1e16, 2.0]:
+        data = dump(FloatObject(value))[1]
+        assert_not_in(b'e', data)
+        obj, pos = Lexer(data + b' ', None).readObject(0)
+        assert_equal(float(obj), value)
+    assert_equal(dump(FloatObject('72.0'))[1], b'72')
+    # PDF has no infinities or NaNs
+    assert_equal(dump(FloatObject('nan'))[1], b'0')
+    assert_equal(dump(FloatObject('-inf'))[1],
+                 b'-340300000000000000000000000000000000000')
+
+CONTENT = (b'q 1 0 0 1 72 720 cm BT /F1 12 Tf (Hi) Tj [(A) -20 (B)] TJ ET\n'
+           b'BI /W 2 /H 1 /BPC 8 /CS /G ID \x00EI\x01 EI Q % done\n')
+
+def test_operations():
+    operations = list(Lexer(CONTENT, None).readOperations())
+    operators = [operator for operands, operator in operations]
+    assert_equal(operators, [b'q', b'cm', b'BT', b'Tf', b'Tj', b'TJ', b'ET',
+                             b'INLINE IMAGE', b'Q'])
+    assert_equal(operations[1][0], [1, 0, 0, 1, 72, 720])
+    assert_equal(operations[3][0], ['/F1', 12])
+    assert_equal(operations[5][0][0], ['A', -20, 'B'])
+    # EI only ends the image between white space
+    image = operations[7][0]
+    assert_equal(image['data'], b'\x00EI\x01 ')
+    assert_equal(image['settings']['/W'], 2)
+    assert_raises(PdfStreamError, list,
+                  Lexer(b'BI /W 1 ID \x00EIQ', None).readOperations())
+
+def test_content_stream():
+    stream = DecodedStreamObject()
+    stream.setData(CONTENT)
+    content = ContentStream(stream, None)
+    operators = [operator for operands, operator in content.iterOperations()]
+    assert_equal(len(operators), 9)
+    # the list of operations may be changed, and is written out
+    del content.operations[7]
+    content.operations[3][0][1] = NumberObject(14)
+    data = content.getData()
+    assert_in(b'/F1 14 Tf', data)
+    assert_not_in(b'BI', data)
+    reread = ContentStream(content, None)
+    assert_equal([op for operands, op in reread.iterOperations()],
+                 operators[:7] + operators[8:])
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  pypdf2_utils_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+"""
+Unit tests for merging PDF files with PyPDF2
+"""
+
+from io import BytesIO
+
+from scribbler.PyPDF2 import PdfFileMerger, PdfFileReader, PdfFileWriter
+from scribbler.PyPDF2.generic import IndirectObject, TextStringObject
+
+from pdf_samples import SAMPLE_PDF, reader
+
+from nose.tools import *
+
+
+def bookmarked_pdf():
+    # two pages, with a bookmark to the first and one under it to the second
+    writer = PdfFileWriter()
+    for i in range(2):
+        writer.addPage(PdfFileReader(open(SAMPLE_PDF, 'rb')).getPage(0))
+    parent = writer.addBookmark('Start', 0)
+    writer.addBookmark('Inner', 1, parent)
+    out = BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+def destinations_pdf(pages):
+    # a bookmark and a named destination to each of PAGES pages
+    writer = PdfFileWriter()
+    for i in range(pages):
+        writer.addPage(PdfFileReader(open(SAMPLE_PDF, 'rb')).getPage(0))
+        writer.addBookmark('Page {}'.format(i), i)
+        writer.addNamedDestination(TextStringObject('page{}'.format(i)), i)
+    out = BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+def merged(merger):
+    out = BytesIO()
+    merger.write(out)
+    return reader(out.getvalue())
+
+def outline(bookmarks):
+    # the titles and destinations of the bookmarks, nested as they are; the
+    # merger gives pages by the number it gave them
+    return [outline(b) if isinstance(b, list) else (b.title, b.page)
+            for b in bookmarks]
+
+def summary(pdf):
+    return (outline(pdf.getOutlines()),
+            [(list(pdf.getPage(i).mediaBox), pdf.getPage(i).getContents().getData())
+             for i in range(pdf.getNumPages())])
+
+def test_append_all():
+    data = bookmarked_pdf()
+    def inputs():
+        return [SAMPLE_PDF,
+                (BytesIO(data), 'Copy', (0, 1)),
+                (PdfFileReader(BytesIO(data)), None, None, False),
+                (BytesIO(data), 'Whole')]
+    merger = PdfFileMerger()
+    for args in inputs():
+        if not isinstance(args, tuple):
+            args = (args,)
+        merger.append(*args)
+    expected = summary(merged(merger))
+    assert_equal(len(expected[1]), 6)
+    assert_equal(expected[0], [('Copy', 1), [('Start', 1)],
+                               ('Whole', 4), [('Start', 4), [('Inner', 5)]]])
+    # in this process, then with workers
+    for processes in [1, 2]:
+        merger = PdfFileMerger()
+        merger.appendAll(inputs(), processes)
+        assert_equal(summary(merged(merger)), expected)
+
+def test_find_pages_by_reference():
+    # the pages of bookmarks and named destinations are looked up by their
+    # references, without comparing them with each page
+    merger = PdfFileMerger()
+    found = []
+    find_page = merger._find_page
+    def spy(page_index, page):
+        found.append(isinstance(page, IndirectObject))
+        return find_page(page_index, page)
+    merger._find_page = spy
+    merger.append(BytesIO(destinations_pdf(5)), pages=(1, 4))
+    assert_equal(found, [True] * 10)
+    pdf = merged(merger)
+    assert_equal(outline(pdf.getOutlines()),
+                 [('Page 1', 0), ('Page 2', 1), ('Page 3', 2)])
+    dests = pdf.getNamedDestinations()
+    assert_equal(sorted(dests), ['page1', 'page2', 'page3'])
+    assert_equal(pdf.getDestinationPageNumber(dests['page3']), 2)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  pypdf2_utils_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+"""
+Unit tests for reading the pages of PDF files with PyPDF2
+"""
+
+from pdf_samples import page_tree_pdf, reader
+
+from nose.tools import *
+
+
+def branches(count=b'/Count 1', second=b'/Count 1'):
+    # a page in each of two branches, only the first of which has resources
+    # and a rotation to pass on, then a page with a box of its own
+    return page_tree_pdf(
+        b'[3 0 R 4 0 R 7 0 R]', b'3',
+        [b'<< /Type /Pages /Parent 2 0 R /Kids [5 0 R] ' + count +
+         b' /Rotate 90 /Resources << /Font << /F1 8 0 R >> >> >>',
+         b'<< /Type /Pages /Parent 2 0 R /Kids [6 0 R] ' + second + b' >>',
+         b'<< /Type /Page /Parent 3 0 R >>',
+         b'<< /Type /Page /Parent 4 0 R >>',
+         b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 50 60] >>',
+         b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>'])
+
+INHERITED = ['/Resources', '/MediaBox', '/Rotate']
+
+def attributes(page):
+    # with the names of the resources, as references are only equal within
+    # a file
+    values = [page.get(attr) for attr in INHERITED]
+    if values[0] is not None:
+        values[0] = sorted(values[0])
+    return values
+
+def test_inheritance():
+    pdf = reader(branches())
+    pages = [attributes(pdf.getPage(i)) for i in range(3)]
+    assert_equal(pages[0], [['/Font'], [0, 0, 100, 100], 90])
+    assert_equal(pages[1], [None, [0, 0, 100, 100], None])
+    assert_equal(pages[2], [None, [0, 0, 50, 60], None])
+    # reading the whole tree at once comes to the same
+    pdf = reader(branches())
+    pdf._flatten()
+    assert_equal([attributes(page) for page in pdf.flattenedPages], pages)
+
+def test_missing_counts():
+    # a tree without the counts to descend it by is read all at once
+    pdf = reader(branches(b''))
+    assert_equal(attributes(pdf.getPage(1)), [None, [0, 0, 100, 100], None])
+    assert_not_equal(pdf.flattenedPages, None)
+    assert_equal(pdf.getPage(0).get('/Rotate'), 90)
+
+def test_mixed_kids():
+    # as many kids as pages, but not one page for each kid
+    pdf = reader(page_tree_pdf(
+        b'[3 0 R 4 0 R 5 0 R]', b'3',
+        [b'<< /Type /Pages /Parent 2 0 R /Kids [6 0 R 7 0 R] /Count 2 '
+         b'/Rotate 90 >>',
+         b'<< /Type /Page /Parent 2 0 R /Rotate 180 >>',
+         b'<< /Type /Pages /Parent 2 0 R /Kids [] /Count 0 >>',
+         b'<< /Type /Page /Parent 3 0 R /Rotate 0 >>',
+         b'<< /Type /Page /Parent 3 0 R >>']))
+    assert_equal([pdf.getPage(i).get('/Rotate') for i in range(3)], [0, 90, 180])
+    pdf._flatten()
+    assert_equal([page.get('/Rotate') for page in pdf.flattenedPages],
+                 [0, 90, 180])
+
+def test_same_pages_after_flatten():
+    pdf = reader(branches(second=b''))
+    page = pdf.getPage(0)
+    assert_equal(pdf.flattenedPages, None)
+    # the tree is read all at once here, for want of the second count
+    pdf.getPage(1)
+    assert_not_equal(pdf.flattenedPages, None)
+    assert_true(pdf.getPage(0) is page)
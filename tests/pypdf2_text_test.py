@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  pypdf2_text_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+
+"""
+Unit tests for the extraction of text from PDF files by PyPDF2
+"""
+
+from scribbler.PyPDF2.cmap import SimpleEncoding, ToUnicode, glyphText
+
+from pdf_samples import reader, stream, text_pdf
+
+from nose.tools import *
+
+FONT = b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+
+
+def text(content, font):
+    return reader(text_pdf(b'BT /F1 12 Tf ' + content + b' ET', font)) \
+        .getPage(0).extractText()
+
+def test_glyph_text():
+    assert_equal(glyphText('space'), u' ')
+    assert_equal(glyphText('A'), u'A')
+    assert_equal(glyphText('fi'), u'fi')
+    assert_equal(glyphText('f_f_i'), u'ffi')
+    assert_equal(glyphText('quoteright'), u'’')
+    assert_equal(glyphText('eacute'), u'\xe9')
+    assert_equal(glyphText('Scaron'), u'Š')
+    assert_equal(glyphText('aring'), u'\xe5')
+    assert_equal(glyphText('uni00E9'), u'\xe9')
+    assert_equal(glyphText('uni00660069'), u'fi')
+    assert_equal(glyphText('u1F600'), u'\U0001F600')
+    assert_equal(glyphText('a.sc'), u'a')
+    assert_is_none(glyphText('g123'))
+    assert_is_none(glyphText('Qacute'))
+
+def test_simple_encoding():
+    encoding = SimpleEncoding('cp1252', [1, '/fi', '/g7', '/eacute',
+                                         0x41, '/quoteright'])
+    assert_equal(encoding.decode(b'\x01\x02\x03A\x93B'), u'fi\xe9’“B')
+    assert_equal(SimpleEncoding(None, []).decode(b'\xe9'), u'\xe9')
+
+def test_named_encoding():
+    assert_equal(text(b'(caf\xe9 \x93x\x94) Tj',
+                      FONT + b'/Encoding /WinAnsiEncoding >>').strip(),
+                 u'caf\xe9 “x”')
+
+def test_encoding_dictionary():
+    # the encoding may be a dictionary, given directly or by reference,
+    # with or without a base encoding
+    font = FONT + b'/Encoding << /Differences [32 /space] >> >>'
+    assert_equal(text(b'(Hello World) Tj', font).strip(), u'Hello World')
+    font = [FONT + b'/Encoding 6 0 R >>',
+            b'<< /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+            b'/Differences [1 /f_i /fl /quoteright] >>']
+    assert_equal(text(b'(\x01nd \x02ow\x03s \x93x\x94) Tj', font).strip(),
+                 u'find flow’s “x”')
+    font = FONT + b'/Encoding << /BaseEncoding /MacRomanEncoding >> >>'
+    assert_equal(text(b'(\x8e) Tj', font).strip(), u'\xe9')
+
+def test_to_unicode():
+    cmap = (b'/CIDInit /ProcSet findresource begin 12 dict begin begincmap\n'
+            b'1 begincodespacerange <0000> <FFFF> endcodespacerange\n'
+            b'2 beginbfchar <0003> <0020> <0011> <FB01> endbfchar\n'
+            b'1 beginbfrange <0024> <0026> <0041> endbfrange\n'
+            b'1 beginbfrange <0030> <0031> [<00E9> <D83DDE00>] endbfrange\n'
+            b'endcmap CMapName currentdict /CMap defineresource pop end end')
+    font = [b'<< /Type /Font /Subtype /Type0 /BaseFont /Sub '
+            b'/Encoding /Identity-H /ToUnicode 6 0 R >>', stream(cmap)]
+    assert_equal(text(b'<0024002500260003001100300031> Tj', font).strip(),
+                 u'ABC ﬁ\xe9\U0001F600')
+    to_unicode = ToUnicode(cmap)
+    assert_equal(to_unicode.codeLengths, [2])
+    assert_equal(to_unicode.decode(b'\x00\x25\x00\x99'), u'B')
+
+def test_no_encoding():
+    # strings of fonts that don't say are read as PDFDocEncoding
+    assert_equal(text(b'(plain) Tj', FONT + b'>>').strip(), u'plain')
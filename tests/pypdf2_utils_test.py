@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  pypdf2_utils_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+"""
+Unit tests for the utilities of PyPDF2
+"""
+
+import math
+
+from scribbler.PyPDF2 import utils
+from scribbler.PyPDF2.pdf import ContentStream, PageObject
+from scribbler.PyPDF2.utils import ObjectNumberMap, SizedCache
+from scribbler.PyPDF2.utils import composeTransformations, matrixMultiply
+from scribbler.PyPDF2.utils import transformedBounds
+
+from pdf_samples import SAMPLE_PDF, reader, text_pdf
+
+from nose.tools import *
+
+
+def test_object_number_map():
+    m = ObjectNumberMap()
+    m[1] = 10
+    m[5] = 0
+    m[3] = 7
+    assert_equal(len(m), 3)
+    assert_equal(m[5], 0)
+    assert_in(3, m)
+    assert_not_in(2, m)
+    assert_equal(m.get(2, 'none'), 'none')
+    assert_raises(KeyError, lambda: m[2])
+    m[3] = 8
+    assert_equal(len(m), 3)
+    del m[1]
+    assert_equal(m.items(), [(3, 8), (5, 0)])
+    assert_equal(list(m), [3, 5])
+
+def test_object_number_map_sparse():
+    m = ObjectNumberMap()
+    m[2] = 1
+    # far beyond the array, and negative numbers, go in the dictionary
+    m[10 ** 9] = 4
+    m[-1] = 5
+    m[3] = -2
+    assert_less(m._capacity(), 10 ** 6)
+    assert_equal(m.items(), [(-1, 5), (2, 1), (3, -2), (10 ** 9, 4)])
+    # moves between the array and the dictionary as the value changes
+    m[3] = 6
+    assert_equal(m[3], 6)
+    assert_equal(len(m), 4)
+    del m[10 ** 9]
+    assert_equal(len(m), 3)
+
+def test_object_number_map_width():
+    m = ObjectNumberMap(2)
+    m[4] = (1, 2)
+    m[0] = (0, 0)
+    assert_equal(m[4], (1, 2))
+    assert_equal(m.keys(), [0, 4])
+    assert_raises(AssertionError, m.__setitem__, 1, (1,))
+
+def test_object_number_map_large_values():
+    # offsets past 4 GiB, with the array and with the list used where
+    # there is no 64-bit array typecode
+    typecode = utils.int64_typecode
+    try:
+        for utils.int64_typecode in [typecode, None]:
+            m = ObjectNumberMap(2)
+            m[1] = (2 ** 40 + 3, 0)
+            m[3] = (5, 2 ** 33)
+            assert_equal(m.items(), [(1, (2 ** 40 + 3, 0)), (3, (5, 2 ** 33))])
+    finally:
+        utils.int64_typecode = typecode
+
+def test_sized_cache():
+    cache = SizedCache(10)
+    cache.put('a', 'A', 4)
+    cache.put('b', 'B', 4)
+    assert_equal(cache.get('a'), 'A')
+    # the least recently used entry goes first
+    cache.put('c', 'C', 4)
+    assert_is_none(cache.get('b'))
+    assert_equal(cache.get('a'), 'A')
+    assert_equal(len(cache), 2)
+    # too big to keep at all, and replacing an entry frees its size
+    cache.put('d', 'D', 11)
+    assert_is_none(cache.get('d'))
+    cache.put('a', 'A2', 6)
+    assert_equal(cache.get('a'), 'A2')
+    assert_equal(cache.get('c'), 'C')
+    cache.discard('a')
+    cache.discard('x')
+    cache.put('e', 'E', 6)
+    assert_equal(cache.get('c'), 'C')
+    assert_equal(len(cache), 2)
+    cache.clear()
+    assert_equal(len(cache), 0)
+
+def test_decoded_cache():
+    pdf = reader(open(SAMPLE_PDF, 'rb').read())
+    contents = pdf.getPage(0).getContents()
+    data = contents.getData()
+    assert_equal(len(pdf._decodeCache), 1)
+    # decoded once, then handed out from the reader's cache
+    assert_true(contents.getData() is data)
+    pdf._decodeCache.clear()
+    assert_equal(contents.getData(), data)
+
+ROTATE = [math.cos(0.3), math.sin(0.3), -math.sin(0.3), math.cos(0.3), 0, 0]
+SCALE = [2, 0, 0, 0.5, 0, 0]
+TRANSLATE = [1, 0, 0, 1, 30, -40]
+
+def without_numpy(test):
+    # runs test with the pure Python code, then with NumPy if it is installed
+    saved = utils.numpy
+    try:
+        utils.numpy = None
+        test()
+    finally:
+        utils.numpy = saved
+    if saved != None:
+        test()
+
+def matrix(ctm):
+    a, b, c, d, e, f = ctm
+    return [[a, b, 0], [c, d, 0], [e, f, 1]]
+
+def assert_matrix_equal(ctm, expected):
+    assert_equal(len(ctm), 6)
+    for x, y in zip(ctm, expected):
+        assert_almost_equal(x, y)
+
+def test_compose_transformations():
+    expected = matrixMultiply(matrixMultiply(matrix(ROTATE), matrix(SCALE)),
+                              matrix(TRANSLATE))
+    assert_matrix_equal(composeTransformations(ROTATE, SCALE, TRANSLATE),
+                        [expected[0][0], expected[0][1], expected[1][0],
+                         expected[1][1], expected[2][0], expected[2][1]])
+    assert_equal(composeTransformations(), [1, 0, 0, 1, 0, 0])
+    assert_equal(composeTransformations(TRANSLATE, TRANSLATE),
+                 [1, 0, 0, 1, 60, -80])
+
+def test_compose_batches():
+    def test():
+        scales = [[s, 0, 0, s, 0, 0] for s in [1, 0.5, 3]]
+        composed = composeTransformations(ROTATE, scales, TRANSLATE)
+        assert_equal(len(composed), 3)
+        # each is composed as a single matrix would be
+        for ctm, scale in zip(composed, scales):
+            assert_matrix_equal(ctm, composeTransformations(ROTATE, scale,
+                                                            TRANSLATE))
+        composed = composeTransformations(scales, [TRANSLATE, ROTATE, SCALE])
+        assert_matrix_equal(composed[2], composeTransformations(scales[2], SCALE))
+    without_numpy(test)
+
+def test_transformed_bounds():
+    def test():
+        boxes = [[0, 0, 100, 50], [10, 10, 20, 20]]
+        assert_equal(transformedBounds(boxes, [SCALE, TRANSLATE]),
+                     (0, -30, 200, 25))
+        llx, lly, urx, ury = transformedBounds(boxes[:1],
+                                               [[0, 1, -1, 0, 0, 0]])
+        assert_almost_equal(llx, -50)
+        assert_almost_equal(ury, 100)
+    without_numpy(test)
+
+def text_page(text):
+    font = b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>'
+    return reader(text_pdf(b'BT /F1 12 Tf 72 700 Td (' + text + b') Tj ET',
+                           font)).getPage(0)
+
+def test_merge_transformed_pages():
+    # merging pages all at once comes to what merging them in turn does
+    ctms = [SCALE, composeTransformations(ROTATE, TRANSLATE)]
+    pages = []
+    for merge in range(2):
+        page = PageObject.createBlankPage(None, 100, 100)
+        texts = [text_page(b'One'), text_page(b'Two')]
+        if merge:
+            page.mergeTransformedPages(texts, ctms, True)
+        else:
+            for text, ctm in zip(texts, ctms):
+                page.mergeTransformedPage(text, ctm, True)
+        pages.append(page)
+    single, batch = pages
+    assert_equal(batch.extractText(), 'OneTwo')
+    assert_equal(list(batch.mediaBox), list(single.mediaBox))
+    operators = [[op for operands, op in
+                  ContentStream(page.getContents(), None).operations
+                  if op not in (b'q', b'Q')] for page in pages]
+    assert_equal(operators[0], operators[1])
+    assert_raises(ValueError, batch.mergeTransformedPages,
+                  [text_page(b'Three')], ctms)
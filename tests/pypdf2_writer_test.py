@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  pypdf2_writer_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+
+"""
+Unit tests for writing PDF files with PyPDF2
+"""
+
+from io import BytesIO
+
+from scribbler.PyPDF2 import PdfFileReader, PdfFileWriter
+from scribbler.PyPDF2.generic import (ArrayObject, DecodedStreamObject,
+                                      NameObject)
+
+from pdf_samples import SAMPLE_PDF, make_pdf, reader, stream
+
+from nose.tools import *
+
+
+def sample_writer(copies=1):
+    writer = PdfFileWriter()
+    for i in range(copies):
+        writer.addPage(PdfFileReader(open(SAMPLE_PDF, 'rb')).getPage(0))
+    return writer
+
+def write(writer, **kwargs):
+    out = BytesIO()
+    writer.write(out, **kwargs)
+    out.seek(0)
+    return PdfFileReader(out)
+
+def test_deep_outline():
+    # deeper than the interpreter's recursion limit
+    depth = 3000
+    writer = sample_writer()
+    parent = None
+    for i in range(depth):
+        parent = writer.addBookmark('Level {}'.format(i), 0, parent)
+    reader = write(writer)
+    node = reader.trailer['/Root']['/Outlines']
+    titles = []
+    while '/First' in node:
+        node = node['/First']
+        titles.append(node['/Title'])
+    assert_equal(len(titles), depth)
+    assert_equal(titles[-1], 'Level {}'.format(depth - 1))
+    assert_equal(reader.getNumPages(), 1)
+
+def test_get_reference():
+    writer = sample_writer(2)
+    first, second = writer.getPage(0), writer.getPage(1)
+    assert_equal(writer.getReference(first).idnum,
+                 writer.getObject(writer._pages)['/Kids'][0].idnum)
+    assert_equal(writer.getReference(second).idnum,
+                 writer.getObject(writer._pages)['/Kids'][1].idnum)
+    # an equal copy is found by the fallback search
+    info = writer.getObject(writer._info)
+    copy = info.__class__(info)
+    assert_equal(writer.getReference(copy).idnum, writer._info.idnum)
+
+def test_streaming():
+    expected = write(sample_writer(3))
+    reader = write(sample_writer(3), streaming=True)
+    assert_equal(reader.getNumPages(), 3)
+    for i in range(3):
+        assert_equal(reader.getPage(i).extractText(),
+                     expected.getPage(i).extractText())
+
+def test_streaming_shared_stream():
+    # the same direct stream reached twice is added twice
+    writer = sample_writer()
+    page = writer.getPage(0)
+    data = DecodedStreamObject()
+    data.setData(b'0 0 m')
+    page[NameObject('/PieceInfo')] = ArrayObject([data, data])
+    reader = write(writer, streaming=True)
+    for piece in reader.getPage(0)['/PieceInfo']:
+        assert_equal(piece.getObject().getData(), b'0 0 m')
+
+def test_streaming_drops_copied():
+    source = PdfFileReader(open(SAMPLE_PDF, 'rb'))
+    writer = PdfFileWriter()
+    writer.addPage(source.getPage(0))
+    contents = source.getPage(0).raw_get('/Contents')
+    source.getPage(0).getContents().getData()
+    assert_in((contents.generation, contents.idnum), source.resolvedObjects)
+    write(writer, streaming=True)
+    assert_not_in((contents.generation, contents.idnum), source.resolvedObjects)
+    assert_equal(len(source._decodeCache), 0)
+    # and parsed again when asked for
+    assert_true(source.getObject(contents).getData())
+
+def test_compressed():
+    expected = write(sample_writer(2))
+    for streaming in (False, True):
+        writer = sample_writer(2)
+        writer._objectStreamLength = 3
+        out = BytesIO()
+        writer.write(out, streaming=streaming, compress=True)
+        data = out.getvalue()
+        assert_true(data.startswith(b'%PDF-1.5'))
+        assert_in(b'/ObjStm', data)
+        assert_in(b'/XRef', data)
+        assert_not_in(b'\ntrailer', data)
+        reader = PdfFileReader(BytesIO(data))
+        assert_equal(reader.getNumPages(), 2)
+        assert_equal(reader.getPage(1).extractText(),
+                     expected.getPage(1).extractText())
+        assert_equal(reader.getDocumentInfo()['/Producer'], 'PyPDF2')
+        # objects packed into object streams are found through the
+        # cross-reference stream
+        assert_true(reader.xref_objStm)
+
+def image_pdf(mask):
+    return make_pdf([b'<< /Type /Catalog /Pages 2 0 R >>',
+                     b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+                     b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 10 10] '
+                     b'/Contents 4 0 R /Resources << /XObject << /Im1 5 0 R >> >> >>',
+                     stream(b'q 10 0 0 10 0 0 cm /Im1 Do Q'),
+                     stream(b'abc', b'/Type /XObject /Subtype /Image /Width 1 '
+                                    b'/Height 1 /BitsPerComponent 8 '
+                                    b'/ColorSpace 7 0 R /SMask 6 0 R'),
+                     stream(mask, b'/Type /XObject /Subtype /Image /Width 1 '
+                                  b'/Height 1 /BitsPerComponent 8 '
+                                  b'/ColorSpace /DeviceGray'),
+                     b'[/ICCBased 8 0 R]',
+                     stream(b'icc profile', b'/N 3')])
+
+def images(data):
+    return [obj for obj in data.split(b'endobj') if b'/Subtype /Image' in obj]
+
+def test_shared_streams():
+    writer = PdfFileWriter()
+    for mask in (b'm', b'm', b'n'):
+        writer.addPage(reader(image_pdf(mask)).getPage(0))
+    out = BytesIO()
+    writer.write(out)
+    # the first two images, with their masks and colour spaces, are
+    # shared, and the third has its own image for its own mask
+    assert_equal(len(images(out.getvalue())), 4)
+    assert_equal(out.getvalue().count(b'icc profile'), 1)
+    result = PdfFileReader(out)
+    xobjects = [result.getPage(i)['/Resources']['/XObject'].raw_get('/Im1')
+                for i in range(3)]
+    assert_equal(xobjects[0], xobjects[1])
+    assert_not_equal(xobjects[0], xobjects[2])
+    assert_equal(result.getPage(2)['/Resources']['/XObject']['/Im1']['/SMask']
+                 .getData(), b'n')
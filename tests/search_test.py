@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  search_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+
+"""
+Unit tests for the full-text index of a notebook
+"""
+
+import os.path
+import shutil
+import sqlite3
+from tempfile import mkdtemp
+
+from scribbler.errors import ScribblerError
+from scribbler.search import SCHEMA_VERSION, SearchIndex, match_expression
+
+from nose.tools import *
+
+loc = None
+
+documents = {
+    u'notes/monday.md': {'kind': 'article', 'loc': u'notes/monday.html',
+                         'title': u'Monday', 'tags': u'Lab',
+                         'date': u'2014-10-20',
+                         'text': u'Calibrated the spectrometer and measured '
+                                 u'the samples.',
+                         'source': u'Title: Monday\n\nCalibrated the '
+                                   u'spectrometer...'},
+    u'notes/tuesday.md': {'kind': 'article', 'loc': u'notes/tuesday.html',
+                          'title': u'Spectrometer repairs', 'tags': u'Lab',
+                          'date': u'2014-10-21',
+                          'text': u'The spectrometer was broken again.',
+                          'source': u'Title: Spectrometer repairs'},
+    u'files/paper.pdf': {'kind': 'pdf', 'loc': u'files/paper.pdf',
+                         'title': u'A paper', 'tags': u'', 'date': u'',
+                         'text': u'Measuring samples with a laser.',
+                         'source': u''},
+}
+
+def setup():
+    global loc
+    loc = mkdtemp()
+
+def teardown():
+    shutil.rmtree(loc)
+
+def make_index(name, made=None):
+    index = SearchIndex(os.path.join(loc, name))
+    for path, doc in sorted(documents.items()):
+        def make(doc=doc, path=path):
+            if made is not None:
+                made.append(path)
+            return doc
+        index.document(path, make, doc['title'], doc['text'])
+    index.save()
+    return index
+
+def test_match_expression():
+    assert_equal(match_expression(u'laser samples'), u'"laser" AND "samples"')
+    assert_equal(match_expression(u'"broken again" -laser spectro*'),
+                 u'"broken again" AND "spectro" * NOT "laser"')
+    assert_equal(match_expression(u'e-mail "a""b'), u'"e-mail" AND "a" AND "b"')
+    assert_is_none(match_expression(u'-laser'))
+
+def test_search():
+    index = make_index('search.sqlite')
+    results = index.search(u'spectrometer')
+    assert_equal([r.path for r in results],
+                 [u'notes/tuesday.md', u'notes/monday.md'])
+    assert_equal(results[0].kind, 'article')
+    assert_equal(results[0].date, u'2014-10-21')
+    assert_equal([r.path for r in index.search(u'measure -laser')],
+                 [u'notes/monday.md'])
+    assert_equal([r.path for r in index.search(u'2014-10-20')],
+                 [u'notes/monday.md'])
+    assert_equal([r.path for r in index.search(u'"broken again"')],
+                 [u'notes/tuesday.md'])
+    assert_equal(index.search(u'"again broken"'), [])
+    assert_equal(index.search(u'lase*', 10, (u'[', u']'))[0].snippet,
+                 u'Measuring samples with a [laser].')
+    index.close()
+
+def test_incremental():
+    make_index('incremental.sqlite').close()
+    made = []
+    make_index('incremental.sqlite', made).close()
+    assert_equal(made, [])
+    index = SearchIndex(os.path.join(loc, 'incremental.sqlite'))
+    doc = dict(documents[u'notes/monday.md'], text=u'Aligned the laser.',
+               source=u'Title: Monday\n\nAligned the laser.')
+    index.document(u'notes/monday.md', lambda: doc, doc['title'], doc['text'])
+    index.save()
+    assert_equal([r.path for r in index.search(u'laser')],
+                 [u'notes/monday.md'])
+    assert_equal(index.search(u'spectrometer calibrated'), [])
+    index.close()
+
+def test_non_ascii():
+    assert_equal(match_expression(u'caf\xe9 laser'), u'"caf\xe9" AND "laser"')
+    index = SearchIndex(os.path.join(loc, 'non_ascii.sqlite'))
+    doc = {'kind': 'article', 'loc': u'notes/caf\xe9.html',
+           'title': u'Caf\xe9 na\xefve', 'tags': u'\xc9t\xe9', 'date': u'',
+           'text': u'Aligned the laser in the caf\xe9.', 'source': u''}
+    index.document(u'notes/caf\xe9.md', lambda: doc, doc['title'], doc['text'])
+    index.save()
+    results = index.search(u'caf\xe9 laser', 10, (u'[', u']'))
+    assert_equal([r.path for r in results], [u'notes/caf\xe9.md'])
+    assert_equal(results[0].snippet, u'Aligned the [laser] in the [caf\xe9].')
+    assert_equal(len(index.search(u'"na\xefve" -\xe9t\xe9')), 0)
+    assert_equal(len(index.search(u'na\xefv*')), 1)
+    index.close()
+
+def test_readonly():
+    path = os.path.join(loc, 'readonly.sqlite')
+    make_index('readonly.sqlite').close()
+    index = SearchIndex(path, readonly=True)
+    assert_equal(len(index.search(u'spectrometer')), 2)
+    assert_raises(sqlite3.OperationalError, index.document, u'notes/new.md',
+                  lambda: documents[u'notes/monday.md'], u'New')
+    index.close()
+    # an index of another version is left for `scribbler build` to remake
+    db = sqlite3.connect(path)
+    db.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION + 1))
+    db.commit()
+    db.close()
+    assert_raises(ScribblerError, SearchIndex, path, readonly=True)
+    db = sqlite3.connect(path)
+    assert_equal(db.execute('SELECT count(*) FROM documents').fetchone()[0], 3)
+    db.close()
+    index = SearchIndex(path)
+    assert_equal(index.search(u'spectrometer'), [])
+    index.close()
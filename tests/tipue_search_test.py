@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  search_test.py
+#
+#  Copyright 2014 Christopher MacMackin <cmacmackin@gmail.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+"""
+Unit tests for the Tipue Search plugin and the index it writes
+"""
+
+import json
+import os.path
+import shutil
+import subprocess
+from tempfile import mkdtemp
+
+from pelican.generators import TemplatePagesGenerator
+
+from scribbler.tipue_search.index import (FragmentCache, build_index,
+                                          encode_postings, page_fragment,
+                                          shard_index, stem, terms, tokenize)
+from scribbler.tipue_search.pdf_text import (CACHE_SUBDIR, extract_all,
+                                             file_hash)
+from scribbler.tipue_search.tipue_search import (RENDERED_TEMPLATE_PAGES,
+                                                 Tipue_Search_JSON_Generator,
+                                                 record_template_pages)
+
+from pdf_samples import SAMPLE_PDF
+
+from nose.plugins.skip import SkipTest
+from nose.tools import *
+
+loc = None
+
+TIPUESEARCH_JS = os.path.join(os.path.dirname(__file__), os.pardir, 'scribbler',
+                              'notebook-theme', 'static', 'js', 'tipuesearch.js')
+
+# words, punctuation and white space that JavaScript and Python could
+# take differently
+TEXT = (u'Studies of the CLASSES: status, analysis & cats (running, measured '
+        u'and used)\u2014a caf\xe9\xa0na\xefve e-mail, 3.14 \u201cquoted\u201d '
+        u'\xc9T\xc9 ties_buses x\ufeffy\x85one\x1ctwo\u180ethree \u2028 \xbfs\xed?')
+
+# runs tokenize() and stem() from tipuesearch.js on the text read from
+# standard input
+MIRROR_JS = u"""
+var fs = require('fs');
+var js = fs.readFileSync(process.argv[1], 'utf8');
+eval(js.substring(js.indexOf('var separators'),
+                  js.indexOf('function escapeHtml')));
+var words = tokenize(JSON.parse(fs.readFileSync(0, 'utf8')));
+console.log(JSON.stringify([words, words.map(stem)]));
+"""
+
+def setup():
+    global loc
+    loc = mkdtemp()
+
+def teardown():
+    shutil.rmtree(loc)
+
+def test_tokenize():
+    assert_equal(tokenize(u'  Caf\xe9, na\xefve\u2014e-mail! 3.14\xa0x '),
+                 [u'caf\xe9', u'na\xefve', u'e', u'mail', u'3', u'14', u'x'])
+
+def test_stem():
+    for word, stemmed in [(u'studies', u'study'), (u'classes', u'class'),
+                          (u'class', u'class'), (u'status', u'status'),
+                          (u'analysis', u'analysis'), (u'cats', u'cat'),
+                          (u'running', u'runn'), (u'measured', u'measur'),
+                          (u'ties', u'ties'), (u'used', u'used'),
+                          (u'bus', u'bus'), (u'caf\xe9', u'caf\xe9')]:
+        assert_equal(stem(word), stemmed)
+
+def test_terms():
+    assert_equal(terms(u'The cats of a lab'), [u'cat', u'lab'])
+    assert_equal(terms(u'The cats', stop_words=[]), [u'the', u'cat'])
+
+def test_javascript_mirror():
+    # the search page must make the same terms of a query as the index has
+    try:
+        node = subprocess.Popen(['node', '-e', MIRROR_JS, TIPUESEARCH_JS],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    except OSError:
+        raise SkipTest('node is not installed')
+    out = node.communicate(json.dumps(TEXT).encode('ascii'))[0]
+    assert_equal(node.returncode, 0)
+    words, stems = json.loads(out.decode('utf-8'))
+    expected = [w for w in tokenize(TEXT) if len(w) > 1]
+    assert_equal(words, expected)
+    assert_equal(stems, [stem(w) for w in expected])
+
+def test_page_fragment():
+    fragment = page_fragment(u'Cats', u'The cat sat with cats. ' * 30,
+                             u'Pets', u'cats.html')
+    # an occurrence in the tags or title counts for more than in the text
+    assert_equal(fragment['terms'], {u'cat': 60 + 5, u'sat': 30,
+                                     u'with': 30, u'pet': 3})
+    assert_equal(fragment['title'], u'Cats')
+    assert_equal(fragment['loc'], u'cats.html')
+    assert_equal(len(fragment['text'].split()), 40)
+
+def decode_postings(postings):
+    numbers = [int(n, 36) for n in postings.split(',')]
+    pages = []
+    for gap in numbers[0::2]:
+        pages.append(gap + (pages[-1] if pages else 0))
+    return list(zip(pages, numbers[1::2]))
+
+def test_encode_postings():
+    postings = [(0, 1), (5, 3), (41, 40), (2000, 1296)]
+    assert_equal(encode_postings(postings), u'0,1,5,3,10,14,1if,100')
+    assert_equal(decode_postings(encode_postings(postings)), postings)
+    assert_equal(encode_postings([]), u'')
+
+def fragments(count):
+    return [page_fragment(u'Page {}'.format(i),
+                          u'spectrometer sample{} \xe9t\xe9'.format(i % 3),
+                          u'', u'page{}.html'.format(i))
+            for i in range(count)]
+
+def test_build_index():
+    index = build_index(fragments(4), [u'the'])
+    assert_equal(index['stop'], [u'the'])
+    assert_equal([page['loc'] for page in index['pages']],
+                 [u'page{}.html'.format(i) for i in range(4)])
+    assert_not_in('terms', index['pages'][0])
+    assert_equal(decode_postings(index['terms'][u'spectrometer']),
+                 [(i, 1) for i in range(4)])
+    assert_equal(decode_postings(index['terms'][u'sample1']), [(1, 1)])
+    assert_equal(decode_postings(index['terms'][u'page']), [(i, 5) for i in range(4)])
+
+def script_arguments(script, function):
+    assert_true(script.startswith(function + u'('))
+    assert_true(script.endswith(u');\n'))
+    return json.loads(u'[' + script[len(function) + 1:-3] + u']')
+
+def test_shard_index():
+    index = build_index(fragments(5))
+    manifest, scripts = shard_index(index, prefix_length=2, page_shard_size=2)
+    assert_equal(manifest['pages'], 5)
+    assert_equal(manifest['pageShardSize'], 2)
+    # pages in blocks, the last of them short
+    pages = []
+    for block in range(3):
+        first, shard = script_arguments(scripts['pages-{}.js'.format(block)],
+                                        'tipuesearch_add_pages')
+        assert_equal(first, 2 * block)
+        pages += shard
+    assert_equal(len(pages), 5)
+    assert_equal(pages, index['pages'])
+    # every term is in the shard for its prefix, and only there
+    assert_equal(sorted(manifest['terms']),
+                 [u'pa', u'sa', u'sp', u'\xe9t'])
+    found = {}
+    for prefix, name in manifest['terms'].items():
+        key, terms = script_arguments(scripts[name], 'tipuesearch_add_terms')
+        assert_equal(key, prefix)
+        for term in terms:
+            assert_equal(term[:2], prefix)
+        found.update(terms)
+    assert_equal(found, index['terms'])
+    # the names of shards are kept to ASCII
+    assert_equal(manifest['terms'][u'\xe9t'], 'terms-e9-74.js')
+    assert_equal(manifest['terms'][u'sp'], 'terms-sp.js')
+    for script in scripts.values():
+        script.encode('ascii')
+
+def test_fragment_cache():
+    path = os.path.join(loc, 'cache')
+    made = []
+    def make(name):
+        def make_fragment():
+            made.append(name)
+            return {'name': name}
+        return make_fragment
+    cache = FragmentCache(path)
+    assert_equal(cache.fragment(make('a'), u'A', u'caf\xe9'), {'name': 'a'})
+    cache.fragment(make('b'), u'B')
+    cache.save()
+    assert_equal(made, ['a', 'b'])
+    # made again only when what they are made from has changed
+    cache = FragmentCache(path)
+    assert_equal(cache.fragment(make('a'), u'A', u'caf\xe9'), {'name': 'a'})
+    cache.fragment(make('c'), u'C')
+    assert_equal(cache.fragment(make('c'), u'C'), {'name': 'c'})
+    assert_equal(made, ['a', 'b', 'c'])
+    assert_equal(cache.hits, 1)
+    cache.save()
+    # the fragment for B, no longer used, has been dropped
+    cache = FragmentCache(path)
+    cache.fragment(make('b'), u'B')
+    assert_equal(made, ['a', 'b', 'c', 'b'])
+    # and all the fragments with other stop words
+    cache = FragmentCache(path, [u'caf\xe9'])
+    cache.fragment(make('a'), u'A', u'caf\xe9')
+    assert_equal(made[-1], 'a')
+
+def test_fragment_cache_unchanged():
+    path = os.path.join(loc, 'unchanged')
+    cache = FragmentCache(path)
+    cache.fragment(lambda: {}, u'A')
+    cache.save()
+    cache = FragmentCache(path)
+    cache.fragment(lambda: {}, u'A')
+    os.remove(cache.path)
+    # nothing is written when every fragment came from the cache
+    cache.save()
+    assert_false(os.path.exists(cache.path))
+
+ABOUT_HTML = (u'<html><head><title>About the \u201cnotebook\u201d</title></head>'
+              u'<body><p>Spectrometer   notes</p></body></html>')
+
+class FakeTemplate(object):
+    def __init__(self, name, html):
+        self.name = name
+        self.html = html
+
+    def render(self, *args, **kwargs):
+        return self.html
+
+class FakeEnvironment(object):
+    def __init__(self, templates):
+        self.templates = templates
+
+    def get_template(self, name):
+        return FakeTemplate(name, self.templates[name])
+
+class FakeTemplatePagesGenerator(TemplatePagesGenerator):
+    # with just what the plugin uses
+    def __init__(self, context, templates):
+        self.context = context
+        self.env = FakeEnvironment(templates)
+
+def test_pdf_cache():
+    pdfs = os.path.join(loc, 'pdfs')
+    cache_path = os.path.join(loc, 'pdf_cache')
+    cache_dir = os.path.join(cache_path, CACHE_SUBDIR)
+    os.makedirs(pdfs)
+    paths = [os.path.join(pdfs, 'a.pdf'), os.path.join(pdfs, 'b.pdf')]
+    shutil.copy(SAMPLE_PDF, paths[0])
+    with open(paths[1], 'wb') as f:
+        f.write(b'%PDF-1.4\nnot a PDF')
+    results = extract_all(paths, cache_path, 1)
+    assert_equal([r[0] for r in results], paths)
+    assert_not_equal(results[0][2], u'')
+    # a corrupt file gives no text, rather than stopping the build
+    assert_equal(results[1][1:], (u'b', u''))
+    assert_equal(len(os.listdir(cache_dir)), 2)
+    # the text of B as it was is dropped from the cache once B changes
+    with open(paths[1], 'wb') as f:
+        f.write(b'%PDF-1.4\nstill not a PDF')
+    assert_equal(extract_all(paths, cache_path, 1), results)
+    assert_equal(sorted(os.listdir(cache_dir)),
+                 sorted(file_hash(path) + '.json' for path in paths))
+
+def test_record_template_pages():
+    context = {}
+    generator = FakeTemplatePagesGenerator(context, {'about.html': ABOUT_HTML})
+    record_template_pages(generator)
+    template = generator.env.get_template('about.html')
+    assert_equal(template.name, 'about.html')
+    assert_equal(template.render(), ABOUT_HTML)
+    assert_equal(context[RENDERED_TEMPLATE_PAGES], {'about.html': ABOUT_HTML})
+    # other generators are left alone
+    other = FakeEnvironment({})
+    record_template_pages(other)
+    assert_not_in('get_template', vars(other))
+
+def test_template_pages():
+    for relative, url in [(False, u'http://example.com/pages/about.html'),
+                          (True, u'pages/about.html')]:
+        settings = {'SITEURL': u'http://example.com', 'RELATIVE_URLS': relative,
+                    'TEMPLATE_PAGES': {'about.html': u'pages/about.html',
+                                       'unused.html': u'unused.html'},
+                    'CACHE_PATH': os.path.join(loc, 'template_pages')}
+        context = {RENDERED_TEMPLATE_PAGES: {'about.html': ABOUT_HTML}}
+        generator = Tipue_Search_JSON_Generator(context, settings, loc, None,
+                                                loc)
+        generator.create_tpage_node('about.html')
+        # a template page which was not rendered is not indexed
+        generator.create_tpage_node('unused.html')
+        assert_equal(len(generator.json_nodes), 1)
+        node = generator.json_nodes[0]
+        assert_equal(node['loc'], url)
+        assert_equal(node['title'], u'About the "notebook"')
+        assert_equal(node['text'], u'About the "notebook" Spectrometer notes')
+        assert_equal(node['terms'][u'spectrometer'], 1)